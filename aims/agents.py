@@ -9,6 +9,7 @@ from aims.actions import MoveToLocation, PickUpVictim, UpdateRoomContent, Inspec
 from matrxs.agents.human_agent_brain import HumanAgentBrain
 from aims.door_actions import OpenDoorAimsAction, CloseDoorAction, OpenDoorActionCollapsed
 from aims.objects import Victim, Wall2
+from matrxs.utils.inbox import Inbox
 from matrxs.utils.message import Message
 
 
@@ -24,6 +25,8 @@ class Robot(AgentBrain):
 
         # The agent can't perceive the collapsed status of and victims in a room unless it is next to the room
         for obj_id, obj_properties in state.items():
+            # the properties in the state are read-only, we work on a copy as we change some of them below
+            obj_properties = obj_properties.copy()
             new_state[obj_id] = obj_properties
 
             if 'location' in obj_properties:
@@ -61,11 +64,12 @@ class RescueWorker(HumanAgentBrain):
     def __init__(self):
         super().__init__()
 
+        # Only keep the most recent messages, as the messages of a session are only processed when they are new
+        self.inbox = Inbox(max_messages=1000)
+
         # Memory (i.e., list of rooms/victims the agent has perceived)
         # self.memory = {}
 
-        self.exchanged_info = []
-
     def filter_observations(self, state):
         new_state = {}
         own_location = self.agent_properties['location']
@@ -73,7 +77,8 @@ class RescueWorker(HumanAgentBrain):
         earthquake = False
 
         for obj_id, obj_properties in state.items():
-
+            # the properties in the state are read-only, we work on a copy as we change some of them below
+            obj_properties = obj_properties.copy()
             new_state[obj_id] = obj_properties
 
             # Observe if there was an earthquake
@@ -132,19 +137,15 @@ class RescueWorker(HumanAgentBrain):
                     'class_inheritance']:  # The human can't perceive the explorer's energy level
                     new_state[obj_id]['energy'] = ''
 
-        # loop through exchanged info
-        for i, mssg_content in enumerate(copy.copy(self.exchanged_info)):
+        # loop through the info exchanged with us since we last decided on an action
+        for mssg in self.inbox.new_messages:
+            if mssg.message_type != "info_exchange":
+                continue
 
+            mssg_content = mssg.content
             if mssg_content['id'] not in self.agent_properties['memory']:
                 self.agent_properties['memory'][mssg_content['id']] = mssg_content['properties']
 
-            try:
-                del self.exchanged_info[i]
-            except:
-                print("Failed to delete exchanged information.")
-                pass
-
-
 
         # If there was an earthquake, the agents no longer knows the status of rooms it previously knew were safe
         memory = copy.deepcopy(self.agent_properties['memory'])
@@ -224,39 +225,14 @@ class RescueWorker(HumanAgentBrain):
 
         return action, action_kwargs
 
-    def _set_messages(self, messages=None):
-        """
-        This method is called by the GridWorld.
-        It sets all messages intended for this agent to a list that it can access and read.
-
-        Note; This method should NOT be overridden!
-
-        :param messages: A list of dictionaries that contain a 'from_id', 'to_id' and 'content.
-        If messages is set to None (or no messages are used as input), only the previous messages are removed
-        """
-
-        # We empty all received messages as this is from the previous tick
-        # self.received_messages = []
-
-        # Loop through all messages and create a Message object out of the dictionaries.
-        for mssg in messages:
-
-            if mssg.message_type == "info_exchange":
-                self.exchanged_info.append(mssg.content)
-
-            else:
-
-                # Since each message is secretly wrapped inside a Message (as its content), we unpack its content and
-                # set that as the actual received message.
-                received_message = mssg.content
-
-                # Add the message object to the received messages
-                self.received_messages.append(received_message)
 
 class Explorer(HumanAgentBrain):
     def __init__(self, earthquake_flashes=1):
         super().__init__()
 
+        # Only keep the most recent messages, as the messages of a session are only processed when they are new
+        self.inbox = Inbox(max_messages=1000)
+
         # Memory (i.e., list of rooms/victims the agent has perceived)
         # self.memory = {}
         # whether an earthquake was triggered and still going on
@@ -277,6 +253,8 @@ class Explorer(HumanAgentBrain):
         earthquake = False
 
         for obj_id, obj_properties in state.items():
+            # the properties in the state are read-only, we work on a copy as we change some of them below
+            obj_properties = obj_properties.copy()
             new_state[obj_id] = obj_properties
 
             # Observe if there was an earthquake
@@ -11,6 +11,10 @@ class MessageLogger(GridWorldLogger):
         super().__init__(save_path=save_path, file_name=file_name_prefix, file_extension=file_extension,
                          delimiter=delimeter, log_strategy=1)
 
+        # the number of global messages sent before self.__counted_until_tick, so we only count those of new ticks
+        self.__nr_messages = 0
+        self.__counted_until_tick = 0
+
     def log(self, grid_world: GridWorld, agent_data: dict):
         log_data = {
             'total_number_messages': 0,
@@ -25,11 +29,11 @@ class MessageLogger(GridWorldLogger):
             return log_data
 
         # get total number of messages from the first tick to the current tick
-        total_messages = 0
-        for i in range(0, t):
-            total_messages += len(gwmm.global_messages[i]) if i in gwmm.global_messages.keys() else 0
+        for i in range(self.__counted_until_tick, t):
+            self.__nr_messages += len(gwmm.global_messages[i]) if i in gwmm.global_messages.keys() else 0
+        self.__counted_until_tick = t
 
-        log_data['total_number_messages'] = total_messages
+        log_data['total_number_messages'] = self.__nr_messages
 
         # log every individual message of this tick (only use global messages for this experiment)
         if t-1 in gwmm.global_messages:
@@ -0,0 +1,7 @@
+""" Benchmarks of the performance of MATRXS. Each module prints a table of its results, run one from the root of the
+repository with:
+
+    python -m benchmarks.<module name>
+
+for instance `python -m benchmarks.world_state_benchmark`.
+"""
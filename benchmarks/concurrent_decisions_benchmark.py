@@ -0,0 +1,70 @@
+""" Benchmark of evaluating the brains of agents sequentially, in a pool of threads or in a pool of processes.
+
+Each agent spends some time on computations every tick, either in numpy (which releases the GIL) or in pure Python
+(which does not), before walking randomly. With a thread pool only the numpy brains should decide faster than
+sequentially, with a process pool both should, given that there is more than one processor. The final locations of all
+agents are compared to those of the sequential run, as the concurrent modes should give the exact same results.
+"""
+import os
+
+import numpy as np
+
+from benchmarks.utils import MOVE_ACTIONS, agent_locations, silenced, time_run
+from matrxs.agents.agent_brain import AgentBrain
+from matrxs.utils.utils import create_sense_capability
+from matrxs.world_builder import WorldBuilder
+
+NR_TICKS = 20
+NR_AGENTS = 8
+GRID_SIZE = 40
+
+
+class NumpyAgentBrain(AgentBrain):
+    """ An agent that multiplies matrices before it walks randomly. """
+
+    def decide_on_action(self, state):
+        matrix = self.rnd_gen.rand(200, 200)
+        for _ in range(10):
+            matrix = matrix @ matrix
+            matrix /= np.abs(matrix).max()
+        return MOVE_ACTIONS[self.rnd_gen.randint(len(MOVE_ACTIONS))], {}
+
+
+class PythonAgentBrain(AgentBrain):
+    """ An agent that sums numbers in pure Python before it walks randomly. """
+
+    def decide_on_action(self, state):
+        total = 0
+        for number in range(200000):
+            total += number % 7
+        return MOVE_ACTIONS[self.rnd_gen.randint(len(MOVE_ACTIONS))], {}
+
+
+def time_world(brain_class, concurrent_decisions):
+    with silenced():
+        builder = WorldBuilder(shape=[GRID_SIZE, GRID_SIZE], tick_duration=0.0, simulation_goal=NR_TICKS,
+                               headless=True, concurrent_decisions=concurrent_decisions)
+        # The agents are far enough apart to not perceive each other, so all of them can decide concurrently
+        for idx in range(NR_AGENTS):
+            builder.add_agent((5 * idx, 5 * idx), brain_class(), name=f"agent_{idx}", possible_actions=MOVE_ACTIONS,
+                              sense_capability=create_sense_capability([None], [2]))
+        world = builder.get_world()
+        duration = time_run(world, builder)
+
+    return duration / NR_TICKS, agent_locations(world)
+
+
+def main():
+    print(f"{os.cpu_count()} processors, {NR_AGENTS} agents")
+    print(f"{'brain':>8} {'mode':>12} {'ms/tick':>9} {'speedup':>8} {'same result':>12}")
+    for brain_class, brain_name in [(NumpyAgentBrain, "numpy"), (PythonAgentBrain, "python")]:
+        sequential_time, sequential_locations = time_world(brain_class, None)
+        print(f"{brain_name:>8} {'sequential':>12} {sequential_time * 1000:>9.2f} {1:>8.2f} {'':>12}")
+        for mode in ["thread", "process"]:
+            tick_time, locations = time_world(brain_class, mode)
+            print(f"{brain_name:>8} {mode:>12} {tick_time * 1000:>9.2f} {sequential_time / tick_time:>8.2f} "
+                  f"{str(locations == sequential_locations):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+""" Benchmark of the objects allocated to deliver global and team messages, for a varying number of agents.
+
+Every agent sends one global message and one message to its team each tick. Before, the MessageManager created a new
+Message for every receiver of such a message, so the number of allocated messages scaled with the number of messages
+times the number of agents. Now every message is wrapped in a single envelope that is shared by all its receivers,
+so the number of Message and MessageEnvelope objects per sent message should remain the same for more agents.
+"""
+import gc
+
+from benchmarks.utils import MOVE_ACTIONS, silenced, time_run
+from matrxs.agents.agent_brain import AgentBrain
+from matrxs.utils.message import Message, MessageEnvelope
+from matrxs.world_builder import WorldBuilder
+
+NR_TICKS = 20
+TEAM_SIZE = 10
+
+
+class ChattyAgentBrain(AgentBrain):
+    """ An agent that does not act, but sends a message to everyone and a message to its team every tick. """
+
+    def __init__(self, team):
+        super().__init__()
+        self.team = team
+
+    def decide_on_action(self, state):
+        self.send_message(Message(content=f"Hello all, from {self.agent_id}", from_id=self.agent_id))
+        self.send_message(Message(content=f"Hello team, from {self.agent_id}", from_id=self.agent_id,
+                                  to_id=self.team))
+        return None, {}
+
+
+def create_builder(nr_agents):
+    builder = WorldBuilder(shape=[nr_agents, 1], tick_duration=0.0, simulation_goal=NR_TICKS, headless=True)
+    brains = []
+    for idx in range(nr_agents):
+        team = f"team_{idx // TEAM_SIZE}"
+        brains.append(ChattyAgentBrain(team))
+        builder.add_agent((idx, 0), brains[-1], name=f"agent_{idx}", team=team, possible_actions=MOVE_ACTIONS)
+    return builder, brains
+
+
+def count_instances(cls):
+    return sum(1 for obj in gc.get_objects() if type(obj) is cls)
+
+
+def run_world(nr_agents):
+    with silenced():
+        builder, brains = create_builder(nr_agents)
+        world = builder.get_world()
+
+        gc.collect()
+        nr_messages_before = count_instances(Message)
+        duration = time_run(world, builder)
+
+    report = world.get_throughput_report()
+    message_time = sum(report["phases"][phase]["duration"]
+                       for phase in ["decisions", "message_preprocessing", "messages"])
+
+    # the messages of all ticks are kept by the MessageManager, so all allocated messages are still alive
+    gc.collect()
+    nr_messages = count_instances(Message) - nr_messages_before
+    nr_envelopes = count_instances(MessageEnvelope)
+    nr_sent = 2 * nr_agents * report["nr_ticks"]
+    nr_received = sum(brain.inbox.nr_received for brain in brains)
+    return nr_sent, nr_received, nr_messages, nr_envelopes, message_time / report["nr_ticks"], duration
+
+
+def main():
+    print(f"{'agents':>7} {'sent':>7} {'received':>9} {'messages/sent':>14} {'envelopes/sent':>15} "
+          f"{'ms/tick (agents+messages)':>26}")
+    for nr_agents in [10, 40, 160]:
+        nr_sent, nr_received, nr_messages, nr_envelopes, message_time, _ = run_world(nr_agents)
+        print(f"{nr_agents:>7} {nr_sent:>7} {nr_received:>9} {nr_messages / nr_sent:>14.2f} "
+              f"{nr_envelopes / nr_sent:>15.2f} {message_time * 1000:>26.3f}")
+
+
+if __name__ == "__main__":
+    main()
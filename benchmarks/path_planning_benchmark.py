@@ -0,0 +1,66 @@
+""" Benchmark of the time the path planners of the Navigator take to plan a single path on large grids.
+
+Two kinds of grids are used: an open grid without any obstacles, and a maze-like grid made of long walls with a single
+gap each, so the path has to zigzag through the whole grid. In both cases a path is planned from one corner of the
+grid to the opposite corner. For the distance field planner, both the first plan (which computes the distance field)
+and a repeated plan on the same map (which reuses the cached field) are timed.
+"""
+import time
+
+import numpy as np
+
+from benchmarks.utils import MOVE_ACTIONS
+from matrxs.utils.agent_utils.navigator import AStarPlanner, DistanceFieldCache, DistanceFieldPlanner
+
+NR_REPEATS = 3
+GRID_SIZES = [50, 100, 200]
+DIAGONAL_MOVE_ACTIONS = MOVE_ACTIONS + ["MoveNorthEast", "MoveSouthEast", "MoveSouthWest", "MoveNorthWest"]
+
+
+def create_open_grid(size):
+    return np.zeros((size, size), dtype=int)
+
+
+def create_maze_grid(size):
+    # Vertical walls on every other column, with the gap alternating between the top and bottom of the grid
+    grid = np.zeros((size, size), dtype=int)
+    for x in range(1, size - 1, 2):
+        grid[x, :] = 1
+        gap = size - 1 if (x // 2) % 2 == 0 else 0
+        grid[x, gap] = 0
+    return grid
+
+
+def time_plan(create_planner, grid):
+    goal = (grid.shape[0] - 1, grid.shape[1] - 1)
+    durations = []
+    for _ in range(NR_REPEATS):
+        planner = create_planner()
+        start = time.perf_counter()
+        path = planner.plan(start=(0, 0), goal=goal, occupation_map=grid)
+        durations.append(time.perf_counter() - start)
+    return min(durations), len(path)
+
+
+def create_planners(move_actions):
+    # the cached planner shares its cache over the repeats, so all but the first reuse the distance field
+    cache = DistanceFieldCache()
+    return [("a_star", lambda: AStarPlanner(action_set=move_actions, metric=AStarPlanner.EUCLIDEAN_METRIC)),
+            ("field", lambda: DistanceFieldPlanner(action_set=move_actions, cache=DistanceFieldCache())),
+            ("cached field", lambda: DistanceFieldPlanner(action_set=move_actions, cache=cache))]
+
+
+def main():
+    print(f"{'grid':>6} {'size':>6} {'moves':>9} {'planner':>13} {'path length':>12} {'ms/plan':>10}")
+    for grid_name, create_grid in [("open", create_open_grid), ("maze", create_maze_grid)]:
+        for size in GRID_SIZES:
+            grid = create_grid(size)
+            for moves_name, move_actions in [("straight", MOVE_ACTIONS), ("diagonal", DIAGONAL_MOVE_ACTIONS)]:
+                for planner_name, create_planner in create_planners(move_actions):
+                    duration, path_length = time_plan(create_planner, grid)
+                    print(f"{grid_name:>6} {size:>6} {moves_name:>9} {planner_name:>13} {path_length:>12} "
+                          f"{duration * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
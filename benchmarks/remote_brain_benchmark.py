@@ -0,0 +1,61 @@
+""" Benchmark of agent brains hosted in other processes, compared to brains in the process of the world.
+
+Each agent walks randomly. With remote brains the GridWorld sends the state of every agent to a BrainServer process
+over a Unix socket, and receives its action and messages back. Sequentially, every agent costs a round trip per tick.
+When the world evaluates its brains at once (concurrent_decisions), the calls of all agents that share a connection are
+sent in a single frame, such that each connection only needs a single round trip per tick. The final locations of all
+agents are compared to those of the local brains, as hosting the brains elsewhere should give the exact same results.
+"""
+import os
+
+from benchmarks.utils import MOVE_ACTIONS, WalkingAgentBrain, agent_locations, silenced, time_run
+from matrxs.agents.remote_agent_brain import RemoteAgentBrain, RemoteBrainConnection
+from matrxs.utils.utils import create_sense_capability
+from matrxs.world_builder import WorldBuilder
+
+NR_TICKS = 100
+NR_AGENTS = 16
+NR_CONNECTIONS = 2
+GRID_SIZE = 80
+
+
+def time_world(connections, concurrent_decisions):
+    with silenced():
+        builder = WorldBuilder(shape=[GRID_SIZE, GRID_SIZE], tick_duration=0.0, simulation_goal=NR_TICKS,
+                               headless=True, concurrent_decisions=concurrent_decisions)
+        # The agents are far enough apart to not perceive each other, so all of them can decide at once
+        for idx in range(NR_AGENTS):
+            brain = WalkingAgentBrain()
+            if connections is not None:
+                brain = RemoteAgentBrain(brain, connections[idx % len(connections)])
+            builder.add_agent((5 * idx, 5 * idx), brain, name=f"agent_{idx}", possible_actions=MOVE_ACTIONS,
+                              sense_capability=create_sense_capability([None], [2]))
+        world = builder.get_world()
+
+        nr_round_trips = 0 if connections is None else sum(connection.nr_round_trips for connection in connections)
+        duration = time_run(world, builder)
+        if connections is not None:
+            nr_round_trips = sum(connection.nr_round_trips for connection in connections) - nr_round_trips
+
+    return duration / NR_TICKS, nr_round_trips / NR_TICKS, agent_locations(world)
+
+
+def main():
+    print(f"{os.cpu_count()} processors, {NR_AGENTS} agents, {NR_CONNECTIONS} brain servers")
+    print(f"{'brains':>8} {'mode':>12} {'ms/tick':>9} {'round trips/tick':>17} {'same result':>12}")
+    local_time, _, local_locations = time_world(None, None)
+    print(f"{'local':>8} {'sequential':>12} {local_time * 1000:>9.2f} {0:>17.1f} {'':>12}")
+
+    connections = [RemoteBrainConnection() for _ in range(NR_CONNECTIONS)]
+    try:
+        for mode in [None, "thread"]:
+            tick_time, round_trips, locations = time_world(connections, mode)
+            print(f"{'remote':>8} {mode or 'sequential':>12} {tick_time * 1000:>9.2f} {round_trips:>17.1f} "
+                  f"{str(locations == local_locations):>12}")
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+""" Benchmark of the path planners of the Navigator for an agent that patrols a map that changes now and then.
+
+The map consists of a grid of rooms, each with a door in its bottom and right wall. An agent patrols between the four
+corners of the map, planning its path again on every step as a Navigator does. Every few steps one of the doors opens
+or closes, which changes the shortest route to the current waypoint. A* plans from scratch on every step, the distance
+field planner recomputes its field whenever the map changed, and D* Lite repairs its previous search.
+"""
+import random
+import time
+
+import numpy as np
+
+from benchmarks.utils import MOVE_ACTIONS
+from matrxs.utils.agent_utils.navigator import AStarPlanner, DistanceFieldCache, DistanceFieldPlanner, \
+    DStarLitePlanner
+
+NR_STEPS = 2000
+ROOM_SIZE = 8
+
+
+def create_rooms_grid(nr_rooms):
+    # Rooms of ROOM_SIZE x ROOM_SIZE with a wall on the right and bottom side, with a door in the middle of both
+    size = nr_rooms * ROOM_SIZE
+    grid = np.zeros((size, size), dtype=int)
+    doors = []
+    for room_x in range(nr_rooms):
+        for room_y in range(nr_rooms):
+            right, bottom = (room_x + 1) * ROOM_SIZE - 1, (room_y + 1) * ROOM_SIZE - 1
+            grid[right, room_y * ROOM_SIZE:bottom + 1] = 1
+            grid[room_x * ROOM_SIZE:right + 1, bottom] = 1
+            doors += [(right, room_y * ROOM_SIZE + ROOM_SIZE // 2), (room_x * ROOM_SIZE + ROOM_SIZE // 2, bottom)]
+
+    # Open all doors, except those in the outer walls
+    doors = [door for door in doors if door[0] < size - 1 and door[1] < size - 1]
+    for door in doors:
+        grid[door] = 0
+    return grid, doors
+
+
+def patrol(planner, nr_rooms, door_toggle_interval):
+    grid, doors = create_rooms_grid(nr_rooms)
+    corner = nr_rooms * ROOM_SIZE - 2
+    waypoints = [(0, 0), (corner, 0), (corner, corner), (0, corner)]
+    rnd_gen = random.Random(42)
+
+    location, waypoint_idx = waypoints[0], 1
+    start = time.perf_counter()
+    for step in range(NR_STEPS):
+        if step % door_toggle_interval == 0:
+            door = rnd_gen.choice(doors)
+            grid[door] = 1 - grid[door]
+
+        if location == waypoints[waypoint_idx]:
+            waypoint_idx = (waypoint_idx + 1) % len(waypoints)
+
+        path = planner.plan(start=location, goal=waypoints[waypoint_idx], occupation_map=grid)
+        location = path[0]
+    return time.perf_counter() - start
+
+
+def main():
+    print(f"{'size':>6} {'door every':>11} {'planner':>15} {'ms/step':>10}")
+    for nr_rooms in [4, 8]:
+        for door_toggle_interval in [5, 50]:
+            for planner_name, planner in [("a_star", AStarPlanner(action_set=MOVE_ACTIONS)),
+                                          ("distance_field", DistanceFieldPlanner(action_set=MOVE_ACTIONS,
+                                                                                  cache=DistanceFieldCache())),
+                                          ("d_star_lite", DStarLitePlanner(action_set=MOVE_ACTIONS))]:
+                duration = patrol(planner, nr_rooms, door_toggle_interval)
+                print(f"{nr_rooms * ROOM_SIZE:>6} {door_toggle_interval:>11} {planner_name:>15} "
+                      f"{duration * 1000 / NR_STEPS:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
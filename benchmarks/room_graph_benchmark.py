@@ -0,0 +1,90 @@
+""" Benchmark of A* with and without a graph of rooms and doors, for an agent that crosses a building-scale map.
+
+The map is a grid of rooms separated by corridors, similar to the AIMS worlds. Each room has a single door in a random
+wall. The agent walks from inside the room in the top left corner to inside the room in the bottom right corner,
+planning its path again on every step as a Navigator does. Plain A* searches the whole grid each time, while the room
+graph planner only searches the path to the next door it has to pass. Each building is also crossed with its rooms
+nested in a "world_bounds" room around the whole map, as added by most scenarios.
+"""
+import random
+import time
+
+import numpy as np
+
+from benchmarks.utils import MOVE_ACTIONS
+from matrxs.utils.agent_utils.navigator import AStarPlanner, RoomGraphPlanner
+
+ROOM_SIZE = (10, 8)
+CORRIDOR_WIDTH = 3
+
+
+def create_building(nr_rooms_x, nr_rooms_y, world_bounds=False):
+    """ Returns the occupation map and a state with the walls and doors of all rooms, optionally with a room named
+    "world_bounds" whose walls surround the map. """
+    width = nr_rooms_x * (ROOM_SIZE[0] + CORRIDOR_WIDTH) + CORRIDOR_WIDTH
+    height = nr_rooms_y * (ROOM_SIZE[1] + CORRIDOR_WIDTH) + CORRIDOR_WIDTH
+    grid = np.zeros((width, height), dtype=int)
+    state = {}
+    rnd_gen = random.Random(42)
+
+    # The world bounds come first, as scenarios add them before the other rooms
+    if world_bounds:
+        for x in range(width):
+            for y in range(height):
+                if 0 < x < width - 1 and 0 < y < height - 1:
+                    continue
+                grid[x, y] = 1
+                state[f"world_bounds_{x}_{y}"] = {"location": (x, y), "room_name": "world_bounds",
+                                                  "is_traversable": False}
+
+    for room_x in range(nr_rooms_x):
+        for room_y in range(nr_rooms_y):
+            name = f"room_{room_x}_{room_y}"
+            left = CORRIDOR_WIDTH + room_x * (ROOM_SIZE[0] + CORRIDOR_WIDTH)
+            top = CORRIDOR_WIDTH + room_y * (ROOM_SIZE[1] + CORRIDOR_WIDTH)
+            right, bottom = left + ROOM_SIZE[0] - 1, top + ROOM_SIZE[1] - 1
+            door = rnd_gen.choice([(left, top + ROOM_SIZE[1] // 2), (right, top + ROOM_SIZE[1] // 2),
+                                   (left + ROOM_SIZE[0] // 2, top), (left + ROOM_SIZE[0] // 2, bottom)])
+
+            for x in range(left, right + 1):
+                for y in range(top, bottom + 1):
+                    if left < x < right and top < y < bottom:
+                        continue
+                    is_door = (x, y) == door
+                    grid[x, y] = 0 if is_door else 1
+                    state[f"{name}_{x}_{y}"] = {"location": (x, y), "room_name": name, "is_traversable": is_door,
+                                                **({"is_open": True} if is_door else {})}
+
+    return grid, state
+
+
+def cross_building(planner, grid):
+    start = (CORRIDOR_WIDTH + 1, CORRIDOR_WIDTH + 1)
+    goal = (grid.shape[0] - CORRIDOR_WIDTH - 2, grid.shape[1] - CORRIDOR_WIDTH - 2)
+
+    location, nr_steps = start, 0
+    start_time = time.perf_counter()
+    while location != goal:
+        location = planner.plan(start=location, goal=goal, occupation_map=grid)[0]
+        nr_steps += 1
+    return time.perf_counter() - start_time, nr_steps
+
+
+def main():
+    print(f"{'rooms':>7} {'bounds':>7} {'planner':>11} {'steps':>6} {'expansions/step':>16} {'ms/step':>8}")
+    for nr_rooms, world_bounds in [((3, 3), False), ((3, 3), True), ((6, 5), False), ((6, 5), True), ((10, 8), False),
+                                   ((10, 8), True)]:
+        grid, state = create_building(*nr_rooms, world_bounds=world_bounds)
+        room_graph_planner = RoomGraphPlanner(action_set=MOVE_ACTIONS)
+        room_graph_planner.room_graph.update(state)
+
+        for planner_name, planner, a_star in [("a_star", AStarPlanner(action_set=MOVE_ACTIONS), None),
+                                              ("room_graph", room_graph_planner, room_graph_planner.a_star)]:
+            a_star = planner if a_star is None else a_star
+            duration, nr_steps = cross_building(planner, grid)
+            print(f"{nr_rooms[0] * nr_rooms[1]:>7} {str(world_bounds):>7} {planner_name:>11} {nr_steps:>6} "
+                  f"{a_star.nr_expansions / nr_steps:>16.1f} {duration * 1000 / nr_steps:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+""" Benchmark of the overhead of tracing a world, for a varying number of agents.
+
+A traced world records a span for every tick phase, for the filter_observations and decide_on_action of every agent
+and for the is_possible and mutate of every action. The spans are stored in a buffer that is allocated up front, so the
+time per tick of a traced world should stay close to that of an untraced one. Writing the trace at the end of the run
+is not part of the time per tick, but is shown separately along with the size of the trace.
+"""
+import os
+import tempfile
+import time
+
+from benchmarks.utils import MOVE_ACTIONS, silenced, time_run
+from matrxs.agents.agent_brain import AgentBrain
+from matrxs.world_builder import WorldBuilder
+
+NR_TICKS = 200
+GRID_SIZE = 50
+
+
+class WalkingAgentBrain(AgentBrain):
+    """ An agent that steps back and forth. """
+
+    def decide_on_action(self, state):
+        return ("MoveEast" if state["World"]["nr_ticks"] % 2 == 0 else "MoveWest"), {}
+
+
+def time_world(nr_agents, trace_dir):
+    with silenced():
+        builder = WorldBuilder(shape=[GRID_SIZE, GRID_SIZE], tick_duration=0.0, simulation_goal=NR_TICKS,
+                               headless=True, trace_dir=trace_dir)
+        for idx in range(nr_agents):
+            builder.add_agent((0, idx), WalkingAgentBrain(), name=f"agent_{idx}", possible_actions=MOVE_ACTIONS)
+        world = builder.get_world()
+        duration = time_run(world, builder)
+
+    # the run ended by writing the trace, time that separately by writing it once more
+    write_duration = 0.
+    if world.tracer is not None:
+        write_start = time.perf_counter()
+        world.tracer.write(os.path.join(trace_dir, "benchmark.trace.json"))
+        write_duration = time.perf_counter() - write_start
+
+    return (duration - write_duration) / NR_TICKS, write_duration
+
+
+def main():
+    print(f"{'agents':>7} {'ms/tick':>9} {'ms/tick (traced)':>17} {'overhead':>9} {'write s':>8} {'trace MB':>9}")
+    with tempfile.TemporaryDirectory() as trace_dir:
+        for nr_agents in [1, 10, 40]:
+            tick_time, _ = time_world(nr_agents, None)
+            traced_tick_time, write_duration = time_world(nr_agents, trace_dir)
+            trace_size = os.path.getsize(os.path.join(trace_dir, "world_1.trace.json")) / 1e6
+            print(f"{nr_agents:>7} {tick_time * 1000:>9.3f} {traced_tick_time * 1000:>17.3f} "
+                  f"{traced_tick_time / tick_time - 1:>9.1%} {write_duration:>8.3f} {trace_size:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
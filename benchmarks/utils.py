@@ -0,0 +1,34 @@
+""" Helpers shared by the benchmarks. """
+import contextlib
+import io
+import time
+
+from matrxs.agents.agent_brain import AgentBrain
+
+MOVE_ACTIONS = ["MoveNorth", "MoveEast", "MoveSouth", "MoveWest"]
+
+
+class WalkingAgentBrain(AgentBrain):
+    """ An agent that walks randomly. """
+
+    def decide_on_action(self, state):
+        return MOVE_ACTIONS[self.rnd_gen.randint(len(MOVE_ACTIONS))], {}
+
+
+@contextlib.contextmanager
+def silenced():
+    """ Silences the prints of MATRXS itself, such as those of the WorldBuilder and the GridWorld. """
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def time_run(world, builder):
+    """ Runs a world created by the builder until it is done, and returns the number of seconds this took. """
+    start = time.perf_counter()
+    world.run(builder.api_info)
+    return time.perf_counter() - start
+
+
+def agent_locations(world):
+    """ Returns the locations of all agents of a world, in the order in which they were added. """
+    return [agent.location for agent in world.registered_agents.values()]
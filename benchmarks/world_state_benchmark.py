@@ -0,0 +1,54 @@
+""" Benchmark of the time a single tick takes for a varying number of agents and objects.
+
+Before, the complete (god view) state of the world was built several times per agent per tick, making the tick time
+scale with the number of agents times the number of objects. It is now built once per tick, so the time per agent
+should remain roughly the same when more objects are added (apart from the objects each agent actually perceives).
+"""
+from benchmarks.utils import MOVE_ACTIONS, silenced, time_run
+from matrxs.API import api
+from matrxs.agents.agent_brain import AgentBrain
+from matrxs.utils.utils import create_sense_capability
+from matrxs.world_builder import WorldBuilder
+
+NR_TICKS = 20
+GRID_SIZE = 70
+
+
+def create_builder(nr_agents, nr_objects):
+    builder = WorldBuilder(shape=[GRID_SIZE, GRID_SIZE], tick_duration=0.0, simulation_goal=NR_TICKS,
+                           run_matrxs_api=True)
+
+    # Traversable objects spread over the grid, on their own location
+    for idx in range(nr_objects):
+        builder.add_object((idx % GRID_SIZE, 1 + idx // GRID_SIZE), name=f"object_{idx}", is_traversable=True)
+
+    # Agents that only perceive their direct surroundings, so the cost of their own state stays small
+    for idx in range(nr_agents):
+        builder.add_agent((idx, 0), AgentBrain(), name=f"agent_{idx}", possible_actions=MOVE_ACTIONS,
+                          sense_capability=create_sense_capability([None], [1]))
+
+    return builder
+
+
+def time_tick(nr_agents, nr_objects):
+    with silenced():
+        builder = create_builder(nr_agents, nr_objects)
+        world = builder.get_world()
+
+        # Initialize the world ourselves to unpause it, the API thread itself is not needed
+        world.initialize(builder.api_info)
+        api.matrxs_paused = False
+
+        return time_run(world, builder) / NR_TICKS
+
+
+def main():
+    print(f"{'agents':>8} {'objects':>8} {'ms/tick':>10} {'ms/agent/tick':>14}")
+    for nr_objects in [100, 1000, 4000]:
+        for nr_agents in [1, 10, 40]:
+            tick_time = time_tick(nr_agents, nr_objects)
+            print(f"{nr_agents:>8} {nr_objects:>8} {tick_time * 1000:>10.2f} {tick_time * 1000 / nr_agents:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,21 @@ import threading
 import time
 import copy
 import logging
+import queue
 
-from flask import Flask, jsonify, abort, request
+from flask import Flask, jsonify, abort, request, Response, json, g
 from flask_cors import CORS
 
 from matrxs.utils.message import Message
+from matrxs.utils.read_only import ReadOnlyDict
+from matrxs.API.state_history import StateHistory
+from matrxs.API.state_stream import StateStream
+
+# orjson is a considerably faster JSON encoder, which is used when it is installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 '''
 This file holds the code for the MATRXS RESTful API.
@@ -23,8 +33,15 @@ CORS(app)
 port = 3001
 
 # variables to be set by MATRXS
-# states is a list of length 'current_tick' with a dictionary containing all states of that tick, indexed by agent_id
-states = []
+# states is a StateHistory of length 'current_tick' with a dictionary containing all states of that tick, indexed by
+# agent_id. How many ticks are kept in memory, and whether older states are spilled to disk or discarded, is set by
+# reset_api.
+states = StateHistory()
+# the clients subscribed to a state stream, which receive the update of their view every tick
+state_stream = StateStream()
+stream_keepalive_interval = 1.0  # seconds after which a status event is sent to an idle stream (e.g. when paused)
+last_streamed_tick = None  # the tick (index in states) of the last update pushed to the state streams
+last_streamed_messages_tick = -1  # the last tick of which the messages were pushed to the state streams
 current_tick = 0
 tick_duration = 0.0
 grid_size = [1, 1]
@@ -33,6 +50,8 @@ next_tick_info = {}
 add_message_to_agent = None
 received_messages = {} # messages received via the API, intended for the Gridworld
 gw_message_manager = None # the message manager of the gridworld, containing all messages of various types
+gw_profiler = None # the tick profiler of the gridworld, containing the durations of its tick phases, decisions and actions
+gw_tracer = None # the tracer of the gridworld if it is traced, which records a span for each handled request
 teams = None # dict with team names (keys) and IDs of agents who are in that team (values)
 # currently only one world at a time is supported
 current_world_ID = False
@@ -40,6 +59,15 @@ current_world_ID = False
 # a temporary state for the current tick, which will be written to states after all
 # agents have been updated
 temp_state = {}
+# the (read-only) objects of which the sense capability was made JSON serializable during the current tick, by their
+# id, so agents perceiving the same object share a single serializable copy
+reordered_objects = {}
+
+# the states of the latest requested tick encoded to JSON, indexed by agent ID, such that every view is encoded only
+# once per tick no matter how many clients request it
+encoded_states = {}
+encoded_states_tick = None
+encoded_states_lock = threading.Lock()
 
 # variables to be read (only!) by MATRXS and set (only!) through API calls
 userinput = {}
@@ -54,6 +82,22 @@ world_done = False
 # API connection methods
 #########################################################################
 
+@app.before_request
+def start_request_span():
+    """ Notes when handling a request started, to record it as a span if the world is traced. """
+    if gw_tracer is not None:
+        g.trace_start = gw_tracer.now()
+
+
+@app.after_request
+def end_request_span(response):
+    """ Records the handling of a request as a span if the world is traced, named after its route. """
+    if gw_tracer is not None and "trace_start" in g:
+        name = request.url_rule.rule if request.url_rule is not None else request.path
+        gw_tracer.add_span(name, "api", g.trace_start, args={"path": request.path, "status": response.status_code})
+    return response
+
+
 @app.route('/get_info', methods=['GET', 'POST'])
 def get_info():
     """ Provides the general information on the world, contained in the world object.
@@ -66,6 +110,22 @@ def get_info():
     return jsonify(MATRXS_info)
 
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """ Provides the durations of the tick phases, agent decisions and actions of the current world as histograms, in
+    the Prometheus text format such that they can be scraped by Prometheus.
+
+    Returns
+        The metrics as plain text, see :func:`~matrxs.utils.tick_profiler.TickProfiler.to_prometheus`.
+    -------
+    """
+    if gw_profiler is None:
+        return abort(400, description=f'MATRX hasn\'t started yet.')
+
+    return Response(gw_profiler.to_prometheus(extra_labels={"world": current_world_ID}),
+                    mimetype="text/plain; version=0.0.4")
+
+
 @app.route('/get_latest_state_and_messages/<agent_id>', methods=['GET', 'POST'])
 def get_latest_state_and_messages(agent_id):
     """ Provides all most recent information from MATRX: Both the state and messages from the latest
@@ -86,16 +146,80 @@ def get_latest_state_and_messages(agent_id):
         print("API request not valid:", error)
         return abort(error['error_code'], description=error['error_message'])
 
-    # fetch states and messages
-    states = __fetch_states(current_tick, agent_id)
-    messages = gw_message_manager.fetch_messages(current_tick, current_tick, clean_input_ids(agent_id)[0])
-    chatrooms = gw_message_manager.fetch_chatrooms(clean_input_ids(agent_id)[0])
+    # everything in the response only changes with the tick or MATRX status, so clients that polled this tick already
+    # can use the response they have
+    tick = current_tick
+    etag = f"{current_world_ID}-{tick}-{matrxs_paused}-{world_done}"
+    if etag in request.if_none_match:
+        return __encoded_response(None, etag)
+
+    # fetch states (already encoded) and messages
+    ids = clean_input_ids(agent_id)
+    states_json = __get_encoded_states(ids, tick)
+    messages = gw_message_manager.fetch_messages(tick, tick, ids[0])
+    chatrooms = gw_message_manager.fetch_chatrooms(ids[0])
 
+    response = {"matrxs_paused": matrxs_paused, "messages": messages, "chatrooms": chatrooms}
     if world_done:
-        return jsonify({"matrxs_paused": matrxs_paused, "states": states, "messages": messages,
-                "chatrooms": chatrooms, "world_completed": world_done, "completion_data": world_completion_data})
+        response["world_completed"] = world_done
+        response["completion_data"] = world_completion_data
+
+    # add the encoded states to the other (encoded) information
+    body = encode_json(response)[:-1] + b',"states":' + states_json + b'}'
+    return __encoded_response(body, etag)
 
-    return jsonify({"matrxs_paused": matrxs_paused, "states": states, "messages": messages, "chatrooms": chatrooms})
+
+@app.route('/get_state_delta/<agent_id>/<since_tick>', methods=['GET', 'POST'])
+def get_state_delta(agent_id, since_tick):
+    """ Provides the changes in the state of one particular agent between tick `since_tick` and the latest tick, along
+    with the messages since that tick and the current MATRX status (paused or not).
+
+    Only the objects that were added or changed since `since_tick` are sent, keyed by their object ID, together with
+    the IDs of the objects that were removed. Clients such as the visualizer can then patch their copy of the state,
+    instead of receiving the complete state every tick. If the states of `since_tick` are not available (e.g. on the
+    first request with a `since_tick` of -1, or because that tick has been evicted), the complete latest state is sent
+    instead, which is indicated by "full" being True.
+
+    Parameters
+    ----------
+    agent_id
+        The ID of the targeted agent
+    since_tick
+        The last tick of which the client received the state, or -1 to request the complete state.
+    Returns
+        a dictionary containing the tick of the delta under "tick", the World settings under "World", the
+        added or changed objects under "changed", the IDs of removed objects under "removed", whether it is a complete
+        state under "full", and the messages and chatrooms under "messages" and "chatrooms".
+    -------
+    """
+    # check for validity and return an error if not valid
+    API_call_valid, error = check_states_API_request(ids=[agent_id])
+    if not API_call_valid:
+        print("API request not valid:", error)
+        return abort(error['error_code'], description=error['error_message'])
+
+    try:
+        since_tick = int(since_tick)
+    except:
+        return abort(400, description=f'Tick has to be an integer, but is of type {type(since_tick)}')
+
+    agent_id = clean_input_ids(agent_id)[0]
+    full, changed, removed = __get_state_delta(agent_id, since_tick)
+
+    # a delta contains the messages of all ticks since the last one the client received
+    mssgs_from = current_tick if full else since_tick + 1
+    messages = gw_message_manager.fetch_messages(mssgs_from, current_tick, agent_id)
+    chatrooms = gw_message_manager.fetch_chatrooms(agent_id)
+
+    delta = {"matrxs_paused": matrxs_paused, "tick": current_tick, "full": full,
+             "World": states[current_tick][agent_id]['state']['World'], "changed": changed, "removed": removed,
+             "messages": messages, "chatrooms": chatrooms}
+
+    if world_done:
+        delta["world_completed"] = world_done
+        delta["completion_data"] = world_completion_data
+
+    return jsonify(delta)
 
 #########################################################################
 # MATRX fetch state API calls
@@ -164,8 +288,76 @@ def get_latest_state(agent_ids):
         agent as specified in `agent_ids`, indexed by their agent ID.
     -------
     """
-    return get_states_specific_agents(current_tick, agent_ids)
+    # check for validity and return an error if not valid
+    tick = current_tick
+    API_call_valid, error = check_states_API_request(tick=tick)
+    if not API_call_valid:
+        print("API request not valid:", error)
+        return abort(error['error_code'], description=error['error_message'])
 
+    # the states only change with the tick, so clients that polled this tick already can use the response they have
+    etag = f"{current_world_ID}-{tick}"
+    if etag in request.if_none_match:
+        return __encoded_response(None, etag)
+
+    return __encoded_response(__get_encoded_states(clean_input_ids(agent_ids), tick), etag)
+
+
+
+#########################################################################
+# MATRX state streaming API calls
+#########################################################################
+
+@app.route('/stream_state/<agent_id>', methods=['GET'])
+def stream_state(agent_id):
+    """ Streams the state of one particular agent to the client as Server-Sent Events, instead of the client polling
+    for it.
+
+    The first "state" event contains the complete latest state. After that, MATRX pushes a "state" event every tick
+    containing the changes since the previous one, in the same format as
+    :func:`~matrxs.API.api.get_state_delta`. When no tick passed for a while (e.g. MATRX is paused), a "status" event
+    is sent with the current MATRX status. The stream ends when a new world is started.
+
+    Parameters
+    ----------
+    agent_id
+        The ID of the targeted agent
+    Returns
+        A text/event-stream response.
+    -------
+    """
+    # check for validity and return an error if not valid
+    API_call_valid, error = check_states_API_request(ids=[agent_id])
+    if not API_call_valid:
+        print("API request not valid:", error)
+        return abort(error['error_code'], description=error['error_message'])
+
+    # check if the API was reset during this time
+    if len(states) == 0:
+        return abort(400, description='API is reconnecting to a new world')
+
+    agent_id = clean_input_ids(agent_id)[0]
+
+    # the first event is the complete latest state, without messages as the client fetches these on page load
+    subscription = state_stream.subscribe(agent_id, lambda: __get_stream_event(agent_id, since_tick=None,
+                                                                               mssgs_from=current_tick + 1))
+
+    def events():
+        try:
+            while True:
+                try:
+                    event = subscription.get(timeout=stream_keepalive_interval)
+                except queue.Empty:
+                    event = __get_status_event()
+
+                # the stream was ended
+                if event is None:
+                    return
+                yield event
+        finally:
+            state_stream.unsubscribe(agent_id, subscription)
+
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
 
 
 #########################################################################
@@ -305,6 +497,66 @@ def get_latest_messages_specific_agent(agent_id):
     return jsonify({"messages": messages, "chatrooms": chatrooms})
 
 
+@app.route('/get_messages_since/<sequence>', methods=['GET', 'POST'])
+def get_messages_since(sequence):
+    """ Provides the messages of all agents that were sent since sequence number `sequence`.
+
+    A client that polls for new messages starts with sequence 0, and then every time requests the messages since the
+    `next_sequence` it received with its previous request. As such, it receives every message exactly once, and the
+    cost of a request depends on the number of new messages instead of the number of ticks.
+
+    Parameters
+    ----------
+    sequence
+        integer indicating from which sequence number onwards to send the messages.
+
+    Returns
+        Returns a dictionary containing `messages`, `chatrooms` and `next_sequence`. The messages and chatrooms are
+        the same as those returned by /get_messages, `next_sequence` is the sequence number to request next.
+        Also see the documentation of the
+        :func:`~matrxs.utils.message_manager.MessageManager.MyClass.fetch_messages_since` function.
+    -------
+    """
+    # check for validity and return an error if not valid
+    API_call_valid, error = check_messages_API_request(sequence=sequence)
+    if not API_call_valid:
+        print("API request not valid:", error)
+        return abort(error['error_code'], description=error['error_message'])
+
+    messages, next_sequence = gw_message_manager.fetch_messages_since(int(sequence))
+    chatrooms = gw_message_manager.fetch_chatrooms()
+
+    return jsonify({"messages": messages, "chatrooms": chatrooms, "next_sequence": next_sequence})
+
+
+@app.route('/get_messages_since/<sequence>/<agent_id>', methods=['GET', 'POST'])
+def get_messages_since_specific_agent(sequence, agent_id):
+    """ Provides all messages either sent by or addressed to `agent_id` since sequence number `sequence`.
+
+    Parameters
+    ----------
+    sequence
+        integer indicating from which sequence number onwards to send the messages.
+    agent_id
+        The `agent_id` of the agent of whom the messages should be fetched.
+        All fetched messages are either sent to or by the agent with agent ID `agent_id`.
+
+    Returns
+        Returns a dictionary containing `messages`, `chatrooms` and `next_sequence`, see /get_messages_since.
+    -------
+    """
+    # check for validity and return an error if not valid
+    API_call_valid, error = check_messages_API_request(id=agent_id, sequence=sequence)
+    if not API_call_valid:
+        print("API request not valid:", error)
+        return abort(error['error_code'], description=error['error_message'])
+
+    messages, next_sequence = gw_message_manager.fetch_messages_since(int(sequence), clean_input_ids(agent_id)[0])
+    chatrooms = gw_message_manager.fetch_chatrooms(clean_input_ids(agent_id)[0])
+
+    return jsonify({"messages": messages, "chatrooms": chatrooms, "next_sequence": next_sequence})
+
+
 #########################################################################
 # MATRX userinput API calls
 #########################################################################
@@ -522,13 +774,14 @@ def clean_input_ids(ids):
         return [ids]
 
 
-def check_messages_API_request(tick=None, id=None):
+def check_messages_API_request(tick=None, id=None, sequence=None):
     """ Checks if the variables of the API request are valid, and if the requested information exists
 
     Parameters
     ----------
     tick
     id
+    sequence
 
     Returns
     -------
@@ -544,6 +797,18 @@ def check_messages_API_request(tick=None, id=None):
     if not check_passed:
         return False, error_message
 
+    # check if the sequence number is a valid format
+    if sequence is not None:
+        try:
+            sequence = int(sequence)
+        except:
+            return False, {'error_code': 400,
+                           'error_message': f'Sequence has to be an integer, but is of type {type(sequence)}'}
+
+        if sequence < 0:
+            return False, {'error_code': 400,
+                           'error_message': f'Sequence has to be equal to or larger than 0, but is {sequence}'}
+
     return True, None
 
 
@@ -573,6 +838,15 @@ def check_states_API_request(tick=None, ids=None, ids_required=False):
     if not check_passed:
         return False, error_message
 
+    # check if the states of the requested tick are still kept
+    if tick is not None and int(tick) < states.oldest_tick:
+        error_message = f'The states of tick {tick} are no longer available, the oldest available tick is ' \
+                        f'{states.oldest_tick}.'
+        if states.spill_dir is not None:
+            error_message += f' The states of older ticks that no longer fit in memory are read from ' \
+                             f'{states.spill_dir}.'
+        return False, {'error_code': 400, 'error_message': error_message}
+
     # Don't throw an error if MATRXS is paused the first tick, and thus still has no states
     # if current_tick is 0 and matrxs_paused:
     #     return True, None
@@ -591,7 +865,7 @@ def check_states_API_request(tick=None, ids=None, ids_required=False):
             #                                                        f'IDs(string) for requesting states of multiple agents'}
 
         # check if the API was reset during this time
-        if len(states) is 0:
+        if len(states) == 0:
             return False, {'error_code': 400,
                            'error_message': f'API is reconnecting to a new world'}
 
@@ -646,7 +920,7 @@ def __fetch_states(tick, ids=None):
 
     # return all states
     if ids is None:
-        return states[tick:]
+        return states.get_range(tick)
 
     # convert ints to lists so we can use 1 uniform approach
     try:
@@ -656,18 +930,151 @@ def __fetch_states(tick, ids=None):
 
     # create a list containing the states from tick to current_tick containing the states of all desired agents/god
     filtered_states = []
-    for t in range(tick, current_tick+1):
+    for states_tick in states.get_range(tick, current_tick):
         states_this_tick = {}
 
         # add each agent's state for this tick
         for id in ids:
-            states_this_tick[id] = states[t][id]
+            states_this_tick[id] = states_tick[id]
 
         # save the states of all filtered agents for this tick
         filtered_states.append(states_this_tick)
 
     return filtered_states
 
+def __get_state_delta(agent_id, since_tick, to_tick=None):
+    """ This private function computes which objects in the state of an agent changed between `since_tick` and
+    `to_tick`.
+
+    Parameters
+    ----------
+    agent_id
+        The ID of the agent (or "god") of which to compare the states.
+    since_tick
+        The tick to compare the latest state to, None to return the complete state.
+    to_tick
+        The tick of the latest state, defaults to the current tick.
+    Returns
+        A tuple with a boolean whether the complete state is returned (as `since_tick` is not available), a dictionary
+        with all objects that were added or changed indexed by object ID, and a list with the IDs of removed objects.
+    -------
+    """
+    to_tick = current_tick if to_tick is None else to_tick
+    new_state = states[to_tick][agent_id]['state']
+
+    # fetch the state to compare to, if it is still available
+    old_state = None
+    if since_tick is not None and states.oldest_tick <= since_tick <= to_tick:
+        try:
+            old_state = states[since_tick][agent_id]['state']
+        except (KeyError, IndexError):
+            # the agent did not exist yet, or the tick was evicted in the meantime
+            pass
+
+    if old_state is None:
+        return True, {obj_id: obj for obj_id, obj in new_state.items() if obj_id != "World"}, []
+
+    # objects whose properties did not change are often the same (cached) dictionary, so check that first
+    changed = {obj_id: obj for obj_id, obj in new_state.items()
+               if obj_id != "World" and (obj_id not in old_state or
+                                         (old_state[obj_id] is not obj and old_state[obj_id] != obj))}
+    removed = [obj_id for obj_id in old_state.keys() if obj_id not in new_state]
+
+    return False, changed, removed
+
+
+def __get_stream_event(agent_id, since_tick, mssgs_from):
+    """ This private function creates the serialized "state" event of a state stream, with the changes in the latest
+    state of an agent since `since_tick` and the messages since tick `mssgs_from`.
+    """
+    to_tick = len(states) - 1
+    full, changed, removed = __get_state_delta(agent_id, since_tick, to_tick)
+
+    update = {"matrxs_paused": matrxs_paused, "tick": to_tick, "full": full,
+              "World": states[to_tick][agent_id]['state']['World'], "changed": changed, "removed": removed,
+              "messages": gw_message_manager.fetch_messages(mssgs_from, current_tick, agent_id),
+              "chatrooms": gw_message_manager.fetch_chatrooms(agent_id)}
+
+    if world_done:
+        update["world_completed"] = world_done
+        update["completion_data"] = world_completion_data
+
+    return b"event: state\ndata: " + encode_json(update) + b"\n\n"
+
+
+def __get_status_event():
+    """ This private function creates the serialized "status" event of a state stream, with the MATRX status. """
+    status = {"matrxs_paused": matrxs_paused, "world_completed": world_done, "completion_data": world_completion_data}
+    return b"event: status\ndata: " + encode_json(status) + b"\n\n"
+
+
+def encode_json(obj):
+    """ Encodes an object to JSON (bytes), using orjson if it is installed.
+
+    Parameters
+    ----------
+    obj
+        The object to encode, e.g. a state.
+    Returns
+        The JSON encoded object as bytes.
+    -------
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(',', ':')).encode("utf-8")
+
+
+def __get_encoded_states(ids, tick):
+    """ This private function returns the states of the given agents at `tick` as JSON, in the same format as
+    :func:`~matrxs.API.api.get_states_specific_agents`. The state of each agent is encoded only once per tick.
+
+    Parameters
+    ----------
+    ids
+        List of IDs from agents/god for which to return the states.
+    tick
+        The tick of the states.
+    Returns
+        The JSON encoded states as bytes.
+    -------
+    """
+    global encoded_states, encoded_states_tick
+
+    encoded = []
+    for agent_id in ids:
+        with encoded_states_lock:
+            # forget the encoded states of the previous tick
+            if encoded_states_tick != (current_world_ID, tick):
+                encoded_states = {}
+                encoded_states_tick = (current_world_ID, tick)
+            agent_json = encoded_states.get(agent_id, None)
+
+        # encode the state outside the lock, at worst two requests of the same tick both encode it
+        if agent_json is None:
+            agent_json = encode_json(states[tick][agent_id])
+            with encoded_states_lock:
+                if encoded_states_tick == (current_world_ID, tick):
+                    encoded_states[agent_id] = agent_json
+
+        encoded.append(encode_json(agent_id) + b':' + agent_json)
+
+    return b'[{' + b','.join(encoded) + b'}]'
+
+
+def __encoded_response(body, etag):
+    """ This private function creates a response with an already JSON encoded body and an ETag, or an empty 304
+    (Not Modified) response if `body` is None.
+    """
+    if body is None:
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    # make browsers check with us every time, sending the ETag along
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
 def create_error_response(code, message):
     """ Creates an error code with a custom message """
     response = jsonify({'message': message})
@@ -693,13 +1100,29 @@ def __reorder_state(state):
     for objID, obj in state.items():
 
         if not objID is "World":
-            # make the sense capability JSON serializable
+            # make the sense capability JSON serializable (on a copy, as the object properties are read-only)
             if "sense_capability" in obj:
-                new_state[objID]["sense_capability"] = str(obj["sense_capability"])
+                # the read-only properties of an object are the same for all agents that perceive it, so we only
+                # need to make one serializable copy of them this tick
+                if isinstance(obj, ReadOnlyDict):
+                    reordered = reordered_objects.get(id(obj), None)
+                    if reordered is None or reordered[0] is not obj:
+                        reordered = (obj, __make_serializable(obj))
+                        reordered_objects[id(obj)] = reordered
+                    new_state[objID] = reordered[1]
+                else:
+                    new_state[objID] = __make_serializable(obj)
 
     return new_state
 
 
+def __make_serializable(obj):
+    """ This private function returns a copy of an object's properties with a JSON serializable sense capability """
+    new_obj = dict(obj)
+    new_obj["sense_capability"] = str(obj["sense_capability"])
+    return new_obj
+
+
 def add_state(agent_id, state, agent_inheritence_chain, world_settings):
     """ Saves the state of an agent for use via the API
 
@@ -746,6 +1169,31 @@ def next_tick():
     # publicize the states of the previous tick
     states.append(copy.copy(temp_state))
 
+    # the serializable copies are only shared within a tick
+    global reordered_objects
+    reordered_objects = {}
+
+
+def push_tick():
+    """ Push the update of the latest tick to all clients subscribed to a state stream. The update of each view is
+    created and serialized once, and the same bytes are sent to all subscribers of that view.
+    -------
+    """
+    global last_streamed_tick, last_streamed_messages_tick
+
+    # the subscribers have at most the state of the previous tick, if nothing was pushed yet
+    since_tick = len(states) - 2 if last_streamed_tick is None else last_streamed_tick
+
+    for agent_id in state_stream.views():
+        # skip views of agents that no longer exist
+        if agent_id not in states[-1]:
+            continue
+        state_stream.publish(agent_id, __get_stream_event(agent_id, since_tick=since_tick,
+                                                          mssgs_from=last_streamed_messages_tick + 1))
+
+    last_streamed_tick = len(states) - 1
+    last_streamed_messages_tick = current_tick
+
 
 def pop_userinput(agent_id):
     """ Pop the user input for an agent from the userinput dictionary and return it
@@ -763,15 +1211,30 @@ def pop_userinput(agent_id):
     return userinput.pop(agent_id, None)
 
 
-def reset_api():
-    """ Reset the MATRXS API variables """
+def reset_api(retention=None, spill_dir=None):
+    """ Reset the MATRXS API variables
+
+    Parameters
+    ----------
+    retention
+        The number of most recent ticks of which the states are kept in memory. None (default) keeps all ticks.
+    spill_dir
+        Directory to which the states of older ticks are written, so they can still be requested. None (default)
+        discards them.
+    -------
+    """
     global temp_state, userinput, matrxs_paused, matrxs_done, states, current_tick, tick_duration, grid_size
     global MATRXS_info, next_tick_info, received_messages, current_world_ID
+    global last_streamed_tick, last_streamed_messages_tick
     temp_state = {}
     userinput = {}
     matrxs_paused = False
     matrxs_done = False
-    states = []
+    states = StateHistory(retention=retention, spill_dir=spill_dir)
+    # end all state streams, their clients reconnect to the new world
+    state_stream.close()
+    last_streamed_tick = None
+    last_streamed_messages_tick = -1
     current_tick = 0
     tick_duration = 0.0
     grid_size = [1, 1]
@@ -817,6 +1280,10 @@ def world_completed(completion_data):
     world_completion_data = completion_data
     world_done = True
 
+    # let any streaming clients know right away
+    for agent_id in state_stream.views():
+        state_stream.publish(agent_id, __get_status_event())
+
 #########################################################################
 # API Flask methods
 #########################################################################
@@ -0,0 +1,141 @@
+import gzip
+import json
+import os
+import threading
+from collections import deque
+
+
+class StateEvictedError(KeyError):
+    """ Raised when the states of a tick are requested that are no longer kept by a StateHistory. """
+    pass
+
+
+class StateHistory:
+    """ The history of the states published by the API, one entry (a dictionary of states indexed by agent ID) per
+    tick.
+
+    Only the states of the last `retention` ticks are kept in memory. States that fall out of this window are either
+    discarded or, if a `spill_dir` is given, written to disk as one gzipped (compact) JSON file per tick, from where
+    they can still be read. The history can be indexed like the list it replaces; `history[tick]` returns the states
+    of that tick from memory or disk, and raises a StateEvictedError for ticks that are no longer available.
+
+    The GridWorld appends the states of each tick from its own thread, while the API reads them from the Flask thread.
+    As such, all access to the in-memory buffer is guarded by a lock.
+    """
+
+    def __init__(self, retention=None, spill_dir=None):
+        """
+        Parameters
+        ----------
+        retention : int, optional
+            The number of most recent ticks of which the states are kept in memory. None (default) keeps all ticks in
+            memory.
+        spill_dir : str, optional
+            Directory in which the states of ticks that fall out of the retention window are stored. None (default)
+            discards them instead.
+        """
+        if retention is not None and (not isinstance(retention, int) or retention < 1):
+            raise ValueError(f"The state retention {retention} should be None or an int of at least 1.")
+
+        self.__retention = retention
+        self.__spill_dir = spill_dir
+        self.__buffer = deque()  # the states of the most recent ticks, oldest first
+        self.__first_tick = 0  # the tick of the oldest states in memory
+        self.__first_spilled_tick = None  # the tick of the oldest states on disk, None if nothing was spilled
+        self.__lock = threading.Lock()
+
+        if self.__spill_dir is not None:
+            os.makedirs(self.__spill_dir, exist_ok=True)
+
+    def append(self, tick_states):
+        """ Add the states of the next tick, evicting the oldest tick in memory if it falls out of the retention
+        window.
+
+        Parameters
+        ----------
+        tick_states : dict
+            The states of all agents (and the god view) of this tick, indexed by agent ID.
+        """
+        with self.__lock:
+            self.__buffer.append(tick_states)
+
+        while self.__retention is not None and len(self.__buffer) > self.__retention:
+            # Write the states to disk before removing them from memory, so they are always available from one of both
+            if self.__spill_dir is not None:
+                self.__spill(self.__first_tick, self.__buffer[0])
+                if self.__first_spilled_tick is None:
+                    self.__first_spilled_tick = self.__first_tick
+            with self.__lock:
+                self.__buffer.popleft()
+                self.__first_tick += 1
+
+    @property
+    def spill_dir(self):
+        """ The directory to which the states of older ticks are written, or None if they are discarded. """
+        return self.__spill_dir
+
+    @property
+    def oldest_tick(self):
+        """ The oldest tick of which the states are still available, either in memory or on disk. """
+        if self.__first_spilled_tick is not None:
+            return self.__first_spilled_tick
+        return self.__first_tick
+
+    def get_range(self, start_tick, end_tick=None):
+        """ Returns a list with the states of all ticks from start_tick up to and including end_tick.
+
+        Parameters
+        ----------
+        start_tick : int
+            The first tick.
+        end_tick : int, optional
+            The last tick. Defaults to the latest tick.
+
+        Returns
+        -------
+        list
+            The states of each tick, read from memory or disk.
+
+        Raises
+        ------
+        StateEvictedError
+            When the states of any of these ticks are no longer available.
+        """
+        end_tick = len(self) - 1 if end_tick is None else end_tick
+        return [self[tick] for tick in range(start_tick, end_tick + 1)]
+
+    def __getitem__(self, tick):
+        with self.__lock:
+            nr_ticks = self.__first_tick + len(self.__buffer)
+            if tick < 0:
+                tick += nr_ticks
+            if tick >= nr_ticks or tick < 0:
+                raise IndexError(f"No states exist for tick {tick}, the latest tick is {nr_ticks - 1}.")
+            if tick >= self.__first_tick:
+                return self.__buffer[tick - self.__first_tick]
+
+        if self.__first_spilled_tick is not None and tick >= self.__first_spilled_tick:
+            return self.__load(tick)
+
+        raise StateEvictedError(f"The states of tick {tick} have been evicted from the state history, which only "
+                                f"keeps the last {self.__retention} ticks. The oldest available tick is "
+                                f"{self.oldest_tick}.")
+
+    def __len__(self):
+        return self.__first_tick + len(self.__buffer)
+
+    def __spill_file(self, tick):
+        return os.path.join(self.__spill_dir, f"states_{tick}.json.gz")
+
+    def __spill(self, tick, tick_states):
+        with gzip.open(self.__spill_file(tick), "wt", encoding="utf-8", compresslevel=1) as f:
+            # store anything that is not JSON serializable as a string, jsonify would not be able to send it either
+            json.dump(tick_states, f, separators=(',', ':'), default=str)
+
+    def __load(self, tick):
+        try:
+            with gzip.open(self.__spill_file(tick), "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise StateEvictedError(f"The states of tick {tick} were written to {self.__spill_file(tick)}, but this "
+                                    f"file no longer exists.")
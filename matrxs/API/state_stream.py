@@ -0,0 +1,96 @@
+import queue
+import threading
+
+
+class StateStream:
+    """ Fans out the updates of each view (an agent ID or "god") to all clients that subscribed to it.
+
+    Every subscriber gets its own queue, from which the API streams the (already serialized) events to the client.
+    The API serializes the update of a view once per tick and publishes the same bytes to every subscriber of that
+    view. Views without subscribers are not serialized at all.
+
+    A client that does not keep up with the ticks is disconnected once its queue is full, after which it can reconnect
+    and receive the complete state again.
+    """
+
+    def __init__(self, max_queue_size=100):
+        """
+        Parameters
+        ----------
+        max_queue_size : int, optional
+            The maximum number of events waiting to be sent to a single subscriber. Defaults to 100.
+        """
+        self.__max_queue_size = max_queue_size
+        self.__subscribers = {}  # view -> list of subscriber queues
+        self.__lock = threading.Lock()
+
+    def subscribe(self, view, get_first_event):
+        """ Subscribe to the updates of a view.
+
+        Parameters
+        ----------
+        view : str
+            The agent ID (or "god") of the view to subscribe to.
+        get_first_event : callable
+            Returns the first event (bytes) to send to the subscriber, normally the complete state of the view. It is
+            called while no updates can be published, so the subscriber does not miss any update after it.
+
+        Returns
+        -------
+        Queue
+            The queue from which to read the events. None signals the end of the stream.
+        """
+        subscription = queue.Queue(maxsize=self.__max_queue_size)
+        with self.__lock:
+            subscription.put_nowait(get_first_event())
+            self.__subscribers.setdefault(view, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, view, subscription):
+        """ Remove a subscription, does nothing if it was already removed. """
+        with self.__lock:
+            if subscription in self.__subscribers.get(view, []):
+                self.__subscribers[view].remove(subscription)
+                if len(self.__subscribers[view]) == 0:
+                    del self.__subscribers[view]
+
+    def views(self):
+        """ Returns a list of all views that have at least one subscriber. """
+        with self.__lock:
+            return list(self.__subscribers.keys())
+
+    def publish(self, view, event):
+        """ Send an event to every subscriber of a view.
+
+        Parameters
+        ----------
+        view : str
+            The agent ID (or "god") of the view.
+        event : bytes
+            The serialized event, shared by all subscribers.
+        """
+        with self.__lock:
+            for subscription in list(self.__subscribers.get(view, [])):
+                try:
+                    subscription.put_nowait(event)
+                except queue.Full:
+                    # this client does not keep up, end its stream so it can reconnect
+                    self.__subscribers[view].remove(subscription)
+                    self.__end(subscription)
+            if view in self.__subscribers and len(self.__subscribers[view]) == 0:
+                del self.__subscribers[view]
+
+    def close(self):
+        """ End the streams of all subscribers, e.g. because a new world starts. """
+        with self.__lock:
+            for subscriptions in self.__subscribers.values():
+                for subscription in subscriptions:
+                    self.__end(subscription)
+            self.__subscribers = {}
+
+    @staticmethod
+    def __end(subscription):
+        # discard any events that were not sent yet, and signal the end of the stream
+        with subscription.mutex:
+            subscription.queue.clear()
+        subscription.put_nowait(None)
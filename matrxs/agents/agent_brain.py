@@ -4,7 +4,8 @@ import random
 
 from matrxs.actions.door_actions import *
 from matrxs.actions.object_actions import *
-from matrxs.utils.message import Message
+from matrxs.utils.inbox import Inbox, InboxContents
+from matrxs.utils.message import Message, MessageEnvelope
 
 class AgentBrain:
 
@@ -30,6 +31,10 @@ class AgentBrain:
         All other AgentBrains should inherit from this class if you want to make you own (smarter) agents. This agent
         simply randomly selects an action from the possible actions it can do.
 
+        The messages an agent receives are kept in self.inbox, an Inbox that keeps all messages. Assign another Inbox
+        to it in the constructor to only keep a number of messages, or those of a number of ticks. Use
+        self.inbox.new_messages to only process the messages received since the agent last decided on an action.
+
         """
 
         # Class variables for tracking the past action and its result
@@ -39,7 +44,7 @@ class AgentBrain:
         # A list of messages that may be filled by this agent, which is retrieved by the GridWorld and send towards the
         # appropriate agents.
         self.messages_to_send = []
-        self.received_messages = []
+        self.inbox = Inbox()
 
         # Filled by the WorldFactory during self.factory_initialise()
         self.agent_id = None
@@ -124,7 +129,7 @@ class AgentBrain:
         agents = []
         for obj_id, obj in state.items():
 
-            if obj_id is "World":  # Skip the world properties
+            if obj_id == "World":  # Skip the world properties
                 continue
 
             classes = obj['class_inheritance']
@@ -377,6 +382,9 @@ class AgentBrain:
         # Call the method that decides on an action
         action, action_kwargs = self.decide_on_action(filtered_state)
 
+        # All received messages have been seen by the agent now
+        self.inbox.mark_read()
+
         # Store the action so in the next call the agent still knows what it did
         self.previous_action = action
 
@@ -492,35 +500,39 @@ class AgentBrain:
 
         return send_messages
 
-    def _set_messages(self, messages=None):
+    @property
+    def received_messages(self):
+        """ The content of all messages kept in the inbox, oldest first. Clearing, appending to or deleting from it
+        changes the inbox, and assigning a list to it replaces the messages in the inbox with its content. """
+        return InboxContents(self.inbox)
+
+    @received_messages.setter
+    def received_messages(self, contents):
+        contents = list(contents)  # it may be a view of the inbox itself
+        self.inbox.clear()
+        self.received_messages.extend(contents)
+
+    def _set_messages(self, messages=None, tick=None):
         """
         This method is called by the GridWorld.
-        It sets all messages intended for this agent to a list that it can access and read.
+        It adds all messages intended for this agent to its inbox, in which it can access and read them.
 
         Note; This method should NOT be overridden!
 
-        :param messages: A list of dictionaries that contain a 'from_id', 'to_id' and 'content.
-        If messages is set to None (or no messages are used as input), only the previous messages are removed
+        :param messages: A list of MessageEnvelope objects, each shared with all other receivers of that message.
+        :param tick: The tick at which the messages are received.
         """
-
-        # We empty all received messages as this is from the previous tick
-        # self.received_messages = []
-
-        # Loop through all messages and create a Message object out of the dictionaries.
+        # Loop through all messages and add the shared envelopes to the inbox
         for mssg in messages:
 
             # Check if the message is of type Message (its content contains the actual message)
             AgentBrain.__check_message(mssg, self.agent_id)
 
-            # Since each message is secretly wrapped inside a Message (as its content), we unpack its content and
-            # set that as the actual received message.
-            received_message = mssg.content
-
-            # Add the message object to the received messages
-            self.received_messages.append(received_message)
+            # Add the message to the inbox, which forgets the oldest messages
+            self.inbox.add(mssg, tick)
 
     @staticmethod
     def __check_message(mssg, this_agent_id):
-        if not isinstance(mssg, Message):
+        if not isinstance(mssg, (Message, MessageEnvelope)):
             raise Exception(f"A message to {this_agent_id} is not, nor inherits from, the class {Message.__name__}."
                             f" This is required for agents to be able to send and receive them.")
@@ -101,6 +101,9 @@ class HumanAgentBrain(AgentBrain):
         # Call the method that decides on an action
         action, action_kwargs = self.decide_on_action(filtered_state, usrinput)
 
+        # All received messages have been seen by the agent now
+        self.inbox.mark_read()
+
         # Store the action so in the next call the agent still knows what it did
         self.previous_action = action
 
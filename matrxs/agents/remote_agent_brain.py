@@ -0,0 +1,524 @@
+import itertools
+import multiprocessing
+import os
+import pickle
+import queue
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+from matrxs.agents.agent_brain import AgentBrain
+
+# Every frame sent over a connection is the length of its payload (4 bytes, big-endian) followed by the payload, which
+# is a pickled batch of calls or their results. Pickle is a compact binary encoding that supports everything a state,
+# message or action result may contain (e.g. numpy arrays), but may only be used between trusted processes.
+_HEADER = struct.Struct("!I")
+
+# The methods of a brain a BrainServer may call, next to "create" which adds a brain to the server
+_REMOTE_METHODS = frozenset(["initialize", "filter_observations", "_get_action", "_get_log_data", "_set_messages",
+                             "_set_action_result"])
+
+
+def _encode_frame(obj):
+    payload = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    return _HEADER.pack(len(payload)) + payload
+
+
+def _action_possible_unavailable(agent_id, action, action_kwargs):
+    raise Exception(f"Agent {agent_id} called is_action_possible while deciding in a BrainServer, where the GridWorld "
+                    f"is not available.")
+
+
+class _FrameReader:
+    """ Reads frames from a socket. Data received before a timeout is kept, such that the next read continues with the
+    same frame. """
+
+    def __init__(self, sock):
+        self.__socket = sock
+        self.__buffer = bytearray()
+
+    def read(self, timeout=None):
+        """ Returns the decoded payload of the next frame. Raises a TimeoutError if no complete frame was received
+        within timeout seconds, and a ConnectionError when the other side closed the connection. A timeout of 0 only
+        reads the data that was already received. """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if len(self.__buffer) >= _HEADER.size:
+                (length,) = _HEADER.unpack_from(self.__buffer)
+                if len(self.__buffer) >= _HEADER.size + length:
+                    payload = bytes(self.__buffer[_HEADER.size:_HEADER.size + length])
+                    del self.__buffer[:_HEADER.size + length]
+                    return pickle.loads(payload)
+
+            # a timeout of 0 makes the socket non-blocking
+            self.__socket.settimeout(None if deadline is None else max(deadline - time.monotonic(), 0.))
+            try:
+                chunk = self.__socket.recv(1 << 16)
+            except (socket.timeout, BlockingIOError):
+                raise TimeoutError(f"No response was received within {timeout} seconds.")
+            if len(chunk) == 0:
+                raise ConnectionError("The connection was closed by the other side.")
+            self.__buffer += chunk
+
+
+class BrainServer:
+    """ Hosts agent brains in their own process, for RemoteAgentBrain proxies that connect to it over a Unix socket.
+
+    A server is normally started by a RemoteBrainConnection, in a new process that stops when the connection is closed.
+    It can also be started separately, e.g. on a machine's other cores, with:
+
+        python -m matrxs.agents.remote_agent_brain /path/to/socket
+
+    after which RemoteBrainConnection("/path/to/socket") connects to it. The modules that define the hosted brains
+    should be importable by the server. The server handles one connection at a time, and forgets the brains of a
+    connection when it is closed.
+
+    Each brain handles its calls in order in its own thread, such that a brain that takes long to decide does not keep
+    the other brains of a connection from responding. The results are sent back as soon as they are available, those
+    that are available at the same time in a single frame.
+    """
+
+    def __init__(self, address):
+        """
+        Parameters
+        ----------
+        address : str
+            The path of the Unix socket to listen on.
+        """
+        self.__address = address
+
+    def serve(self, once=False):
+        """ Accepts connections and handles their calls, until the process is stopped or, if once, the first
+        connection is closed. """
+        if os.path.exists(self.__address):
+            os.remove(self.__address)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            listener.bind(self.__address)
+            listener.listen(1)
+            while True:
+                connection, _ = listener.accept()
+                with connection:
+                    self.__handle_connection(connection)
+                if once:
+                    return
+        finally:
+            listener.close()
+            if os.path.exists(self.__address):
+                os.remove(self.__address)
+
+    def __handle_connection(self, connection):
+        brains = {}  # brain id -> brain
+        brain_calls = {}  # brain id -> queue of the calls its thread still has to handle
+        results = queue.Queue()
+        sender = threading.Thread(target=self.__send_results, args=(connection, results), daemon=True)
+        sender.start()
+
+        reader = _FrameReader(connection)
+        try:
+            while True:
+                try:
+                    batch = reader.read()
+                except ConnectionError:
+                    return
+                for call in batch:
+                    brain_id = call[1]
+                    if brain_id not in brain_calls:
+                        brain_calls[brain_id] = queue.Queue()
+                        threading.Thread(target=self.__handle_calls, args=(brains, brain_calls[brain_id], results),
+                                         daemon=True, name=f"brain_{brain_id}").start()
+                    brain_calls[brain_id].put(call)
+        finally:
+            # stop the threads once they are done with their current call
+            for calls in brain_calls.values():
+                calls.put(None)
+            results.put(None)
+            sender.join()
+
+    def __handle_calls(self, brains, calls, results):
+        # handles the calls of one brain, until None is received
+        while True:
+            call = calls.get()
+            if call is None:
+                return
+            results.put(self.__handle_call(brains, *call))
+
+    @staticmethod
+    def __send_results(connection, results):
+        # sends all results available at the same time in one frame, until None is received
+        while True:
+            batch = [results.get()]
+            while True:
+                try:
+                    batch.append(results.get_nowait())
+                except queue.Empty:
+                    break
+            is_done = None in batch
+            batch = [result for result in batch if result is not None]
+            if len(batch) > 0:
+                try:
+                    connection.sendall(_encode_frame(batch))
+                except OSError:
+                    return  # the connection was closed
+            if is_done:
+                return
+
+    @staticmethod
+    def __handle_call(brains, request_id, brain_id, method_name, kwargs):
+        # Returns the request id, whether the call succeeded, and the result and the messages the brain sent meanwhile
+        # or the formatted exception
+        try:
+            if method_name == "create":
+                brain = kwargs["brain"]
+                brain._factory_initialise(**kwargs["factory_kwargs"],
+                                          callback_is_action_possible=_action_possible_unavailable)
+                brains[brain_id] = brain
+                return request_id, True, (None, [])
+
+            if method_name not in _REMOTE_METHODS:
+                raise Exception(f"The method {method_name} cannot be called on a remote brain.")
+            brain = brains[brain_id]
+            result = getattr(brain, method_name)(**kwargs)
+            messages = brain.messages_to_send
+            brain.messages_to_send = []
+            return request_id, True, (result, messages)
+        except Exception:
+            return request_id, False, traceback.format_exc()
+
+
+def _serve(address):
+    BrainServer(address).serve(once=True)
+
+
+class RemoteCall:
+    """ A call to a remote brain that was submitted to a RemoteBrainConnection, of which the result may not be in
+    yet. """
+
+    def __init__(self, connection, request_id, method_name, kwargs):
+        self.connection = connection
+        self.request_id = request_id
+        self.method_name = method_name
+        self.kwargs = kwargs
+
+    def result(self, timeout=None):
+        """ Waits at most timeout seconds for the result, see RemoteBrainConnection.get_result. """
+        return self.connection.get_result(self, timeout=timeout)
+
+
+class RemoteBrainConnection:
+    """ A connection to a BrainServer, shared by the RemoteAgentBrain proxies of all brains that server hosts.
+
+    Calls are not sent one by one; they are queued until a result is waited for, after which the queued calls of all
+    connections are sent, each connection sending all its calls in a single frame. As such, when the decision pool of a
+    GridWorld evaluates all brains at once (see WorldBuilder's concurrent_decisions), every connection only needs a
+    single round trip per tick, and the servers of different connections decide at the same time. To use more
+    processors, divide the brains over several connections.
+
+    A call that is not done within its timeout is not cancelled; its result is kept until it is waited for again or the
+    call is abandoned. As the server handles the calls of each brain in its own thread, the other brains of the
+    connection continue to respond meanwhile.
+    """
+
+    # The connections with calls that were not sent yet
+    __connections_with_queued_calls = set()
+    __queued_lock = threading.Lock()
+
+    def __init__(self, address=None, connect_timeout=10.0):
+        """
+        Parameters
+        ----------
+        address : str, optional
+            The path of the Unix socket of a running BrainServer. Defaults to None, which starts a new BrainServer in
+            its own process that stops when this connection is closed.
+        connect_timeout : float, optional
+            The number of seconds to keep trying to connect to the server. Defaults to 10.
+        """
+        self.__server_process = None
+        if address is None:
+            address = os.path.join(tempfile.mkdtemp(prefix="matrxs_brains_"), "brains.sock")
+            self.__server_process = multiprocessing.Process(target=_serve, args=(address,), daemon=True,
+                                                            name="matrxs_brain_server")
+            self.__server_process.start()
+        self.address = address
+
+        # Connect, while the server may still be starting
+        self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        deadline = time.monotonic() + connect_timeout
+        while True:
+            try:
+                self.__socket.connect(address)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() > deadline:
+                    self.__socket.close()
+                    raise
+                time.sleep(0.01)
+
+        self.__reader = _FrameReader(self.__socket)
+        self.__lock = threading.RLock()  # only one thread sends or reads at a time
+        self.__request_ids = itertools.count()
+        self.__queued_calls = []  # (request id, brain id, method name, kwargs) of calls not sent yet
+        self.__results = {}  # request id -> (succeeded, result) of results not asked for yet
+        self.__unchecked = set()  # request ids of calls of which the result is only checked for errors
+        self.__abandoned = set()  # request ids of calls of which the result is discarded
+        self.nr_round_trips = 0  # the number of frames of calls sent
+
+    def submit(self, brain_id, method_name, kwargs, wait=True):
+        """ Queues a call of a method of a hosted brain.
+
+        Parameters
+        ----------
+        brain_id : str
+            The ID of the brain, the agent ID of its proxy.
+        method_name : str
+            The name of the method.
+        kwargs : dict
+            The keyword arguments of the call.
+        wait : bool, optional
+            Whether the result will be waited for. If not, the result is discarded, but an exception in the call is
+            raised at the next result that is waited for. Defaults to True.
+
+        Returns
+        -------
+        RemoteCall
+            The call, of which the result is obtained with get_result.
+        """
+        with self.__lock:
+            request_id = next(self.__request_ids)
+            self.__queued_calls.append((request_id, brain_id, method_name, kwargs))
+            if not wait:
+                self.__unchecked.add(request_id)
+        with RemoteBrainConnection.__queued_lock:
+            RemoteBrainConnection.__connections_with_queued_calls.add(self)
+        return RemoteCall(self, request_id, method_name, kwargs)
+
+    def get_result(self, call, timeout=None):
+        """ Sends all queued calls of all connections, and waits for the result of a call.
+
+        Parameters
+        ----------
+        call : RemoteCall
+            The call, as returned by submit.
+        timeout : float, optional
+            The number of seconds to wait at most. Defaults to None, which waits as long as it takes.
+
+        Returns
+        -------
+        tuple
+            The result of the call and the messages the brain sent during it.
+
+        Raises
+        ------
+        TimeoutError
+            If the result was not received in time. The call continues, and its result can be waited for again or
+            discarded (see abandon).
+        Exception
+            If the call (or an earlier call of which the result was not waited for) raised an exception.
+        """
+        RemoteBrainConnection.flush_all()
+
+        with self.__lock:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while call.request_id not in self.__results:
+                remaining = None if deadline is None else max(deadline - time.monotonic(), 0.)
+                try:
+                    responses = self.__reader.read(timeout=remaining)
+                except TimeoutError:
+                    raise TimeoutError(f"The remote brain did not respond to {call.method_name} within {timeout} "
+                                       f"seconds.")
+                for request_id, succeeded, result in responses:
+                    self.__store_result(request_id, succeeded, result)
+
+            succeeded, result = self.__results.pop(call.request_id)
+            if not succeeded:
+                raise Exception(f"The remote brain raised an exception in {call.method_name}:\n{result}")
+            return result
+
+    def abandon(self, call):
+        """ Discards the result of a call, now if it was received or otherwise once it comes in. """
+        with self.__lock:
+            if self.__results.pop(call.request_id, None) is None:
+                self.__abandoned.add(call.request_id)
+
+    def flush(self):
+        """ Sends all queued calls in a single frame. """
+        with self.__lock:
+            if len(self.__queued_calls) > 0:
+                self.__socket.sendall(_encode_frame(self.__queued_calls))
+                self.__queued_calls = []
+                self.nr_round_trips += 1
+
+    @classmethod
+    def flush_all(cls):
+        """ Sends the queued calls of all connections, such that their servers handle them at the same time. """
+        with cls.__queued_lock:
+            connections = list(cls.__connections_with_queued_calls)
+            cls.__connections_with_queued_calls.clear()
+        for connection in connections:
+            connection.flush()
+
+    def close(self):
+        """ Closes the connection, which also stops the server if it was started by this connection. """
+        self.__socket.close()
+        if self.__server_process is not None:
+            self.__server_process.join(timeout=5.0)
+            self.__server_process = None
+
+    def __store_result(self, request_id, succeeded, result):
+        if request_id in self.__abandoned:
+            self.__abandoned.remove(request_id)
+        elif request_id in self.__unchecked:
+            self.__unchecked.remove(request_id)
+            if not succeeded:
+                raise Exception(f"The remote brain raised an exception:\n{result}")
+        else:
+            self.__results[request_id] = (succeeded, result)
+
+
+class RemoteAgentBrain(AgentBrain):
+    """ A proxy of an agent brain that is hosted by a BrainServer in another process.
+
+    The proxy is added to a world like any other brain, and sends each call of the GridWorld (with the state of the
+    agent) to the hosted brain, which returns the filtered state, action and any messages it sent. Received messages and
+    action results are sent along with the next call instead of on their own. The hosted brain cannot use
+    is_action_possible, as the GridWorld is not available in its process.
+
+    Each decision waits at most `timeout` seconds for the hosted brain. When it takes longer, the agent idles that tick
+    while the hosted brain continues deciding, like an agent that exceeds its decision budget. No new decision is
+    started until that one is done; the next ticks wait at most `timeout` seconds for it as well, and perform its action
+    once it is done.
+
+    Examples
+    --------
+    Two planning agents of which the brains run in a separate process, in which case the GridWorld sends the states of
+    both agents in a single frame when it evaluates their brains at once:
+
+    >>> connection = RemoteBrainConnection()
+    >>> builder = WorldBuilder(shape=[20, 20], concurrent_decisions="thread")
+    >>> builder.add_agent((0, 0), RemoteAgentBrain(PlanningAgentBrain(), connection, timeout=0.5), name="planner_1")
+    >>> builder.add_agent((0, 1), RemoteAgentBrain(PlanningAgentBrain(), connection, timeout=0.5), name="planner_2")
+    """
+
+    def __init__(self, brain, connection, timeout=None):
+        """
+        Parameters
+        ----------
+        brain : AgentBrain
+            The brain to host, which is sent to the server when the agent is added to a world.
+        connection : RemoteBrainConnection
+            The connection to the server that hosts the brain.
+        timeout : float, optional
+            The number of seconds a decision of the hosted brain may take, after which the agent idles for that tick.
+            Defaults to None, which waits as long as it takes.
+        """
+        super().__init__()
+        if not isinstance(brain, AgentBrain):
+            raise ValueError(f"The given brain should be of type {AgentBrain.__name__} but is of type "
+                             f"{brain.__class__.__name__}.")
+        if timeout is not None and (not isinstance(timeout, (int, float)) or timeout <= 0):
+            raise ValueError(f"The given timeout {timeout} should be None or a number of seconds larger than 0.")
+
+        self.__brain = brain
+        self.__connection = connection
+        self.__timeout = timeout
+        self.__late_decision = None  # the call of the decision that is still in progress after its timeout
+        self.__decision_properties = {}  # the agent properties the last started decision was given
+        self.__filtered_state = None  # the filtered state of the last decision
+        self.__log_data = {}  # the log data last received
+        self.nr_timeouts = 0  # the number of ticks the agent idled because the hosted brain was still deciding
+
+    def _factory_initialise(self, agent_name, agent_id, action_set, sense_capability, agent_properties,
+                            customizable_properties, rnd_seed, callback_is_action_possible):
+        super()._factory_initialise(agent_name=agent_name, agent_id=agent_id, action_set=action_set,
+                                    sense_capability=sense_capability, agent_properties=agent_properties,
+                                    customizable_properties=customizable_properties, rnd_seed=rnd_seed,
+                                    callback_is_action_possible=callback_is_action_possible)
+
+        # Host the brain, initialized the same way
+        factory_kwargs = {"agent_name": agent_name, "agent_id": agent_id, "action_set": action_set,
+                          "sense_capability": sense_capability, "agent_properties": agent_properties,
+                          "customizable_properties": customizable_properties, "rnd_seed": rnd_seed}
+        self.__call("create", brain=self.__brain, factory_kwargs=factory_kwargs)
+
+    def initialize(self):
+        self.__call("initialize")
+
+    def filter_observations(self, state):
+        return self.__call("filter_observations", state=state)
+
+    def _get_action(self, state, agent_properties, agent_id):
+        return self._get_call_result(self._submit_call("_get_action", state=state, agent_properties=agent_properties,
+                                                       agent_id=agent_id))
+
+    def _get_log_data(self):
+        # the log data may have to wait for a decision still in progress, in which case the last log data is returned
+        call = self._submit_call("_get_log_data")
+        try:
+            self.__log_data = self._get_call_result(call, timeout=self.__timeout)
+        except TimeoutError:
+            self.__connection.abandon(call)
+        return self.__log_data
+
+    def _set_messages(self, messages=None, tick=None):
+        self.__connection.submit(self.agent_id, "_set_messages", {"messages": messages, "tick": tick}, wait=False)
+
+    def _set_action_result(self, action_result):
+        super()._set_action_result(action_result)
+        self.__connection.submit(self.agent_id, "_set_action_result", {"action_result": action_result}, wait=False)
+
+    def _submit_call(self, method_name, **kwargs):
+        """ Queues a call of a method of the hosted brain, and returns the RemoteCall. Used by the decision pool of the
+        GridWorld to send the calls of several brains at once. """
+        if method_name != "_get_action":
+            return self.__connection.submit(self.agent_id, method_name, kwargs)
+
+        if self.__late_decision is None:
+            self.__decision_properties = kwargs["agent_properties"].copy()
+            return self.__connection.submit(self.agent_id, method_name, kwargs)
+
+        # The hosted brain is still deciding, so wait for that decision instead of starting a new one
+        return RemoteCall(self.__connection, self.__late_decision.request_id, method_name, kwargs)
+
+    def _get_call_result(self, call, timeout=None):
+        """ Waits for the result of a call returned by _submit_call; for a decision at most the timeout of the proxy,
+        for other calls at most the given timeout. """
+        if call.method_name != "_get_action":
+            result, messages = call.result(timeout=timeout)
+            self.messages_to_send.extend(messages)
+            return result
+
+        try:
+            result, messages = call.result(timeout=self.__timeout)
+        except TimeoutError:
+            # The agent idles this tick with its properties unchanged, and shows the state of its last decision
+            self.__late_decision = call
+            self.nr_timeouts += 1
+            state = call.kwargs["state"] if self.__filtered_state is None else self.__filtered_state
+            return state, call.kwargs["agent_properties"], None, {}
+        self.__late_decision = None
+
+        # The messages the hosted brain sent are sent by the proxy
+        self.messages_to_send.extend(messages)
+
+        # Only the properties the hosted brain changed are returned, as others may have changed while it was deciding
+        filtered_state, agent_properties, action_class_name, action_kwargs = result
+        changed_properties = {prop: value for prop, value in agent_properties.items()
+                              if prop not in self.__decision_properties or value != self.__decision_properties[prop]}
+        self.agent_properties = {**call.kwargs["agent_properties"], **changed_properties}
+        self.previous_action = action_class_name
+        self.__filtered_state = filtered_state
+        return filtered_state, self.agent_properties, action_class_name, action_kwargs
+
+    def __call(self, method_name, **kwargs):
+        return self._get_call_result(self._submit_call(method_name, **kwargs))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(f"Usage: python -m matrxs.agents.remote_agent_brain <socket path>")
+        sys.exit(1)
+    BrainServer(sys.argv[1]).serve()
@@ -1,5 +1,7 @@
+import concurrent.futures
 import datetime
 import os.path
+import sys
 import warnings
 from collections import OrderedDict
 import time
@@ -10,11 +12,15 @@ import requests
 import gevent
 
 from matrxs.actions.object_actions import *
-from matrxs.logger.logger import GridWorldLogger
+from matrxs.logger.logger import AgentLogData, GridWorldLogger
+from matrxs.utils.tick_profiler import TickProfiler
+from matrxs.utils.tracer import Tracer
+from matrxs.utils.decision_pool import DecisionPool
 from matrxs.objects.env_object import EnvObject
 from matrxs.objects.simple_objects import AreaTile
 from matrxs.utils.utils import get_all_classes
 from matrxs.utils.message_manager import  MessageManager
+from matrxs.utils.spatial_index import SpatialIndex
 from matrxs.API import api
 from matrxs.agents.agent_brain import AgentBrain
 
@@ -22,8 +28,14 @@ from matrxs.agents.agent_brain import AgentBrain
 
 class GridWorld:
 
+    # The phases of a tick, in order, of which the duration is tracked for the throughput report and tick profile
+    TICK_PHASES = ("goal", "logging", "sensing", "decisions", "message_preprocessing", "api", "actions", "messages",
+                   "objects")
+
     def __init__(self, shape, tick_duration, simulation_goal, rnd_seed=1,
-                 visualization_bg_clr="#C2C2C2", visualization_bg_img=None, verbose=False, world_ID=False):
+                 visualization_bg_clr="#C2C2C2", visualization_bg_img=None, verbose=False, world_ID=False,
+                 check_grid_consistency=False, headless=False, message_retention=None, trace_dir=None,
+                 concurrent_decisions=None, decision_workers=None, read_only_states=False):
         self.__tick_duration = tick_duration  # How long each tick should take (process sleeps until thatr time is passed)
         self.__simulation_goal = simulation_goal  # The simulation goal, the simulation end when this/these are reached
         self.__shape = shape  # The width and height of the GridWorld
@@ -31,10 +43,13 @@ class GridWorld:
         self.__visualization_bg_img = visualization_bg_img  # The background image of the visualisation
         self.__verbose = verbose  # Set whether we should print anything or not
         self.world_ID = world_ID # ID of this simulation world
+        self.__check_grid_consistency = check_grid_consistency  # Debug mode; verify the grid after every action
+        self.__headless = headless  # Batch mode; run ticks as fast as possible without pacing, API or tick prints
 
         self.__teams = {} # dictionary with team names (keys), and agents in those teams (values)
         self.__registered_agents = OrderedDict()  # The dictionary of all existing agents in the GridWorld
         self.__environment_objects = OrderedDict()  # The dictionary of all existing objects in the GridWorld
+        self.__spatial_index = SpatialIndex()  # Per-cell and per-class index of all objects and agents, for range queries
 
         # Get all actions within all currently imported files
         self.__all_actions = get_all_classes(Action, omit_super_class=True)
@@ -50,7 +65,27 @@ class GridWorld:
         self.__current_nr_ticks = 0  # The number of tick this GridWorld has ran already
         self.__is_initialized = False  # Whether this GridWorld is already initialized
         self.__message_buffer = {}  # dictionary of messages that need to be send to agents, with receiver ids as keys
-        self.message_manager = MessageManager() # keeps track of all messages and makes them available to the API
+        self.message_manager = MessageManager(retention=message_retention) # keeps track of all messages and makes them available to the API
+        # Total time (in seconds, excluding sleeping) spent in each phase of all ticks so far, for the throughput report
+        self.__phase_durations = OrderedDict((phase, 0.) for phase in self.TICK_PHASES)
+        # Time spent in each phase of the current tick, and the histograms of those and other durations over all ticks
+        self.__tick_phase_durations = OrderedDict((phase, 0.) for phase in self.TICK_PHASES)
+        self.__profiler = TickProfiler()
+        # Optionally, a timeline of the tick phases, agent decisions, actions, logger writes and API requests is traced
+        # and written to trace_dir at the end of the run
+        self.__trace_dir = trace_dir
+        self.__tracer = Tracer(name=self.world_ID) if trace_dir is not None else None
+        # The agents with a decision budget decide in their own thread, of which the decision may still be in progress
+        self.__decision_executors = {}  # agent id -> the ThreadPoolExecutor with the thread in which the agent decides
+        self.__pending_decisions = {}  # agent id -> (Future of its get_action call, the properties it was given)
+        self.__last_filtered_states = {}  # agent id -> its filtered state of its last decision, shown while deciding
+        # Optionally, the brains of all agents are evaluated at once by a pool of threads or processes
+        self.__concurrent_decisions = concurrent_decisions  # None (sequential), DecisionPool.THREAD or .PROCESS
+        self.__decision_workers = decision_workers  # the number of threads or processes of the pool
+        self.__decision_pool = None  # created at the first tick (of each run) in concurrent mode
+        self.__unprocessed_agent_properties = OrderedDict()  # agent id -> properties at the start of the decisions
+        # Whether agents receive the shared read-only properties of the objects they perceive, or a mutable copy
+        self.__read_only_states = read_only_states
 
     def initialize(self, api_info):
         # Only initialize when we did not already do so
@@ -61,12 +96,18 @@ class GridWorld:
             for agent_body in self.__registered_agents.values():
                 agent_body.brain_initialize_func()
 
+            if self.__tracer is not None:
+                self.__trace_agents_and_loggers()
+
             # set the API variables
             self.api_info = api_info
-            self.__run_matrxs_api = self.api_info['run_matrxs_api']
+            self.__run_matrxs_api = self.api_info['run_matrxs_api'] and not self.__headless
             if self.__run_matrxs_api:
-                # initialize this world in the API
-                api.reset_api()
+                # initialize this world in the API, with its own directory for any states spilled to disk
+                spill_dir = self.api_info.get('state_spill_dir', None)
+                if spill_dir is not None:
+                    spill_dir = os.path.join(spill_dir, str(self.world_ID))
+                api.reset_api(retention=self.api_info.get('state_retention', None), spill_dir=spill_dir)
                 api.tick_duration = self.__tick_duration
                 api.register_world(self.world_ID)
                 api.current_tick = self.__current_nr_ticks
@@ -74,19 +115,13 @@ class GridWorld:
                 # point the API towards our message manager, for making messages available via the API
                 api.gw_message_manager = self.message_manager
                 api.teams = self.__teams
+                # and towards our profiler, for making the tick metrics available via the API
+                api.gw_profiler = self.__profiler
+                # and towards our tracer (if any), for tracing the handled requests
+                api.gw_tracer = self.__tracer
 
                 # init API with world info
-                api.MATRXS_info =  {
-                    "nr_ticks": self.__current_nr_ticks,
-                    "curr_tick_timestamp": int(round(time.time() * 1000)),
-                    "grid_shape": self.__shape,
-                    "tick_duration": self.tick_duration,
-                    "world_ID": self.world_ID,
-                    "vis_settings": {
-                        "vis_bg_clr": self.__visualization_bg_clr,
-                        "vis_bg_img": self.__visualization_bg_img
-                    }
-                }
+                api.MATRXS_info = self.__get_world_settings()
                 # start paused
                 api.matrxs_paused = True
 
@@ -116,7 +151,7 @@ class GridWorld:
                           world_settings=api.MATRXS_info)
 
         # add god state
-        api.add_state(agent_id="god", state=self.__get_complete_state(), agent_inheritence_chain="god",
+        api.add_state(agent_id="god", state=self.__get_complete_state(api.MATRXS_info), agent_inheritence_chain="god",
                       world_settings=api.MATRXS_info)
 
         # initialize the message manager
@@ -136,17 +171,102 @@ class GridWorld:
         if self.__verbose:
             print(f"@{os.path.basename(__file__)}: Starting game loop...")
         is_done = False
-        while not is_done:
+        try:
+            while not is_done:
 
-            if self.__run_matrxs_api and api.matrxs_paused:
-                print("MATRXS paused through API")
-                gevent.sleep(1)
-            else:
-                is_done, tick_duration = self.__step()
+                if self.__run_matrxs_api and api.matrxs_paused:
+                    print("MATRXS paused through API")
+                    gevent.sleep(1)
+                else:
+                    is_done, tick_duration = self.__step()
+
+                if self.__run_matrxs_api and api.matrxs_done:
+                    print("Scenario stopped through API")
+                    break
+        finally:
+            # also clean up when the world crashed, in which case any error during the clean up is only warned about
+            cleanup_errors = self.__clean_up_run()
+            if len(cleanup_errors) > 0 and sys.exc_info()[0] is not None:
+                for error in cleanup_errors:
+                    warnings.warn(f"Cleaning up {self.world_ID} failed with {error!r}.")
+                cleanup_errors = []
+
+        # every clean up step was tried, raise the first error that occurred
+        if len(cleanup_errors) > 0:
+            raise cleanup_errors[0]
+
+        if self.__headless and self.__verbose:
+            self.print_throughput_report()
+        if self.__verbose:
+            self.__profiler.print_summary(title=f"of {self.world_ID} ")
+
+    def __clean_up_run(self):
+        """ Closes the loggers, stops the decision threads and processes and writes the trace. Each step is performed
+        even when an earlier one fails, and the errors that occurred are returned. """
+        errors = []
 
-            if self.__run_matrxs_api and api.matrxs_done:
-                print("Scenario stopped through API")
-                break
+        # write all rows the loggers still buffer
+        for logger in self.__loggers:
+            try:
+                logger.close()
+            except Exception as error:
+                errors.append(error)
+
+        # stop the threads of the agents with a decision budget, without waiting for decisions still in progress
+        for executor in self.__decision_executors.values():
+            executor.shutdown(wait=False)
+        self.__decision_executors = {}
+        self.__pending_decisions = {}
+
+        if self.__decision_pool is not None:
+            try:
+                self.__decision_pool.shutdown()
+            except Exception as error:
+                errors.append(error)
+            self.__decision_pool = None
+
+        # write the timeline of this run
+        if self.__tracer is not None:
+            try:
+                self.__tracer.write(os.path.join(self.__trace_dir, f"{self.world_ID}.trace.json"))
+            except Exception as error:
+                errors.append(error)
+
+        return errors
+
+    def get_throughput_report(self):
+        """ Returns how fast this world ran its ticks so far, and how that time was divided over the phases of a tick.
+
+        The time a tick slept to keep up the tick duration is not counted, so in headless mode this is the actual
+        throughput of the simulation.
+
+        Returns
+        -------
+        dict
+            A dictionary with the number of ticks ("nr_ticks"), the total time in seconds spent on them ("duration"),
+            the number of ticks per second ("ticks_per_second"), and per phase of a tick ("phases") its total duration,
+            average duration per tick and fraction of the total duration.
+        """
+        nr_ticks = self.__current_nr_ticks
+        duration = sum(self.__phase_durations.values())
+        phases = OrderedDict()
+        for phase, phase_duration in self.__phase_durations.items():
+            phases[phase] = {"duration": phase_duration,
+                             "duration_per_tick": phase_duration / nr_ticks if nr_ticks > 0 else 0.,
+                             "fraction": phase_duration / duration if duration > 0 else 0.}
+
+        return {"nr_ticks": nr_ticks,
+                "duration": duration,
+                "ticks_per_second": nr_ticks / duration if duration > 0 else 0.,
+                "phases": phases}
+
+    def print_throughput_report(self):
+        """ Prints the throughput report of this world, see get_throughput_report. """
+        report = self.get_throughput_report()
+        print(f"@{os.path.basename(__file__)}: {self.world_ID} ran {report['nr_ticks']} ticks in "
+              f"{report['duration']:.3f} seconds ({report['ticks_per_second']:.1f} ticks/s).")
+        for phase, timing in report['phases'].items():
+            print(f"    {phase:<20}{timing['duration_per_tick'] * 1000:10.3f} ms/tick {timing['fraction'] * 100:6.1f}%")
 
     def get_env_object(self, requested_id, obj_type=None):
         obj = None
@@ -195,31 +315,13 @@ class GridWorld:
     def get_objects_in_range(self, agent_loc, object_type, sense_range):
         """
         Get all objects of a obj type (normal objects or agent) within a
-        certain range around the agent's location
-        """
-
-        env_objs = OrderedDict()
-        # loop through all environment objects
-        for obj_id, env_obj in self.__environment_objects.items():
-            # get the distance from the agent location to the object
-            coordinates = env_obj.location
-            distance = get_distance(coordinates, agent_loc)
-
-            # check if the env object is of the specified type, and within range
-            if (object_type is None or object_type == "*" or isinstance(env_obj, object_type)) and \
-                    distance <= sense_range:
-                env_objs[obj_id] = env_obj
+        certain range around the agent's location. First all environment objects are returned, followed by all agents,
+        both in order of registration.
 
-        # agents are also environment objects, but stored separably. Also check them.
-        for agent_id, agent_obj in self.__registered_agents.items():
-            coordinates = agent_obj.location
-            distance = get_distance(coordinates, agent_loc)
-
-            # check if the env object is of the specified type, adn within range
-            if (object_type is None or object_type == "*" or isinstance(agent_obj, object_type)) and \
-                    distance <= sense_range:
-                env_objs[agent_id] = agent_obj
-        return env_objs
+        The spatial index is used for this, so only the grid cells within the sense range (or only the objects of the
+        requested type) are visited.
+        """
+        return self.__spatial_index.query(agent_loc, object_type, sense_range)
 
     def remove_from_grid(self, object_id, remove_from_carrier=True):
         """
@@ -232,9 +334,12 @@ class GridWorld:
         grid_obj = self.get_env_object(object_id)  # get the object
         loc = grid_obj.location  # its location
 
-        self.__grid[loc[1], loc[0]].remove(grid_obj.obj_id)  # remove the object id from the list at that location
-        if len(self.__grid[loc[1], loc[0]]) == 0:  # if the list is empty, just add None there
-            self.__grid[loc[1], loc[0]] = None
+        # Remove it from the spatial index, and stop listening to its location changes (e.g. when it is carried)
+        self.__spatial_index.remove(object_id)
+        grid_obj._location_change_callback = None
+
+        # Update the grid cell it was in
+        self.__update_grid_cell(loc)
 
         # Remove object from the list of registered agents or environmental objects
         # Check if it is an agent
@@ -298,12 +403,13 @@ class GridWorld:
 
         # Add agent to registered agents
         self.__registered_agents[agent_avatar.obj_id] = agent_avatar
+        self.__add_to_spatial_index(agent_avatar, is_agent=True)
 
         if self.__verbose:
             print(f"@{os.path.basename(__file__)}: Created agent with id {agent_avatar.obj_id}.")
 
-        # Get all properties from the agent avatar
-        avatar_props = agent_avatar.properties
+        # Get all properties from the agent avatar, as a mutable copy since the agent may change its own properties
+        avatar_props = agent_avatar.properties.copy()
 
         if agent_avatar.is_human_agent is False:
             agent._factory_initialise(agent_name=agent_avatar.obj_name,
@@ -335,12 +441,27 @@ class GridWorld:
 
         # Assign id to environment sparse dictionary grid
         self.__environment_objects[env_object.obj_id] = env_object
+        self.__add_to_spatial_index(env_object, is_agent=False)
 
         if self.__verbose:
             print(f"@{__file__}: Created an environment object with id {env_object.obj_id}.")
 
         return env_object.obj_id
 
+    def __add_to_spatial_index(self, env_object, is_agent):
+        """ Adds an object or agent to the spatial index, and keeps it in sync on every location change. """
+        self.__spatial_index.add(env_object, is_agent=is_agent)
+        env_object._location_change_callback = self.__on_location_change
+        self.__update_grid_cell(env_object.location)
+
+    def __on_location_change(self, env_object, loc):
+        """ Called by a registered object or agent whenever its location is set, updates only the affected cells. """
+        old_loc = self.__spatial_index.location_of(env_object.obj_id)
+        self.__spatial_index.move(env_object, loc)
+        if old_loc is not None and old_loc != tuple(loc):
+            self.__update_grid_cell(old_loc)
+            self.__update_grid_cell(loc)
+
     def _register_teams(self):
         """ Register all teams and who is in those teams.
         An agent is always in a team, if not set by the user, a team is created with name 'agent_id' with only that
@@ -392,18 +513,26 @@ class GridWorld:
 
         # Set tick start of current tick
         start_time_current_tick = datetime.datetime.now()
+        phase_start = time.perf_counter()
+        tick_start = phase_start
 
         # Check if we are done based on our global goal assessment function
         self.__is_done, goal_status = self.__check_simulation_goal()
 
-        # Log the data if we have any loggers
-        for logger in self.__loggers:
-            agent_data_dict = {}
-            for agent_id, agent_body in self.__registered_agents.items():
-                agent_data_dict[agent_id] = agent_body.get_log_data()
+        phase_start = self.__end_phase("goal", phase_start)
+
+        # Log the data if we have any loggers, they share the agents' log data which is only gathered if one of them
+        # reads it
+        if len(self.__loggers) > 0:
+            agent_data = AgentLogData(self)
+            for logger in self.__loggers:
+                log_start = time.perf_counter()
+                logger._grid_world_log(grid_world=self, agent_data=agent_data,
+                                       last_tick=self.__is_done, goal_status=goal_status)
+                if self.__tracer is not None:
+                    self.__tracer.add_span(logger.__class__.__name__, "logger", log_start)
 
-            logger._grid_world_log(grid_world=self, agent_data=agent_data_dict,
-                                   last_tick=self.__is_done, goal_status=goal_status)
+        phase_start = self.__end_phase("logging", phase_start)
 
         # If this grid_world is done, we return immediately
         if self.__is_done:
@@ -420,6 +549,9 @@ class GridWorld:
                 api.MATRXS_info = {}
                 api.next_tick_info = {}
 
+            # the world settings of this tick, shared by all states we save for the API
+            world_settings = self.__get_world_settings()
+
         # Go over all agents, detect what each can detect, figure out what actions are possible and send these to
         # that agent. Then receive the action back and store the action in a buffer.
         # Also, update the local copy of the agent properties, and save the agent's state for the GUI.
@@ -427,25 +559,64 @@ class GridWorld:
         # This blocks until a response from the agent is received (hence a tick can take longer than self.tick_
         # duration!!)
         action_buffer = OrderedDict()
+
+        # forget the messages that fall out of the message retention window, once per tick
+        self.message_manager.remove_old_messages(self.__current_nr_ticks)
+
+        # In concurrent mode, the decision pool first evaluates the brains of all agents of which the state does not
+        # depend on the decisions of other agents this tick at once. All decisions are still processed one by one below,
+        # in the same order as in sequential mode, such that the results are the same.
+        concurrent_calls = {}
+        if self.__concurrent_decisions is not None:
+            if self.__decision_pool is None:
+                self.__decision_pool = DecisionPool(self.__concurrent_decisions, max_workers=self.__decision_workers)
+            concurrent_calls = self.__start_concurrent_calls()
+
         for agent_id, agent_obj in self.__registered_agents.items():
 
-            state = self.__get_agent_state(agent_obj)
+            # the state of this agent, and its brain and the Future of its call if the decision pool evaluates it
+            state, brain, future = concurrent_calls.get(agent_id, (None, None, None))
+            if state is None:
+                state = self.__get_agent_state(agent_obj)
+                if self.__concurrent_decisions is not None:
+                    state = self.__get_sequential_state(agent_id, state)
+            elif self.__concurrent_decisions is not None:
+                self.__unprocessed_agent_properties.pop(agent_id)
+
+            phase_start = self.__end_phase("sensing", phase_start)
+
+            decision_start = phase_start
 
             # check if this agent is busy performing an action , if so then also check if it as its last tick of waiting
             # because then we want to do that action. If not busy, call its get_action function.
             if agent_obj._check_agent_busy(curr_tick=self.__current_nr_ticks):
 
                 # only do the filter observation method to be able to update the agent's state to the API
-                filtered_agent_state = agent_obj.filter_observations(state)
+                if future is None:
+                    filtered_agent_state = agent_obj.filter_observations(state)
+                else:
+                    filtered_agent_state = self.__decision_pool.get_result(brain, future)
+
+                phase_start = self.__end_phase("decisions", phase_start)
 
                 # save the current agent's state for the API
                 if self.__run_matrxs_api:
                     api.add_state(agent_id=agent_id, state=filtered_agent_state,
                                   agent_inheritence_chain=agent_obj.class_inheritance,
-                                  world_settings=self.__get_complete_state()['World'])
+                                  world_settings=world_settings)
 
-            else:  # agent is not busy
+                    phase_start = self.__end_phase("api", phase_start)
+
+            elif agent_obj.decision_budget is not None and not self.__decide_within_budget(agent_id, agent_obj, state):
+                # The agent exceeded its decision budget, so it idles this tick while it continues deciding in its own
+                # thread. Meanwhile, the state of its last decision is shown through the API.
+                filtered_agent_state = self.__last_filtered_states.get(agent_id, state)
+                self.__set_agent_busy(action_name=None, action_kwargs={}, agent_id=agent_id)
 
+                phase_start = self.__end_phase("decisions", phase_start)
+                self.__profiler.observe("agent", agent_id, phase_start - decision_start)
+
+            else:  # agent is not busy
                 # Any received data from the API for this HumanAgent is send along to the get_action function
                 if agent_obj.is_human_agent:
                     usrinp = None
@@ -453,13 +624,23 @@ class GridWorld:
                         usrinp = api.pop_userinput(agent_id)
 
                     filtered_agent_state, agent_properties, action_class_name, action_kwargs = \
-                        agent_obj.get_action_func(state=state, agent_properties=agent_obj.properties, agent_id=agent_id,
-                                                  userinput=usrinp)
+                        agent_obj.get_action_func(state=state, agent_properties=agent_obj.properties.copy(),
+                                                  agent_id=agent_id, userinput=usrinp)
+                elif agent_obj.decision_budget is not None:
+                    # the agent decided within its budget (or before this tick), in its own thread
+                    filtered_agent_state, agent_properties, action_class_name, action_kwargs = \
+                        self.__pop_decision(agent_id)
+
+                elif future is not None:
+                    # the agent's get_action method was performed by the decision pool
+                    filtered_agent_state, agent_properties, action_class_name, action_kwargs = \
+                        self.__decision_pool.get_result(brain, future)
+
                 else:  # not a HumanAgent
 
                     # perform the agent's get_action method (goes through filter_observations and decide_on_action)
                     filtered_agent_state, agent_properties, action_class_name, action_kwargs = agent_obj.get_action_func(
-                        state=state, agent_properties=agent_obj.properties, agent_id=agent_id)
+                        state=state, agent_properties=agent_obj.properties.copy(), agent_id=agent_id)
 
                 # the Agent (in the OODA loop) might have updated its properties, process these changes in the Avatar
                 # Agent
@@ -470,6 +651,9 @@ class GridWorld:
                 # would be killing...)
                 self.__set_agent_busy(action_name=action_class_name, action_kwargs=action_kwargs, agent_id=agent_id)
 
+                phase_start = self.__end_phase("decisions", phase_start)
+                self.__profiler.observe("agent", agent_id, phase_start - decision_start)
+
                 # Get all agents we have, as we need these to process all messages that are send to all agents
                 all_agent_ids = self.__registered_agents.keys()
 
@@ -489,11 +673,15 @@ class GridWorld:
                 self.message_manager.preprocess_messages(self.__current_nr_ticks, agent_messages,
                                                          all_agent_ids, self.__teams)
 
+                phase_start = self.__end_phase("message_preprocessing", phase_start)
+
             # save the current agent's state for the API
             if self.__run_matrxs_api:
                 api.add_state(agent_id=agent_id, state=filtered_agent_state,
                               agent_inheritence_chain=agent_obj.class_inheritance,
-                              world_settings=self.__get_complete_state()['World'])
+                              world_settings=world_settings)
+
+                phase_start = self.__end_phase("api", phase_start)
 
             # if this agent is at its last tick of waiting on its action duration, we want to actually perform the
             # action
@@ -503,19 +691,23 @@ class GridWorld:
                 # store the action in the buffer
                 action_buffer[agent_id] = (action_class_name, action_kwargs)
 
-        # put all messages of the current tick in the message buffer
+            phase_start = self.__end_phase("decisions", phase_start)
+
+        # put all messages of the current tick in the message buffer, each receiver gets the same shared envelope
         if self.__current_nr_ticks in self.message_manager.preprocessed_messages:
-            for mssg in self.message_manager.preprocessed_messages[self.__current_nr_ticks]:
-                if mssg.to_id not in self.__message_buffer.keys():  # first message for this receiver
-                    self.__message_buffer[mssg.to_id] = [mssg]
-                else:
-                    self.__message_buffer[mssg.to_id].append(mssg)
+            for envelope in self.message_manager.preprocessed_messages[self.__current_nr_ticks]:
+                for to_id in envelope.recipients:
+                    if to_id not in self.__message_buffer.keys():  # first message for this receiver
+                        self.__message_buffer[to_id] = [envelope]
+                    else:
+                        self.__message_buffer[to_id].append(envelope)
 
+        phase_start = self.__end_phase("message_preprocessing", phase_start)
 
-        # save the god view state
+        # save the god view state, the only place where the complete state is needed during a tick
         if self.__run_matrxs_api:
-            api.add_state(agent_id="god", state=self.__get_complete_state(), agent_inheritence_chain="god",
-                          world_settings=self.__get_complete_state()['World'])
+            api.add_state(agent_id="god", state=self.__get_complete_state(world_settings),
+                          agent_inheritence_chain="god", world_settings=world_settings)
 
             # make the information of this tick available via the API, after all
             # agents have been updated
@@ -524,6 +716,11 @@ class GridWorld:
             self.__tick_duration = api.tick_duration
             api.grid_size = self.shape
 
+            # push the new tick to all clients streaming their state
+            api.push_tick()
+
+        phase_start = self.__end_phase("api", phase_start)
+
         # Perform the actions in the order of the action_buffer (which is filled in order of registered agents
         for agent_id, action in action_buffer.items():
             # Get the action class name
@@ -531,30 +728,55 @@ class GridWorld:
             # Get optional kwargs
             action_kwargs = action[1]
 
-            if action_class_name == "OpenDoorAction":
-                print(f"{agent_id} trying OpenDoorAction with {action_kwargs}")
-
             if action_kwargs is None:  # If kwargs is none, make an empty dict out of it
                 action_kwargs = {}
 
-            # Actually perform the action (if possible), also sets the result in the agent's brain
-            self.__perform_action(agent_id, action_class_name, action_kwargs)
+            # Actually perform the action (if possible), also sets the result in the agent's brain. The grid is
+            # updated along the way through the location change callbacks of the objects and agents. An agent that is
+            # still deciding within its decision budget idles, of which its brain is not told as it is still busy.
+            self.__perform_action(agent_id, action_class_name, action_kwargs,
+                                  inform_brain=agent_id not in self.__pending_decisions)
 
-            # Update the grid
-            self.__update_grid()
+            # In debug mode, check whether the incrementally updated grid still equals a complete rebuild
+            if self.__check_grid_consistency:
+                self.__validate_grid()
+
+        phase_start = self.__end_phase("actions", phase_start)
 
-        # Send all messages between agents
+        # Send all messages between agents, except to agents still deciding in their own thread which receive them once
+        # they are done
+        held_messages = {}
         for receiver_id, messages in self.__message_buffer.items():
-            if receiver_id in self.__registered_agents.keys():
+            if receiver_id in self.__pending_decisions:
+                held_messages[receiver_id] = messages
+            elif receiver_id in self.__registered_agents.keys():
                 # Call the callback method that sets the messages
-                self.__registered_agents[receiver_id].set_messages_func(messages)
+                self.__registered_agents[receiver_id].set_messages_func(messages, tick=self.__current_nr_ticks)
+
+        self.__message_buffer = held_messages
 
-        self.__message_buffer = {}
+        phase_start = self.__end_phase("messages", phase_start)
 
         # Perform the update method of all objects
         for env_obj in self.__environment_objects.values():
             env_obj.update(self)
 
+        tick_end = self.__end_phase("objects", phase_start)
+        if self.__tracer is not None:
+            self.__tracer.add_span("tick", "tick", tick_start, tick_end, args={"tick": self.__current_nr_ticks})
+
+        # Add the durations of the phases of this tick to the tick profile. A phase is interleaved with others for
+        # every agent, so the trace gets a single span per phase with its total duration this tick. These spans are
+        # laid out one after the other from the start of the tick, in the order of TICK_PHASES.
+        span_start = tick_start
+        for phase, phase_duration in self.__tick_phase_durations.items():
+            self.__profiler.observe("phase", phase, phase_duration)
+            self.__tick_phase_durations[phase] = 0.
+            if self.__tracer is not None and phase_duration > 0:
+                self.__tracer.add_span(phase, "tick_phase", span_start, span_start + phase_duration)
+                span_start += phase_duration
+        self.__profiler.nr_ticks += 1
+
         # Increment the number of tick we performed
         self.__current_nr_ticks += 1
 
@@ -563,20 +785,125 @@ class GridWorld:
         tick_duration = tick_end_time - start_time_current_tick
         self.sleep_duration = self.__tick_duration - tick_duration.total_seconds()
 
-        # Sleep for the remaining time of self.__tick_duration
-        self.__sleep()
+        # Sleep for the remaining time of self.__tick_duration, in headless mode we run as fast as possible
+        if not self.__headless:
+            self.__sleep()
 
         # Compute the total time of our tick (including potential sleep)
         tick_end_time = datetime.datetime.now()
         tick_duration = tick_end_time - start_time_current_tick
         self.__curr_tick_duration = tick_duration.total_seconds()
 
-        if self.__verbose:
+        if self.__verbose and not self.__headless:
             print(
                 f"@{os.path.basename(__file__)}: Tick {self.__current_nr_ticks} took {tick_duration.total_seconds()} seconds.")
 
         return self.__is_done, self.__curr_tick_duration
 
+    def __end_phase(self, phase, phase_start):
+        """ Adds the time since phase_start to the duration of a tick phase, and returns the start of the next phase """
+        phase_end = time.perf_counter()
+        self.__phase_durations[phase] += phase_end - phase_start
+        self.__tick_phase_durations[phase] += phase_end - phase_start
+        return phase_end
+
+    def __start_concurrent_calls(self):
+        """ Lets the decision pool evaluate the brains of all agents whose state does not depend on the decisions of
+        other agents this tick; the filter_observations of busy agents and the get_action of the others.
+
+        The state of an agent is obtained (and whether it is busy is checked) in the same order as in sequential mode.
+        Only the decisions of the agents before it in that order are not reflected in its state yet, as these change
+        the properties of those agents (such as their current action). Hence the brain of an agent that perceives none
+        of the agents before it that decide this tick gets the same state as in sequential mode, and is evaluated by the
+        pool. The others, as well as human agents and agents with a decision budget, are evaluated in their turn
+        instead. Returns the state, brain and Future of the call of each agent that the pool evaluates.
+        """
+        calls = OrderedDict()
+        deciding_agents = set()  # the agents so far that decide this tick
+        self.__unprocessed_agent_properties = OrderedDict()
+        for agent_id, agent_obj in self.__registered_agents.items():
+            self.__unprocessed_agent_properties[agent_id] = agent_obj.properties
+            state = self.__get_agent_state(agent_obj)
+            is_busy = agent_obj._check_agent_busy(curr_tick=self.__current_nr_ticks)
+
+            brain = getattr(agent_obj.get_action_func, "__self__", None)
+            is_independent = deciding_agents.isdisjoint(state.keys()) and isinstance(brain, AgentBrain) and \
+                not agent_obj.is_human_agent and agent_obj.decision_budget is None
+            if not is_busy:
+                deciding_agents.add(agent_id)
+            if not is_independent:
+                continue
+
+            if is_busy:
+                calls[agent_id] = (state, brain, self.__decision_pool.submit(brain, "filter_observations", state=state))
+            else:
+                calls[agent_id] = (state, brain, self.__decision_pool.submit(brain, "_get_action", state=state,
+                                                                             agent_properties=agent_obj.properties.copy(),
+                                                                             agent_id=agent_id))
+        return calls
+
+    def __get_sequential_state(self, agent_id, state):
+        """ Returns the state of an agent that was obtained in its turn in concurrent mode, as it would be in sequential
+        mode; with the properties of itself and the agents after it as they were before the pool was started (when
+        their busy check had not changed them yet). """
+        self.__unprocessed_agent_properties.pop(agent_id)
+        for other_id in self.__unprocessed_agent_properties.keys() & state.keys():
+            properties = self.__unprocessed_agent_properties[other_id]
+            state[other_id] = properties if self.__read_only_states else properties.copy()
+        return state
+
+    def __decide_within_budget(self, agent_id, agent_obj, state):
+        """ Lets an agent with a decision budget decide in its own thread, unless it is still deciding, and waits at
+        most its budget for the decision. Returns whether the agent is done deciding, its decision is then obtained with
+        __pop_decision. """
+        if agent_id not in self.__pending_decisions:
+            if agent_id not in self.__decision_executors:
+                self.__decision_executors[agent_id] = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix=f"decision_{agent_id}")
+            given_properties = agent_obj.properties.copy()
+            future = self.__decision_executors[agent_id].submit(agent_obj.get_action_func, state=state,
+                                                                agent_properties=given_properties.copy(),
+                                                                agent_id=agent_id)
+            self.__pending_decisions[agent_id] = (future, given_properties)
+
+        future = self.__pending_decisions[agent_id][0]
+        try:
+            future.result(timeout=agent_obj.decision_budget)
+        except concurrent.futures.TimeoutError:
+            self.__profiler.count_overrun(agent_id)
+            return False
+        return True
+
+    def __pop_decision(self, agent_id):
+        """ Returns the filtered state, changed properties, action name and action arguments of the finished decision
+        of an agent with a decision budget. """
+        future, given_properties = self.__pending_decisions.pop(agent_id)
+        filtered_state, agent_properties, action_class_name, action_kwargs = future.result()
+        self.__last_filtered_states[agent_id] = filtered_state
+
+        # Only the properties the agent changed itself are returned, as others may have changed while it was deciding
+        changed_properties = {prop: value for prop, value in agent_properties.items()
+                              if prop not in given_properties or value != given_properties[prop]}
+        return filtered_state, changed_properties, action_class_name, action_kwargs
+
+    def __trace_agents_and_loggers(self):
+        """ Replaces the filter_observations and decide_on_action methods of all agent brains by ones that trace their
+        calls, and lets the loggers trace their writes. """
+        for agent_id, agent_body in self.__registered_agents.items():
+            # the brain is the owner of the callbacks its body received
+            brain = getattr(agent_body.get_action_func, "__self__", None)
+            if not isinstance(brain, AgentBrain):
+                continue
+            brain.filter_observations = self.__tracer.traced(brain.filter_observations,
+                                                             f"{agent_id}.filter_observations", "agent")
+            brain.decide_on_action = self.__tracer.traced(brain.decide_on_action, f"{agent_id}.decide_on_action",
+                                                          "agent")
+            # busy agents only filter their observations, through the callback of their body
+            agent_body.filter_observations = brain.filter_observations
+
+        for logger in self.__loggers:
+            logger._set_tracer(self.__tracer)
+
     def __check_simulation_goal(self):
 
         goal_status = {}
@@ -607,16 +934,41 @@ class GridWorld:
                 f"Program is to heavy to run real time")
 
     def __update_grid(self):
-        self.__grid = np.array([[None for _ in range(self.__shape[0])] for _ in range(self.__shape[1])])
-        for obj_id, obj in self.__environment_objects.items():
-            self.add_to_grid(obj)
-        for agent_id, agent in self.__registered_agents.items():
-            self.add_to_grid(agent)
+        self.__grid = self.__build_grid()
+
+    def __build_grid(self):
+        """ Builds the complete grid from scratch from all objects and agents. """
+        grid = np.array([[None for _ in range(self.__shape[0])] for _ in range(self.__shape[1])])
+        for obj in list(self.__environment_objects.values()) + list(self.__registered_agents.values()):
+            loc = obj.location
+            if grid[loc[1], loc[0]] is not None:
+                grid[loc[1], loc[0]].append(obj.obj_id)
+            else:
+                grid[loc[1], loc[0]] = [obj.obj_id]
+        return grid
+
+    def __update_grid_cell(self, loc):
+        """ Sets a single cell of the grid to the objects and agents at that location according to the spatial index.
+        """
+        x, y = loc[0], loc[1]
+        if 0 <= x < self.__shape[0] and 0 <= y < self.__shape[1]:
+            obj_ids = self.__spatial_index.ids_at(loc)
+            self.__grid[y, x] = obj_ids if len(obj_ids) > 0 else None
+
+    def __validate_grid(self):
+        """ Checks the incrementally updated grid against a complete rebuild, used when check_grid_consistency is set.
+        """
+        full_grid = self.__build_grid()
+        for y, x in np.ndindex(full_grid.shape):
+            if self.__grid[y, x] != full_grid[y, x]:
+                raise Exception(f"Grid inconsistency at tick {self.__current_nr_ticks} at location {(x, y)}; the "
+                                f"grid contains {self.__grid[y, x]} while a rebuild contains {full_grid[y, x]}.")
 
     # get all objects and agents on the grid
-    def __get_complete_state(self):
+    def __get_complete_state(self, world_settings=None):
         """
         Compile all objects and agents on the grid in one state dictionary
+        :param world_settings: The world settings of this tick to add under 'World', when not given they are created.
         :return: state with all objects and agents on the grid
         """
 
@@ -628,7 +980,19 @@ class GridWorld:
             state[agent.obj_id] = agent.properties
 
         # Append generic properties (e.g. number of ticks, size of grid, etc.}
-        state["World"] = {
+        if world_settings is None:
+            world_settings = self.__get_world_settings()
+        state["World"] = world_settings
+
+        return state
+
+    def __get_world_settings(self):
+        """
+        Compile the generic properties of this world (e.g. number of ticks, size of grid, etc.), without needing the
+        properties of any object.
+        :return: dictionary with the world settings
+        """
+        return {
             "nr_ticks": self.__current_nr_ticks,
             "curr_tick_timestamp": int(round(time.time() * 1000)),
             "grid_shape": self.__shape,
@@ -640,8 +1004,6 @@ class GridWorld:
             }
         }
 
-        return state
-
     def __get_agent_state(self, agent_obj: AgentBody):
         agent_loc = agent_obj.location
         sense_capabilities = agent_obj.sense_capability.get_capabilities()
@@ -654,9 +1016,14 @@ class GridWorld:
             objs_in_range.update(env_objs)
 
         state = {}
-        # Save all properties of the sensed objects in a state dictionary
-        for env_obj in objs_in_range:
-            state[env_obj] = objs_in_range[env_obj].properties
+        # Save all properties of the sensed objects in a state dictionary. The properties are cached and shared, so
+        # unless the world uses read-only states each agent receives a copy it may change.
+        if self.__read_only_states:
+            for env_obj in objs_in_range:
+                state[env_obj] = objs_in_range[env_obj].properties
+        else:
+            for env_obj in objs_in_range:
+                state[env_obj] = objs_in_range[env_obj].properties.copy()
 
         # Append generic properties (e.g. number of ticks, fellow team members, etc.}
         team_members = [agent_id for agent_id, other_agent in self.__registered_agents.items()
@@ -703,7 +1070,12 @@ class GridWorld:
             action = action_class()
             # Check if action is possible, if so we can perform the action otherwise we send an ActionResult that it was
             # not possible.
-            result = action.is_possible(self, agent_id, **action_kwargs)
+            if self.__tracer is None:
+                result = action.is_possible(self, agent_id, **action_kwargs)
+            else:
+                span_start = time.perf_counter()
+                result = action.is_possible(self, agent_id, **action_kwargs)
+                self.__tracer.add_span(f"{action_name}.is_possible", "action", span_start, args={"agent_id": agent_id})
 
         else:  # If the action is not known
             warnings.warn(f"The action with name {action_name} was not found when checking whether this action is "
@@ -712,7 +1084,8 @@ class GridWorld:
 
         return result
 
-    def __perform_action(self, agent_id, action_name, action_kwargs):
+    def __perform_action(self, agent_id, action_name, action_kwargs, inform_brain=True):
+        action_start = time.perf_counter()
 
         # Check if the action will succeed
         result = self.__check_action_is_possible(agent_id, action_name, action_kwargs)
@@ -728,16 +1101,21 @@ class GridWorld:
             action_class = self.__all_actions[action_name]
             # Make instance of action
             action = action_class()
-            # Apply world mutation
-            result = action.mutate(self, agent_id, **action_kwargs)
+            # Apply world mutation (the grid is kept up to date through the location change callbacks)
+            if self.__tracer is None:
+                result = action.mutate(self, agent_id, **action_kwargs)
+            else:
+                span_start = time.perf_counter()
+                result = action.mutate(self, agent_id, **action_kwargs)
+                self.__tracer.add_span(f"{action_name}.mutate", "action", span_start, args={"agent_id": agent_id})
 
-            # Update the grid
-            self.__update_agent_location(agent_id)
+        if action_name is not None:
+            self.__profiler.observe("action", action_name, time.perf_counter() - action_start)
 
-        # Get agent's send_result function
-        set_action_result = self.__registered_agents[agent_id].set_action_result_func
         # Send result of mutation to agent brain and agent body
-        set_action_result(result)
+        if inform_brain:
+            set_action_result = self.__registered_agents[agent_id].set_action_result_func
+            set_action_result(result)
         self.__registered_agents[agent_id].action_result = result
 
         # Whether the action succeeded or not, we return the result
@@ -777,25 +1155,6 @@ class GridWorld:
         # to its properties so others know what agent did)
         self.__registered_agents[agent_id]._set_current_action(action_name=action_name, action_args=action_kwargs)
 
-    def __update_agent_location(self, agent_id):
-        # Get current location of the agent
-        loc = self.__registered_agents[agent_id].location
-        # Check if that spot in our list that represents the grid, is None or a list of other objects
-        if self.__grid[loc[1], loc[0]] is not None:  # If not None, we append the agent id to it
-            self.__grid[loc[1], loc[0]].append(agent_id)
-        else:  # if none, we make a new list with the agent id in it.
-            self.__grid[loc[1], loc[0]] = [agent_id]
-
-        # Update the Agent Avatar's location as well
-        self.__registered_agents[agent_id].location = loc
-
-    def __update_obj_location(self, obj_id):
-        loc = self.__environment_objects[obj_id].location
-        if self.__grid[loc[1], loc[0]] is not None:
-            self.__grid[loc[1], loc[0]].append(obj_id)
-        else:
-            self.__grid[loc[1], loc[0]] = [obj_id]
-
     def __warn(self, warn_str):
         return f"[@{self.__current_nr_ticks}] {warn_str}"
 
@@ -831,6 +1190,20 @@ class GridWorld:
     def simulation_goal(self):
         return self.__simulation_goal
 
+    @property
+    def loggers(self):
+        return self.__loggers
+
+    @property
+    def profiler(self):
+        """ The TickProfiler with the durations of the tick phases, agent decisions and actions of this world. """
+        return self.__profiler
+
+    @property
+    def tracer(self):
+        """ The Tracer with the timeline of this world, or None if it is not traced. """
+        return self.__tracer
+
     @property
     def tick_duration(self):
         return self.__tick_duration
@@ -1,4 +1,4 @@
-from matrxs.logger.logger import GridWorldLogger
+from matrxs.logger.logger import AgentLogData, GridWorldLogger
 from matrxs.grid_world import GridWorld
 
 
@@ -8,14 +8,13 @@ class LogIdleAgents(GridWorldLogger):
         super().__init__(log_strategy=log_strategy, save_path=save_path, file_name=file_name_prefix,
                          file_extension=file_extension, delimiter=delimeter)
 
-    def log(self, grid_world: GridWorld, agent_data: dict):
+    def log(self, grid_world: GridWorld, agent_data: AgentLogData):
         log_statement = {}
-        for agent_id, agent_obj in grid_world.registered_agents.items():
-            idle = agent_obj.properties['current_action'] is None
+        for agent_id, properties in agent_data.agent_properties.items():
+            idle = properties['current_action'] is None
             log_statement[agent_id] = int(idle)
 
-        for agent_id, agent_obj in grid_world.registered_agents.items():
-            if log_statement[agent_id] != 0:
-                return log_statement
+        if any(idle != 0 for idle in log_statement.values()):
+            return log_statement
 
         return None
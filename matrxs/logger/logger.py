@@ -1,6 +1,64 @@
+import atexit
 import csv
 import datetime
+import io
 import os
+import queue
+import threading
+import time
+from collections.abc import Mapping
+
+
+class AgentLogData(Mapping):
+    """ The log data of all agents at the current tick (as returned by their get_log_data), shared by all loggers.
+
+    The GridWorld creates one every tick and passes it to each logger as its agent_data. The log data is only gathered
+    when a logger reads it, so not at all in ticks in which no logger logs, and at most once per tick. It also offers
+    views of the world that several loggers need, such as the properties of all agents, which are likewise computed at
+    most once per tick.
+    """
+
+    def __init__(self, grid_world):
+        self.__grid_world = grid_world
+        self.__data = None
+        self.__agent_properties = None
+        self.__objects_with_class = {}  # class name -> {object id: properties}
+
+    @property
+    def agent_properties(self):
+        """ A dictionary with the (read-only) properties of each agent, by agent ID. """
+        if self.__agent_properties is None:
+            self.__agent_properties = {agent_id: agent_body.properties
+                                       for agent_id, agent_body in self.__grid_world.registered_agents.items()}
+        return self.__agent_properties
+
+    def get_objects_with_class(self, class_name):
+        """ Returns a dictionary with the (read-only) properties of all objects and agents that are (or inherit from)
+        the class with this name, by object ID.
+        """
+        if class_name not in self.__objects_with_class:
+            objects = {}
+            for obj_id, obj in [*self.__grid_world.environment_objects.items(),
+                                *self.__grid_world.registered_agents.items()]:
+                if class_name in obj.class_inheritance:
+                    objects[obj_id] = obj.properties
+            self.__objects_with_class[class_name] = objects
+        return self.__objects_with_class[class_name]
+
+    def __get_data(self):
+        if self.__data is None:
+            self.__data = {agent_id: agent_body.get_log_data()
+                           for agent_id, agent_body in self.__grid_world.registered_agents.items()}
+        return self.__data
+
+    def __getitem__(self, agent_id):
+        return self.__get_data()[agent_id]
+
+    def __iter__(self):
+        return iter(self.__get_data())
+
+    def __len__(self):
+        return len(self.__get_data())
 
 
 class GridWorldLogger:
@@ -8,7 +66,36 @@ class GridWorldLogger:
     LOG_ON_FIRST_TICK = "log_first_tick"
     LOG_ON_GOAL_REACHED = "log_on_reached_goal"
 
-    def __init__(self, log_strategy=1, save_path="/logs", file_name="", file_extension=".csv", delimiter=";"):
+    def __init__(self, log_strategy=1, save_path="/logs", file_name="", file_extension=".csv", delimiter=";",
+                 buffer_size=100, flush_interval=1.0, write_in_background=False):
+        """ A logger that writes the data returned by its log method to a CSV file.
+
+        The rows are not written one by one, but collected in a buffer that is written to the file when it holds
+        `buffer_size` rows or when `flush_interval` seconds passed since it was last written. The file is kept open
+        until the logger is closed, which the GridWorld does when it stops running (also when it crashes), or else when
+        Python exits.
+
+        Parameters
+        ----------
+        log_strategy : int, str, optional
+            Log every this many ticks, or one of the GridWorldLogger.LOG_ON_<...> values. Defaults to 1.
+        save_path : str, optional
+            The directory in which a directory for each world is created, in which the file is written. Defaults to
+            "/logs".
+        file_name : str, optional
+            The prefix of the file name, the time at which the logger is created and the extension are appended to it.
+        file_extension : str, optional
+            Defaults to ".csv".
+        delimiter : str, optional
+            Defaults to ";".
+        buffer_size : int, optional
+            The number of rows after which the buffer is written to the file. Defaults to 100.
+        flush_interval : float, optional
+            The number of seconds after which the buffer is written to the file, regardless of its size. Defaults to 1.
+        write_in_background : bool, optional
+            Whether a background thread writes the buffer to the file, such that the GridWorld does not wait for it.
+            Defaults to False.
+        """
         self.__log_strategy = log_strategy
         self.__save_path = save_path
         self.__file_name_prefix = file_name
@@ -23,6 +110,24 @@ class GridWorldLogger:
         self.__columns = []  # place holder for the columns in our data file
         self.__prev_goal_status = {}  # to track if a goal was accomplished since last call
 
+        # The rows are formatted as CSV in a buffer, which is written to the (open) file when it is flushed
+        self.__buffer_size = buffer_size
+        self.__flush_interval = flush_interval
+        self.__buffer = io.StringIO()
+        self.__csv_writer = None  # created when we know the columns
+        self.__nr_buffered_rows = 0
+        self.__last_flush_time = time.monotonic()
+        self.__file = None
+        self.__close_at_exit = False  # whether close is registered to be called when Python exits
+
+        # Optionally the buffers are written by a background thread, which receives them through a queue
+        self.__write_in_background = write_in_background
+        self.__write_queue = None
+        self.__writer_thread = None
+        self.__writer_exception = None
+
+        self.__tracer = None  # the Tracer of the GridWorld, if it is traced
+
     def log(self, grid_world, agent_data):
         return {}
 
@@ -74,6 +179,15 @@ class GridWorldLogger:
 
         return to_log
 
+    @property
+    def file_name(self):
+        # The path of the file this logger writes to
+        return self.__file_name
+
+    def _set_tracer(self, tracer):
+        # Trace the writes to the file (set by the GridWorld when it is traced)
+        self.__tracer = tracer
+
     def _set_world_nr(self, world_nr):
         # Set the world number
         self.__world_nr = world_nr
@@ -101,6 +215,70 @@ class GridWorldLogger:
         else:
             raise Exception(f"The data in this {self.__class__} should be a dictionary.")
 
+    def flush(self):
+        """ Writes all buffered rows to the file, or hands them to the background thread when writing in the
+        background. """
+        if self.__nr_buffered_rows == 0:
+            return
+
+        rows = self.__buffer.getvalue()
+        self.__buffer.seek(0)
+        self.__buffer.truncate()
+        self.__nr_buffered_rows = 0
+        self.__last_flush_time = time.monotonic()
+
+        if not self.__write_in_background:
+            self.__write_rows(rows)
+            return
+
+        if self.__writer_exception is not None:
+            raise self.__writer_exception
+        if self.__writer_thread is None:
+            self.__write_queue = queue.Queue()
+            self.__writer_thread = threading.Thread(target=self.__write_in_background_thread, daemon=True,
+                                                    name=f"logger_{self.__file_name}")
+            self.__writer_thread.start()
+        self.__write_queue.put(rows)
+
+    def close(self):
+        """ Writes all buffered rows and closes the file. Logging again afterwards appends to the file. """
+        self.flush()
+
+        if self.__writer_thread is not None:
+            self.__write_queue.put(None)
+            self.__writer_thread.join()
+            self.__writer_thread = None
+            if self.__writer_exception is not None:
+                raise self.__writer_exception
+
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+        if self.__close_at_exit:
+            atexit.unregister(self.close)
+            self.__close_at_exit = False
+
+    def __write_rows(self, rows):
+        write_start = time.perf_counter()
+        if self.__file is None:
+            self.__file = open(self.__file_name, mode="a", newline='')
+        self.__file.write(rows)
+        self.__file.flush()
+        if self.__tracer is not None:
+            self.__tracer.add_span(f"{self.__class__.__name__}.write", "logger", write_start)
+
+    def __write_in_background_thread(self):
+        while True:
+            rows = self.__write_queue.get()
+            if rows is None:
+                return
+            try:
+                self.__write_rows(rows)
+            except Exception as e:
+                # raised on the simulation thread at the next flush or close
+                self.__writer_exception = e
+
     def __write_data(self, data, tick_nr):
 
         # We always include the world number and the tick number
@@ -114,20 +292,23 @@ class GridWorldLogger:
             # Then we set the keys as column names
             self.__columns = list(data.keys())
 
-        # Write the data to the file, create it when it does not exist and in that case write the columns as well
-        if not os.path.isfile(self.__file_name):
-            mode = "w+"
-            write_columns = True
-        else:
-            mode = "a"
-            write_columns = False
+        # Format the data in the buffer, when the file does not exist yet write the columns to it as well
+        if self.__csv_writer is None:
+            self.__csv_writer = csv.DictWriter(self.__buffer, delimiter=self.__delimiter, quotechar='"',
+                                               quoting=csv.QUOTE_MINIMAL, fieldnames=self.__columns)
+            if not os.path.isfile(self.__file_name):
+                self.__csv_writer.writeheader()
 
-        with open(self.__file_name, mode=mode,  newline='') as data_file:
-            csv_writer = csv.DictWriter(data_file, delimiter=self.__delimiter, quotechar='"',
-                                        quoting=csv.QUOTE_MINIMAL, fieldnames=self.__columns)
+        self.__csv_writer.writerow(data)
+        self.__nr_buffered_rows += 1
 
-            # Write columns if we need to
-            if write_columns:
-                csv_writer.writeheader()
+        # Make sure the buffer is written when Python exits, for worlds of which the ticks are not performed through
+        # their run method (which closes the logger)
+        if not self.__close_at_exit:
+            atexit.register(self.close)
+            self.__close_at_exit = True
 
-            csv_writer.writerow(data)
+        # Write the buffer to the file when it is full, or when it was not written for a while
+        if self.__nr_buffered_rows >= self.__buffer_size or \
+                time.monotonic() - self.__last_flush_time >= self.__flush_interval:
+            self.flush()
@@ -2,6 +2,7 @@ from matrxs.agents.capabilities.capability import SenseCapability
 from matrxs.actions.action import Action, ActionResult
 from matrxs.utils.utils import get_all_classes
 from matrxs.objects.env_object import EnvObject
+from matrxs.utils.read_only import ReadOnlyDict, ReadOnlyList
 import numpy as np
 
 
@@ -13,7 +14,7 @@ class AgentBody(EnvObject):
                  callback_agent_log,
                  visualize_size, visualize_shape, visualize_colour, visualize_depth, visualize_opacity,
                  is_traversable, team, name, is_movable,
-                 is_human_agent, customizable_properties,
+                 is_human_agent, customizable_properties, decision_budget=None,
                  **custom_properties):
         """
         This class is a representation of an agent's body in the GridWorld.
@@ -60,6 +61,9 @@ class AgentBody(EnvObject):
         body is a human controlled agent.
         :param customizable_properties: List. Optional, default obtained from defaults.json. The list of attribute names
         that can be customized by other objects (including Agent's body and as an extension any Agent).
+        :param decision_budget: Float. Optional, defaults to None. The number of seconds the GridWorld waits each tick for
+        the Agent to decide on an action, after which the Agent idles that tick while it continues deciding in its own
+        thread. None lets the GridWorld wait for the Agent's decision as long as it takes.
         :param is_traversable: Boolean. Optional, default obtained from defaults.json. Signals whether other objects can
         be placed on top of this object.
         :param carried_by: List. Optional, default obtained from defaults.json. A list of who is carrying this object.
@@ -90,6 +94,9 @@ class AgentBody(EnvObject):
         # The property that signals whether the agent this Agent's body represents is a human agent
         self.is_human_agent = is_human_agent
 
+        # The time the GridWorld waits for a decision of the agent each tick, if limited
+        self.decision_budget = decision_budget
+
         # Save the other attributes the GridWorld expects an Agent's body to have access to an Agent's brain
         self.get_action_func = callback_agent_get_action
         self.set_action_result_func = callback_agent_set_action_result
@@ -150,6 +157,8 @@ class AgentBody(EnvObject):
         # constructor, that is why we call this AFTER calling that.
         if team is None:
             self.team = self.obj_id + "_team"
+        else:
+            self.team = team
         self.change_property("team", self.team)
 
     def _set_agent_busy(self, curr_tick, action_duration):
@@ -271,6 +280,9 @@ class AgentBody(EnvObject):
             # We deliberately ignore the current_action property, and several others such as agent_id as these can never
             # be altered as they are governed by the GridWorld
 
+        # The custom properties might have been changed in place, so always mark our cached properties as outdated
+        self._bump_properties_version()
+
         return self.properties
 
     @property
@@ -293,11 +305,16 @@ class AgentBody(EnvObject):
         assert len(loc) == 2
         # Set the location to our private location xy list
         self.__location = loc
+        self._bump_properties_version()
+
+        # Notify the GridWorld (if any) of our new location
+        if self._location_change_callback is not None:
+            self._location_change_callback(self, loc)
 
         # Carrying action is done here
         # First we check if we even have a 'carrying' property, as the future might hold an Agent's body who
         # specifically removes this property. In that case we return.
-        if 'carrying' not in self.properties.keys():
+        if 'carrying' not in self.custom_properties.keys():
             return
         # Next we retrieve whatever it is the Agent's body is carrying (if we have a 'carrying' property at all)
         carried_objs = self.properties['carrying']
@@ -334,8 +351,15 @@ class AgentBody(EnvObject):
 
         In the case we return the properties of a class that inherits from EnvObject, we check if that class has
 
-        :return: All mandatory and custom properties in a dictionary.
+        The properties are cached until this agent or any of the objects it carries change, so the returned dictionary
+        is read-only. Use its copy() method to obtain a mutable copy.
+
+        :return: All mandatory and custom properties in a (read-only) dictionary.
         """
+        # Return the cached properties if nothing changed since
+        properties = self._get_cached_properties()
+        if properties is not None:
+            return properties
 
         # Copy the custom properties
         properties = self.custom_properties.copy()
@@ -347,20 +371,20 @@ class AgentBody(EnvObject):
         properties['location'] = self.location
         properties['is_movable'] = self.is_movable
         properties['action_set'] = self.action_set
-        properties['carried_by'] = self.carried_by
+        properties['carried_by'] = ReadOnlyList(self.carried_by)
         properties['is_human_agent'] = self.is_human_agent
         properties['is_traversable'] = self.is_traversable
         properties['class_inheritance'] = self.class_inheritance
         properties['is_blocked_by_action'] = self.is_blocked
-        properties['is_carrying'] = [obj.properties for obj in self.is_carrying]
-        properties['sense_capability'] = self.sense_capability.get_capabilities()
-        properties['visualization'] = {
+        properties['is_carrying'] = ReadOnlyList([obj.properties for obj in self.is_carrying])
+        properties['sense_capability'] = ReadOnlyDict(self.sense_capability.get_capabilities())
+        properties['visualization'] = ReadOnlyDict({
             "size": self.visualize_size,
             "shape": self.visualize_shape,
             "colour": self.visualize_colour,
             "depth": self.visualize_depth,
             "opacity": self.visualize_opacity
-        }
+        })
 
         # Add the current action and all of its data
         properties['current_action'] = self.current_action
@@ -372,7 +396,7 @@ class AgentBody(EnvObject):
         properties['current_action_duration'] = self.current_action_duration_in_ticks
         properties['current_action_started_at_tick'] = self.current_action_tick_started
 
-        return properties
+        return self._set_cached_properties(properties)
 
     @properties.setter
     def properties(self, property_dictionary: dict):
@@ -381,6 +405,13 @@ class AgentBody(EnvObject):
         """
         pass
 
+    def _get_properties_key(self):
+        """
+        The properties of an agent also contain the properties of all objects it carries, so their versions are part of
+        the key as well.
+        """
+        return super()._get_properties_key(), tuple((obj, obj._get_properties_key()) for obj in self.is_carrying)
+
     @property
     def current_action(self):
         return self.__current_action
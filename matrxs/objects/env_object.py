@@ -1,5 +1,6 @@
 from matrxs.utils.utils import get_default_value
 from matrxs.utils.utils import next_obj_id, get_inheritence_path
+from matrxs.utils.read_only import ReadOnlyDict, ReadOnlyList
 
 
 class EnvObject:
@@ -126,6 +127,10 @@ class EnvObject:
         for k, v in custom_properties.items():
             self.custom_properties[k] = v
 
+        # The GridWorld this object is registered to sets a callback here that is called on every location change, to
+        # keep its spatial index up to date. It remains None as long as the object is not part of a GridWorld.
+        self._location_change_callback = None
+
         # location should be set at the end (due to the dependency of its setter on the other properties (e.g. in
         # AgentAvatar)
         self.location = location
@@ -191,6 +196,9 @@ class EnvObject:
                 assert isinstance(property_value, bool)
                 self.is_movable = property_value
 
+        # The custom properties might have been changed in place, so always mark our cached properties as outdated
+        self._bump_properties_version()
+
         return self.properties
 
     def add_property(self, property_name, property_value):
@@ -203,6 +211,48 @@ class EnvObject:
             # We always add it as a custom property which is also customizable (since we can add it)
             self.custom_properties[property_name] = property_value
             self.customizable_properties.append(property_name)
+            self._bump_properties_version()
+
+    def __setattr__(self, key, value):
+        """
+        Any attribute can be part of the properties (e.g. the Door sets its is_traversable and visualize_colour
+        directly), so (re)assigning an attribute marks the cached properties as outdated.
+        """
+        if self.__dict__.get(key, None) is not value:
+            self._bump_properties_version()
+        object.__setattr__(self, key, value)
+
+    def _bump_properties_version(self):
+        """
+        Increments the version of this object's properties, which marks the cached properties as outdated. Should be
+        called whenever something that is part of the properties is changed in place (e.g. a custom property).
+        """
+        self.__dict__['_properties_version'] = self.__dict__.get('_properties_version', 0) + 1
+
+    def _get_properties_key(self):
+        """
+        Returns the key that identifies the current version of the properties, the cached properties are valid as long
+        as this key remains the same.
+        """
+        return self._properties_version, tuple(self.carried_by)
+
+    def _get_cached_properties(self):
+        """
+        Returns the cached properties if they are still up to date, None otherwise.
+        """
+        cache = self.__dict__.get('_properties_cache', None)
+        if cache is not None and cache[0] == self._get_properties_key():
+            return cache[1]
+        return None
+
+    def _set_cached_properties(self, properties):
+        """
+        Caches the given properties as a read-only dictionary for the current version of this object, and returns them.
+        """
+        properties = ReadOnlyDict(properties)
+        # set directly, as changing the cache should not change the version of the properties itself
+        self.__dict__['_properties_cache'] = (self._get_properties_key(), properties)
+        return properties
 
     @property
     def location(self):
@@ -223,6 +273,11 @@ class EnvObject:
         assert isinstance(loc, list) or isinstance(loc, tuple)
         assert len(loc) == 2
         self.__location = loc
+        self._bump_properties_version()
+
+        # Notify the GridWorld (if any) of our new location
+        if self._location_change_callback is not None:
+            self._location_change_callback(self, loc)
 
     @property
     def properties(self):
@@ -232,8 +287,16 @@ class EnvObject:
 
         In the case we return the properties of a class that inherits from EnvObject, we check if that class has
 
-        :return: All mandatory and custom properties in a dictionary.
+        The properties are cached until this object changes (through change_property, add_property, a location change
+        or any other attribute assignment), so the returned dictionary is read-only. Use its copy() method to obtain a
+        mutable copy.
+
+        :return: All mandatory and custom properties in a (read-only) dictionary.
         """
+        # Return the cached properties if nothing changed since
+        properties = self._get_cached_properties()
+        if properties is not None:
+            return properties
 
         # Copy the custom properties
         properties = self.custom_properties.copy()
@@ -243,18 +306,18 @@ class EnvObject:
         properties['obj_id'] = self.obj_id  # we return id as well, but this should never ever be modified!
         properties['location'] = self.location
         properties['is_movable'] = self.is_movable
-        properties['carried_by'] = self.carried_by
+        properties['carried_by'] = ReadOnlyList(self.carried_by)
         properties['is_traversable'] = self.is_traversable
         properties['class_inheritance'] = self.class_inheritance
-        properties['visualization'] = {
+        properties['visualization'] = ReadOnlyDict({
             "size": self.visualize_size,
             "shape": self.visualize_shape,
             "colour": self.visualize_colour,
             "depth": self.visualize_depth,
             "opacity": self.visualize_opacity
-        }
+        })
 
-        return properties
+        return self._set_cached_properties(properties)
 
     @properties.setter
     def properties(self, property_dictionary: dict):
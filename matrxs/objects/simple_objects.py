@@ -18,7 +18,8 @@ class SquareBlock(EnvObject):
 
 class Door(EnvObject):
 
-    def __init__(self, location, is_open, name="Door", open_colour="#006400", closed_colour="#640000"):
+    def __init__(self, location, is_open, name="Door", open_colour="#006400", closed_colour="#640000",
+                 room_name=None):
         """
         Door base object, can be used to define rooms. An example of an object that is and ordinary EnvObject but has
         a method on which two Actions depend; OpenDoorAction and CloseDoorAction. This method alters the is_traversable
@@ -31,6 +32,7 @@ class Door(EnvObject):
         :param name: Name of object, defaults to "Door"
         :param open_colour: Colour when open
         :param closed_colour: Colour when closed
+        :param room_name: Name of the room of which this door is part, if any
         """
 
         # Whether the door is by default open or closed is stored in the defaults.json and obtained like this;
@@ -46,8 +48,11 @@ class Door(EnvObject):
         # If the door is open or closed also determines its is_traversable property
         is_traversable = self.is_open
 
+        # Only doors that are part of a room have a room name
+        room_properties = {} if room_name is None else {"room_name": room_name}
+
         super().__init__(location=location, name=name, is_traversable=is_traversable, visualize_colour=current_color,
-                         is_open=self.is_open, class_callable=Door)
+                         is_open=self.is_open, class_callable=Door, **room_properties)
 
     def open_door(self):
         """
@@ -80,16 +85,18 @@ class Door(EnvObject):
 
 class Wall(EnvObject):
 
-    def __init__(self, location, name="Wall", visualize_colour="#000000"):
+    def __init__(self, location, name="Wall", visualize_colour="#000000", room_name=None):
         """
         A simple Wall object. Is not traversable, the colour can be set but has otherwise the default EnvObject property
         values.
         :param location: The location of the wall.
         :param name: The name, default "Wall".
+        :param room_name: Name of the room of which this wall is part, if any
         """
         is_traversable = False  # All walls are always not traversable
+        room_properties = {} if room_name is None else {"room_name": room_name}  # only walls of a room have a name
         super().__init__(name=name, location=location, visualize_colour=visualize_colour,
-                         is_traversable=is_traversable, class_callable=Wall)
+                         is_traversable=is_traversable, class_callable=Wall, **room_properties)
 
 
 class AreaTile(EnvObject):
@@ -1,21 +1,32 @@
 import heapq
+import math
+import threading
 from collections import OrderedDict
 
 import numpy as np
+
+from matrxs.utils.agent_utils.room_graph import RoomGraph
 from matrxs.utils.agent_utils.state_tracker import StateTracker
 from matrxs.actions.move_actions import *
 
 
 class Navigator:
     A_STAR_ALGORITHM = "a_star"
+    DISTANCE_FIELD_ALGORITHM = "distance_field"
+    D_STAR_LITE_ALGORITHM = "d_star_lite"
+    ROOM_GRAPH_ALGORITHM = "room_graph"
 
-    def __init__(self, agent_id, action_set, algorithm=A_STAR_ALGORITHM, is_circular=False):
+    def __init__(self, agent_id, action_set, algorithm=A_STAR_ALGORITHM, is_circular=False, distance_field_cache=None):
         # Set action set
         self.__action_set = action_set
 
-        # Set the path planning algorithm, currently only A* is supported
+        # Set the path planning algorithm, either A*, distance fields, D* Lite or A* through a graph of rooms and doors
         self.__algorithm = algorithm
 
+        # The cache of the distance fields, pass DistanceFieldPlanner.shared_cache to share the fields with all other
+        # navigators that do so. By default each navigator has a cache of its own.
+        self.__distance_field_cache = distance_field_cache
+
         # Set the move action set the agent is capable of
         self.__move_actions = get_move_actions(action_set)
 
@@ -99,7 +110,8 @@ class Navigator:
 
     def reset_full(self):
         # This function resets the navigator to a new instance
-        self.__init__(self.__agent_id, self.__action_set, self.__algorithm, self.is_circular)
+        self.__init__(self.__agent_id, self.__action_set, self.__algorithm, self.is_circular,
+                      self.__distance_field_cache)
 
     def __get_current_waypoint(self):
         if self.__current_waypoint_idx is None:
@@ -112,8 +124,14 @@ class Navigator:
     def __initialize_path_planner(self, algorithm, action_set):
         if algorithm == self.A_STAR_ALGORITHM:
             return AStarPlanner(action_set=action_set, metric=AStarPlanner.EUCLIDEAN_METRIC)
+        elif algorithm == self.DISTANCE_FIELD_ALGORITHM:
+            return DistanceFieldPlanner(action_set=action_set, cache=self.__distance_field_cache)
+        elif algorithm == self.D_STAR_LITE_ALGORITHM:
+            return DStarLitePlanner(action_set=action_set)
+        elif algorithm == self.ROOM_GRAPH_ALGORITHM:
+            return RoomGraphPlanner(action_set=action_set, room_graph=RoomGraph())
         else:
-            raise Exception()
+            raise Exception(f"The path planning algorithm {algorithm} is not known.")
 
     def __update_waypoints(self, agent_loc):
         wp = self.__get_current_waypoint()
@@ -140,14 +158,23 @@ class Navigator:
         # Get our occupation map
         self.__occupation_map = state_tracker.get_traversability_map(inverted=True)
 
+        # Add any rooms we discovered to our room graph
+        if self.__algorithm == self.ROOM_GRAPH_ALGORITHM:
+            self.__path_planning_algo.room_graph.update(state_tracker.get_memorized_state())
+
         # print("occupation map:", self.__occupation_map)
 
         # Get our current waypoint
         current_wp = self.__get_current_waypoint()
 
-        # Plan a path using the chosen path planning algorithm
-        path = self.__path_planning_algo.plan(start=agent_loc, goal=current_wp.location,
-                                              occupation_map=self.__occupation_map)
+        # Plan a path using the chosen path planning algorithm. With distance fields and D* Lite we only need the next
+        # step, which is a single lookup in the (cached or repaired) distances to our current waypoint.
+        if self.__algorithm in [self.DISTANCE_FIELD_ALGORITHM, self.D_STAR_LITE_ALGORITHM]:
+            path = self.__path_planning_algo.plan(start=agent_loc, goal=current_wp.location,
+                                                  occupation_map=self.__occupation_map, max_length=1)
+        else:
+            path = self.__path_planning_algo.plan(start=agent_loc, goal=current_wp.location,
+                                                  occupation_map=self.__occupation_map)
 
         # Go over the path and select the action that is required to go from one location to the other
         route = self.__get_route_from_path(agent_loc, path)
@@ -198,32 +225,44 @@ class AStarPlanner(PathPlanner):
     def __init__(self, action_set, metric=EUCLIDEAN_METRIC):
         super().__init__(action_set)
         if metric == self.EUCLIDEAN_METRIC:
-            self.heuristic = lambda p1, p2: np.sqrt(np.sum((np.array(p1) - np.array(p2)) ** 2, axis=0))
+            self.heuristic = lambda p1, p2: math.sqrt((p1[0] - p2[0]) ** 2 + (p1[1] - p2[1]) ** 2)
         elif metric == self.MANHATTAN_METRIC:
-            self.heuristic = lambda p1, p2: np.abs(p1[0] - p2[0]) + np.abs(p1[1] - p2[1])
+            self.heuristic = lambda p1, p2: abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
         else:
             raise Exception(f"The distance metric {metric} for A* heuristic not known.")
 
+        # The possible movements and their costs, which are the same for every location
+        self.__moves = [(i, j, self.heuristic((0, 0), (i, j))) for i, j in self.move_actions.values()]
+
+        # The number of locations expanded over all plans, e.g. for benchmarking
+        self.nr_expansions = 0
+
     def plan(self, start, goal, occupation_map):
         """
         A star algorithm, returns the shortest path to get from goal to start.
         Uses an 2D numpy array, with 0 being traversable, anything else (e.g. 1) not traversable
         Implementation from: https://www.analytics-link.com/single-post/2018/09/14/Applying-the-A-Path-Finding-Algorithm-in-Python-Part-1-2D-square-grid
-        """
 
-        # possible movements
-        neighbors = list(self.move_actions.values())
+        The open set is kept as a heap with lazy deletion; when a location is reached through a shorter path, a new
+        entry is pushed and the old one is skipped once it is popped. Whether a location was reached before is looked up
+        in the g-scores, so no entry has to be searched in the heap itself.
+        """
+        heuristic = self.heuristic
+        width, height = occupation_map.shape
+        # Indexing a nested list is far cheaper than indexing a numpy array one element at a time
+        occupation = occupation_map.tolist()
 
-        close_set = set()
         came_from = {}
         gscore = {start: 0}
-        fscore = {start: self.heuristic(start, goal)}
-        oheap = []
-
-        heapq.heappush(oheap, (fscore[start], start))
+        fscore = {start: heuristic(start, goal)}
+        oheap = [(fscore[start], start)]
 
         while oheap:
-            current = heapq.heappop(oheap)[1]
+            f, current = heapq.heappop(oheap)
+
+            # Skip entries of locations that were pushed again with a lower score
+            if f > fscore[current]:
+                continue
 
             if current == goal:
                 path = []
@@ -232,34 +271,454 @@ class AStarPlanner(PathPlanner):
                     current = came_from[current]
                 return path[::-1]
 
-            close_set.add(current)
-            for i, j in neighbors:
-                neighbor = current[0] + i, current[1] + j
-                tentative_g_score = gscore[current] + self.heuristic(current, neighbor)
-                if 0 <= neighbor[0] < occupation_map.shape[0]:
-                    if 0 <= neighbor[1] < occupation_map.shape[1]:
-                        if occupation_map[neighbor[0]][neighbor[1]] != 0:
-                            continue
-                    else:
-                        # array bound y walls
-                        continue
-                else:
-                    # array bound x walls
+            self.nr_expansions += 1
+            current_g = gscore[current]
+            for i, j, cost in self.__moves:
+                x = current[0] + i
+                y = current[1] + j
+                # array bound walls and intraversable locations
+                if not (0 <= x < width and 0 <= y < height) or occupation[x][y] != 0:
                     continue
 
-                if neighbor in close_set and tentative_g_score >= gscore.get(neighbor, 0):
-                    continue
-
-                if tentative_g_score < gscore.get(neighbor, 0) or neighbor not in [i[1] for i in oheap]:
+                neighbor = (x, y)
+                tentative_g_score = current_g + cost
+                if neighbor not in gscore or tentative_g_score < gscore[neighbor]:
                     came_from[neighbor] = current
                     gscore[neighbor] = tentative_g_score
-                    fscore[neighbor] = tentative_g_score + self.heuristic(neighbor, goal)
+                    fscore[neighbor] = tentative_g_score + heuristic(neighbor, goal)
                     heapq.heappush(oheap, (fscore[neighbor], neighbor))
 
         # If no path is available we stay put
         return [start]
 
 
+class DistanceFieldCache:
+    """ A bounded cache of distance fields, shared by the DistanceFieldPlanners of all agents.
+
+    A distance field holds the length of the shortest path from every location to a goal. It is identified by the goal,
+    the possible moves and the traversability map it was computed on. The map itself (as bytes) serves as its version;
+    a field is only recomputed when a location changed its traversability, and agents that know the same map share the
+    same fields. When the cache is full, the least recently used field is removed.
+
+    The cache may be used by agents that decide in different threads (see WorldBuilder's concurrent_decisions and
+    decision budgets), so it is guarded by a lock. Fields are computed outside of it.
+    """
+
+    def __init__(self, max_size=100):
+        """
+        Parameters
+        ----------
+        max_size : int, optional
+            The maximum number of distance fields to keep. Defaults to 100.
+        """
+        self.__max_size = max_size
+        self.__fields = OrderedDict()
+        self.__lock = threading.Lock()
+        self.nr_hits = 0
+        self.nr_misses = 0
+
+    def get_field(self, goal, occupation, shape, moves):
+        """ Returns the distance field towards a goal, computing it if it is not cached yet.
+
+        Parameters
+        ----------
+        goal : tuple
+            The (x, y) location to which the distances are computed.
+        occupation : bytes
+            The flattened traversability map, with 0 for each traversable location and 1 otherwise.
+        shape : tuple
+            The (width, height) of the map.
+        moves : tuple
+            The possible (dx, dy, cost) moves.
+
+        Returns
+        -------
+        list
+            The flattened distance field, with index x * height + y. Locations from which the goal cannot be reached
+            have an infinite distance.
+        """
+        key = (goal, moves, shape, occupation)
+        with self.__lock:
+            field = self.__fields.get(key)
+            if field is not None:
+                self.nr_hits += 1
+                self.__fields.move_to_end(key)
+                return field
+            self.nr_misses += 1
+
+        field = self.__compute_field(goal, occupation, shape, moves)
+        with self.__lock:
+            self.__fields[key] = field
+            if len(self.__fields) > self.__max_size:
+                self.__fields.popitem(last=False)
+        return field
+
+    def clear(self):
+        with self.__lock:
+            self.__fields.clear()
+
+    def __getstate__(self):
+        # a lock cannot be pickled, e.g. when the brain of an agent is sent to another process to decide
+        state = self.__dict__.copy()
+        del state["_DistanceFieldCache__lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__fields)
+
+    @staticmethod
+    def __compute_field(goal, occupation, shape, moves):
+        # Dijkstra's algorithm from the goal, following each move in reverse
+        width, height = shape
+        field = [math.inf] * (width * height)
+
+        goal_idx = goal[0] * height + goal[1]
+        if not (0 <= goal[0] < width and 0 <= goal[1] < height) or occupation[goal_idx] != 0:
+            return field
+
+        field[goal_idx] = 0
+        oheap = [(0, goal)]
+        while oheap:
+            dist, current = heapq.heappop(oheap)
+            if dist > field[current[0] * height + current[1]]:
+                continue
+
+            for i, j, cost in moves:
+                x = current[0] - i
+                y = current[1] - j
+                if not (0 <= x < width and 0 <= y < height):
+                    continue
+                idx = x * height + y
+                if occupation[idx] != 0 or dist + cost >= field[idx]:
+                    continue
+                field[idx] = dist + cost
+                heapq.heappush(oheap, (dist + cost, (x, y)))
+
+        return field
+
+
+class DistanceFieldPlanner(PathPlanner):
+    """ Path planning by descending the distance field of the goal.
+
+    The distance fields are stored in a DistanceFieldCache, by default one of the planner itself. Planners that are
+    given DistanceFieldPlanner.shared_cache share their fields, such that agents that know the same map and patrol the
+    same waypoints only compute each field once. As long as the traversability map does not change, planning a path to
+    the same goal (e.g. a waypoint that is patrolled) only takes one step along the field per location on the path.
+    """
+
+    shared_cache = DistanceFieldCache()
+
+    def __init__(self, action_set, cache=None):
+        super().__init__(action_set)
+        self.cache = DistanceFieldCache() if cache is None else cache
+
+        # The possible movements (standing still excluded) and their costs. They are sorted, since ties between equally
+        # short routes are broken by the order of the moves and the order of an action set can differ between runs.
+        self.__moves = tuple(sorted((i, j, math.sqrt(i ** 2 + j ** 2)) for i, j in self.move_actions.values()
+                                    if (i, j) != (0, 0)))
+
+    def plan(self, start, goal, occupation_map, max_length=None):
+        """ Returns the shortest path from start to goal, excluding start itself, or [start] if the goal cannot be
+        reached.
+
+        Parameters
+        ----------
+        start : tuple
+            The (x, y) location to plan from.
+        goal : tuple
+            The (x, y) location to plan to.
+        occupation_map : numpy.ndarray
+            A 2D array, with 0 being traversable and anything else (e.g. 1) not traversable.
+        max_length : int, optional
+            Only return the first max_length locations of the path. Defaults to None, which returns the entire path.
+        """
+        width, height = occupation_map.shape
+        occupation = bytearray((occupation_map != 0).tobytes())
+        # Our own location is always traversable for us, this also makes the map the same for all agents that know it
+        if 0 <= start[0] < width and 0 <= start[1] < height:
+            occupation[start[0] * height + start[1]] = 0
+
+        field = self.cache.get_field(goal=tuple(goal), occupation=bytes(occupation), shape=(width, height),
+                                     moves=self.__moves)
+
+        path = []
+        current = tuple(start)
+        dist = field[current[0] * height + current[1]] if 0 <= current[0] < width and 0 <= current[1] < height \
+            else math.inf
+        if dist == math.inf:
+            # If no path is available we stay put
+            return [start]
+
+        while dist > 0 and (max_length is None or len(path) < max_length):
+            # Take the move that brings us closest to the goal, the first one in case of a tie
+            best_loc, best_dist = None, math.inf
+            for i, j, cost in self.__moves:
+                x = current[0] + i
+                y = current[1] + j
+                if 0 <= x < width and 0 <= y < height and cost + field[x * height + y] < best_dist:
+                    best_loc, best_dist = (x, y), cost + field[x * height + y]
+            current = best_loc
+            dist = field[current[0] * height + current[1]]
+            path.append(current)
+
+        return path
+
+
+class DStarLitePlanner(PathPlanner):
+    """ D* Lite algorithm for path planning, which repairs its previous search when the map changes.
+
+    The search runs backwards from the goal to the agent and is kept between calls of plan. As long as the goal stays
+    the same, only the locations that changed their traversability since the previous call (e.g. a door that opened or
+    a wall that collapsed) and the distances that depend on them are updated, after which the search continues from
+    the new location of the agent. A new goal, map size or set of moves starts a new search.
+
+    Based on the optimized version of D* Lite in: S. Koenig and M. Likhachev, "D* Lite", AAAI 2002.
+    """
+
+    def __init__(self, action_set):
+        super().__init__(action_set)
+
+        # The possible movements (standing still excluded) and their costs, sorted to break ties the same in every run
+        self.__moves = sorted((i, j, math.sqrt(i ** 2 + j ** 2)) for i, j in self.move_actions.values()
+                              if (i, j) != (0, 0))
+
+        # The search state, (re)initialized by __initialize for every new goal
+        self.__goal = None
+        self.__occupation_map = None
+        self.__occupation = None
+        self.__g = {}
+        self.__rhs = {}
+        self.__open = {}  # location -> its current key in the open heap
+        self.__oheap = []
+        self.__km = 0
+        self.__last_start = None
+
+        # Statistics on the amount of work, e.g. for benchmarking
+        self.nr_searches = 0
+        self.nr_expansions = 0
+
+    def plan(self, start, goal, occupation_map, max_length=None):
+        """ Returns the shortest path from start to goal, excluding start itself, or [start] if the goal cannot be
+        reached.
+
+        Parameters
+        ----------
+        start : tuple
+            The (x, y) location to plan from.
+        goal : tuple
+            The (x, y) location to plan to.
+        occupation_map : numpy.ndarray
+            A 2D array, with 0 being traversable and anything else (e.g. 1) not traversable.
+        max_length : int, optional
+            Only return the first max_length locations of the path. Defaults to None, which returns the entire path.
+        """
+        start, goal = tuple(start), tuple(goal)
+        occupation_map = occupation_map != 0
+        # Our own location is always traversable for us (and we should not see it as a change when we move)
+        if 0 <= start[0] < occupation_map.shape[0] and 0 <= start[1] < occupation_map.shape[1]:
+            occupation_map[start] = False
+
+        if goal != self.__goal or self.__occupation_map is None or occupation_map.shape != self.__occupation_map.shape:
+            self.__initialize(start, goal, occupation_map)
+        else:
+            self.__km += self.__heuristic(self.__last_start, start)
+            self.__last_start = start
+            self.__update_map(occupation_map)
+
+        self.__compute_shortest_path(start)
+
+        if self.__g.get(start, math.inf) == math.inf:
+            # If no path is available we stay put
+            return [start]
+
+        # Follow the distances towards the goal
+        path = []
+        current = start
+        while current != goal and (max_length is None or len(path) < max_length):
+            current = min(self.__successors(current), key=lambda succ: succ[1] + self.__g.get(succ[0], math.inf))[0]
+            path.append(current)
+        return path
+
+    def __initialize(self, start, goal, occupation_map):
+        self.nr_searches += 1
+        self.__goal = goal
+        self.__occupation_map = occupation_map
+        self.__occupation = occupation_map.tolist()
+        self.__g = {}
+        self.__rhs = {goal: 0}
+        self.__open = {}
+        self.__oheap = []
+        self.__km = 0
+        self.__last_start = start
+        self.__push(goal, self.__calculate_key(goal, start))
+
+    def __update_map(self, occupation_map):
+        changed = np.argwhere(occupation_map != self.__occupation_map)
+        self.__occupation_map = occupation_map
+        if len(changed) == 0:
+            return
+
+        for x, y in changed.tolist():
+            self.__occupation[x][y] = bool(occupation_map[x, y])
+
+        # The cost of all moves from and to a changed location changed, so update the location and its predecessors
+        for x, y in changed.tolist():
+            self.__update_vertex((x, y))
+            for pred, _ in self.__predecessors((x, y)):
+                self.__update_vertex(pred)
+
+    def __compute_shortest_path(self, start):
+        g, rhs = self.__g, self.__rhs
+        while self.__oheap:
+            key, loc = self.__oheap[0]
+            if self.__open.get(loc) != key:
+                # a lazily deleted entry
+                heapq.heappop(self.__oheap)
+                continue
+
+            # Locations with the same key as the start (give or take rounding errors) may lie on a shortest path as
+            # well, so these are processed too before the distances can be followed from the start
+            start_g, start_rhs = g.get(start, math.inf), rhs.get(start, math.inf)
+            if key[0] > self.__calculate_key(start, start)[0] + 1e-9 and start_rhs == start_g:
+                break
+
+            self.nr_expansions += 1
+            new_key = self.__calculate_key(loc, start)
+            loc_g, loc_rhs = g.get(loc, math.inf), rhs.get(loc, math.inf)
+            if key < new_key:
+                self.__push(loc, new_key)
+            elif loc_g > loc_rhs:
+                g[loc] = loc_rhs
+                self.__remove(loc)
+                for pred, cost in self.__predecessors(loc):
+                    if pred != self.__goal and cost + loc_rhs < rhs.get(pred, math.inf):
+                        rhs[pred] = cost + loc_rhs
+                    self.__update_vertex(pred, recompute_rhs=False)
+            else:
+                g[loc] = math.inf
+                for pred, cost in self.__predecessors(loc) + [(loc, 0)]:
+                    self.__update_vertex(pred)
+
+    def __update_vertex(self, loc, recompute_rhs=True):
+        if recompute_rhs and loc != self.__goal:
+            self.__rhs[loc] = min([cost + self.__g.get(succ, math.inf) for succ, cost in self.__successors(loc)],
+                                  default=math.inf)
+
+        if self.__g.get(loc, math.inf) != self.__rhs.get(loc, math.inf):
+            self.__push(loc, self.__calculate_key(loc, self.__last_start))
+        else:
+            self.__remove(loc)
+
+    def __successors(self, loc):
+        # The locations we can move to from loc, with the cost of that move. Intraversable locations have none.
+        if self.__occupation[loc[0]][loc[1]]:
+            return []
+        width, height = self.__occupation_map.shape
+        successors = []
+        for i, j, cost in self.__moves:
+            x = loc[0] + i
+            y = loc[1] + j
+            if 0 <= x < width and 0 <= y < height and not self.__occupation[x][y]:
+                successors.append(((x, y), cost))
+        return successors
+
+    def __predecessors(self, loc):
+        # The locations from which we can move to loc, with the cost of that move. Intraversable locations are included
+        # (with an infinite cost), so their distances are updated when loc changes.
+        width, height = self.__occupation_map.shape
+        is_blocked = self.__occupation[loc[0]][loc[1]]
+        predecessors = []
+        for i, j, cost in self.__moves:
+            x = loc[0] - i
+            y = loc[1] - j
+            if 0 <= x < width and 0 <= y < height:
+                blocked = is_blocked or self.__occupation[x][y]
+                predecessors.append(((x, y), math.inf if blocked else cost))
+        return predecessors
+
+    def __calculate_key(self, loc, start):
+        min_g = min(self.__g.get(loc, math.inf), self.__rhs.get(loc, math.inf))
+        return min_g + self.__heuristic(start, loc) + self.__km, min_g
+
+    @staticmethod
+    def __heuristic(p1, p2):
+        return math.sqrt((p1[0] - p2[0]) ** 2 + (p1[1] - p2[1]) ** 2)
+
+    def __push(self, loc, key):
+        self.__open[loc] = key
+        heapq.heappush(self.__oheap, (key, loc))
+
+    def __remove(self, loc):
+        # the entry itself is skipped once it is popped
+        self.__open.pop(loc, None)
+
+
+class RoomGraphPlanner(PathPlanner):
+    """ Hierarchical path planning, first through a RoomGraph of rooms and doors and then with A* on the grid.
+
+    When the start and goal lie in different regions (the inside of a room or the outside of all rooms), the doors to
+    pass are planned first through the room graph. Only the path to the first of these doors is then planned with A*,
+    with all other doors closed so the search does not enter any other room. This path is reused on the next steps for
+    as long as the agent follows it, the first door on the route stays the same and the path remains traversable.
+
+    Rooms that are not part of the graph, or a route through the graph that turns out to be blocked, make the planner
+    fall back to A* over the whole grid.
+    """
+
+    def __init__(self, action_set, room_graph=None):
+        super().__init__(action_set)
+        self.room_graph = RoomGraph() if room_graph is None else room_graph
+        self.a_star = AStarPlanner(action_set=action_set, metric=AStarPlanner.EUCLIDEAN_METRIC)
+
+        # The path to the first door on the route (or the goal) that was planned last
+        self.__leg_goal = None
+        self.__leg_path = []
+
+    def plan(self, start, goal, occupation_map):
+        """ Returns the shortest path from start to the first door to pass towards goal, or to goal itself if no door
+        needs to be passed. Returns [start] if goal cannot be reached.
+        """
+        start, goal = tuple(start), tuple(goal)
+        open_doors = [door for door in self.room_graph.doors
+                      if 0 <= door[0] < occupation_map.shape[0] and 0 <= door[1] < occupation_map.shape[1]
+                      and occupation_map[door] == 0]
+        door_route = self.room_graph.get_door_route(start, goal, open_doors)
+        if door_route is None:
+            self.__leg_goal = None
+            return self.a_star.plan(start=start, goal=goal, occupation_map=occupation_map)
+
+        # Close all other doors, so the search does not enter any room we do not need to pass
+        leg_goal = door_route[0] if door_route else goal
+        leg_map = occupation_map.copy()
+        for door in open_doors:
+            if door != leg_goal:
+                leg_map[door] = 1
+
+        path = self.__follow_leg(start, leg_goal, leg_map)
+        if path is None:
+            path = self.a_star.plan(start=start, goal=leg_goal, occupation_map=leg_map)
+            self.__leg_goal, self.__leg_path = leg_goal, path
+        if path != [start] or start == leg_goal:
+            return path
+
+        self.__leg_goal = None
+        return self.a_star.plan(start=start, goal=goal, occupation_map=occupation_map)
+
+    def __follow_leg(self, start, leg_goal, leg_map):
+        # Returns the rest of the previously planned path if we are still on it and it can still be traversed
+        if leg_goal != self.__leg_goal or start not in self.__leg_path:
+            return None
+        path = self.__leg_path[self.__leg_path.index(start) + 1:]
+        if len(path) == 0 or any(leg_map[loc] != 0 for loc in path):
+            return None
+        self.__leg_path = path
+        return path
+
+
 class Waypoint:
 
     def __init__(self, loc, priority):
@@ -0,0 +1,163 @@
+import math
+
+
+class RoomGraph:
+    """ An abstract graph of the rooms in a world and the doors through which they can be entered.
+
+    The graph is built from the walls and doors an agent knows of that belong to a room, which are those added through
+    WorldBuilder.add_room (with a `room_name` property) or objects with a `room` property such as the walls and doors
+    of AIMS. A room spans the bounding box of its walls and doors. The world is divided into regions; the inside of each
+    room and the outside of all rooms. Rooms may be nested, such as rooms inside a "world_bounds" room that encloses the
+    whole world, in which case a location is part of the smallest room it lies in. Each door connects the regions on
+    either side of it.
+
+    Whether a door can be passed is not stored in the graph, but read from the traversability map on each search. As
+    such, a door that is closed (or collapsed) is avoided as soon as the agent knows of it.
+    """
+
+    OUTSIDE = None
+
+    def __init__(self):
+        self.__known_ids = set()
+        self.__room_cells = {}  # room name -> set of its wall and door locations
+        self.__doors = set()  # all door locations
+        self.__bounds = {}  # room name -> (min x, min y, max x, max y), from the smallest to the largest room
+        self.__boundary = {}  # location -> set of rooms of which it is a wall or door
+        self.__door_regions = {}  # door location -> set of regions it connects
+
+    def update(self, state):
+        """ Adds the walls and doors of rooms in the state that are not part of the graph yet.
+
+        Parameters
+        ----------
+        state : dict
+            A state, e.g. the memorized state of a StateTracker.
+
+        Returns
+        -------
+        bool
+            Whether the graph changed.
+        """
+        changed = False
+        for obj_id, properties in state.items():
+            if obj_id == "World" or obj_id in self.__known_ids:
+                continue
+            self.__known_ids.add(obj_id)
+
+            room = properties.get("room_name", properties.get("room", None))
+            # Only the (intraversable) walls and the doors of a room define it
+            is_door = "is_open" in properties
+            if room is None or (not is_door and properties.get("is_traversable", True)):
+                continue
+
+            loc = tuple(properties["location"])
+            self.__room_cells.setdefault(room, set()).add(loc)
+            if is_door:
+                self.__doors.add(loc)
+            changed = True
+
+        if changed:
+            self.__build()
+        return changed
+
+    @property
+    def rooms(self):
+        """ The names of all known rooms. """
+        return list(self.__room_cells.keys())
+
+    @property
+    def doors(self):
+        """ The locations of all known doors. """
+        return list(self.__doors)
+
+    def get_regions(self, loc):
+        """ Returns the set of regions (room names, or RoomGraph.OUTSIDE) a location is part of. A door is part of the
+        regions it connects, any other wall of a room is part of none.
+        """
+        loc = tuple(loc)
+        if loc in self.__door_regions:
+            return self.__door_regions[loc]
+        if loc in self.__boundary:
+            return set()
+        return {self.__get_region(loc)}
+
+    def get_door_route(self, start, goal, open_doors):
+        """ Returns the doors to pass to go from start to goal, based on the straight line distances between them.
+
+        Parameters
+        ----------
+        start : tuple
+            The (x, y) location to start from.
+        goal : tuple
+            The (x, y) location to go to.
+        open_doors : list
+            The locations of the doors that can be passed.
+
+        Returns
+        -------
+        list
+            The door locations in the order to pass them, which is empty when start and goal are in the same region,
+            or None if goal cannot be reached through these doors.
+        """
+        start, goal = tuple(start), tuple(goal)
+        start_regions, goal_regions = self.get_regions(start), self.get_regions(goal)
+        if start_regions & goal_regions:
+            return []
+
+        # Dijkstra over the doors, where two doors are connected if they share a region
+        nodes = [start] + [door for door in open_doors if door != start and door != goal] + [goal]
+        regions = [start_regions] + [self.__door_regions[door] for door in nodes[1:-1]] + [goal_regions]
+        dist = [math.inf] * len(nodes)
+        came_from = [None] * len(nodes)
+        dist[0] = 0
+        unvisited = set(range(len(nodes)))
+        while unvisited:
+            current = min(unvisited, key=lambda idx: dist[idx])
+            if dist[current] == math.inf:
+                return None
+            if current == len(nodes) - 1:
+                break
+            unvisited.remove(current)
+
+            for neighbour in unvisited:
+                if not regions[current] & regions[neighbour]:
+                    continue
+                tentative_dist = dist[current] + math.dist(nodes[current], nodes[neighbour])
+                if tentative_dist < dist[neighbour]:
+                    dist[neighbour] = tentative_dist
+                    came_from[neighbour] = current
+
+        route = []
+        current = came_from[len(nodes) - 1]
+        while current is not None and current != 0:
+            route.append(nodes[current])
+            current = came_from[current]
+        return route[::-1]
+
+    def __build(self):
+        bounds = {}
+        self.__boundary = {}
+        for room, cells in self.__room_cells.items():
+            xs = [loc[0] for loc in cells]
+            ys = [loc[1] for loc in cells]
+            bounds[room] = (min(xs), min(ys), max(xs), max(ys))
+            for loc in cells:
+                self.__boundary.setdefault(loc, set()).add(room)
+
+        # Ordered by area, such that the first room found to contain a location is the innermost one
+        self.__bounds = dict(sorted(bounds.items(), key=lambda item: (item[1][2] - item[1][0]) *
+                                                                     (item[1][3] - item[1][1])))
+
+        # A door connects the regions of its direct neighbours that are not a wall themselves
+        self.__door_regions = {}
+        for door in self.__doors:
+            neighbours = [(door[0] + 1, door[1]), (door[0] - 1, door[1]), (door[0], door[1] + 1),
+                          (door[0], door[1] - 1)]
+            self.__door_regions[door] = {self.__get_region(loc) for loc in neighbours if loc not in self.__boundary}
+
+    def __get_region(self, loc):
+        # The smallest room in which the location lies, or OUTSIDE if it does not lie inside any room
+        for room, (min_x, min_y, max_x, max_y) in self.__bounds.items():
+            if min_x < loc[0] < max_x and min_y < loc[1] < max_y:
+                return room
+        return self.OUTSIDE
@@ -1,7 +1,5 @@
 import numpy as np
 
-from matrxs.utils.utils import get_distance
-
 
 class StateTracker:
 
@@ -20,8 +18,25 @@ class StateTracker:
 
         # here we store our information, a regular state dict
         self.__memorized_state = {}
-        # our dict in which we keep track of the decays of each object
-        self.__decay_values = {}
+
+        # Each memorized object gets a slot in the arrays below, so decaying and checking which objects we should
+        # perceive (but did not) is done for all objects at once
+        self.__slots = {}  # object id -> slot
+        self.__slot_ids = []  # slot -> object id (None if the slot is free)
+        self.__free_slots = []
+        self.__decay_values = np.zeros(0)  # the memory decay of each object
+        self.__is_memorized = np.zeros(0, dtype=bool)  # whether the slot is in use
+        self.__has_location = np.zeros(0, dtype=bool)  # whether the object has a location (e.g. not the World)
+        self.__locations = np.zeros((0, 2), dtype=int)
+        self.__blocks = np.zeros(0, dtype=bool)  # whether the object is intraversable
+        self.__class_idxs = np.zeros(0, dtype=int)  # index of the object's class name in self.__classes
+        self.__classes = {}  # class name -> index
+
+        # The number of intraversable objects per location, and the (inverted) traversability maps derived from it.
+        # These are created as soon as we know the size of the world.
+        self.__nr_blocking = None
+        self.__traverse_map = None
+        self.__inverted_traverse_map = None
 
     def set_knowledge_decay(self, knowledge_decay):
         self.__decay = knowledge_decay
@@ -32,70 +47,132 @@ class StateTracker:
     def update(self, state):
 
         # Update all of the objects decays
-        for id in self.__decay_values.keys():
-            self.__decay_values[id] -= self.__decay
+        self.__decay_values[self.__is_memorized] -= self.__decay
 
         # Check if we need to remove an object
-        temp_decay_values = list(self.__decay_values.items()).copy()
-        for id, decay in temp_decay_values:
-            if decay < 0:
-                self.__memorized_state.pop(id)
-                self.__decay_values.pop(id)
+        for slot in np.flatnonzero(self.__is_memorized & (self.__decay_values < 0)):
+            self.__forget(self.__slot_ids[slot])
+
+        # Create (or resize) our traversability maps if we learn about the size of the world
+        if "World" in state and (self.__nr_blocking is None or
+                                 self.__nr_blocking.shape != tuple(state["World"]["grid_shape"])):
+            self.__create_maps(state["World"]["grid_shape"])
 
         # Loop over the given state and update our memorized state
+        perceived_slots = []
         for id, properties in state.items():
             # the object is new for our memory, previously forgotten or already in our memory and we update it
-            self.__memorized_state[id] = properties
-            self.__decay_values[id] = 1.0  # (re)set the memory decay
+            perceived_slots.append(self.__memorize(id, properties))  # (re)sets the memory decay as well
+        perceived = np.zeros(len(self.__slot_ids), dtype=bool)
+        perceived[perceived_slots] = True
 
         # Now check if there is an object that we memorized to be at some place we should still be able to perceive but
         # did not find that object there
         sense_capability = state[self.agent_id]['sense_capability']  # get the agent's sense capability
         agent_loc = state[self.agent_id]['location']  # get the agent's location
-        temp_memorized_state = list(self.__memorized_state.items()).copy()
-        for id, properties in temp_memorized_state:
-            # We only remove it if it is also not in the given state (since then we updated it just now!)
-            if id in state.keys():
-                continue
-
-            # Get the location, distance and object class
-            loc = properties['location']  # location of memorized object
-            distance = get_distance(agent_loc, loc)  # distance to object
-            obj_class = properties['class_inheritance'][0]  # type of memorized object
-
-            # Obtain the perceive range for the object
-            if obj_class in sense_capability:
-                perceive_range = sense_capability[obj_class]
-            elif "*" in sense_capability:
-                perceive_range = sense_capability["*"]
-            else:
-                perceive_range = -1
+
+        # We only remove it if it is also not in the given state (since then we updated it just now!)
+        candidates = np.flatnonzero(self.__is_memorized & self.__has_location & ~perceived)
+        if len(candidates) > 0:
+            # Obtain the perceive range for each class of object
+            perceive_ranges = np.full(len(self.__classes), -1.0)
+            for obj_class, class_idx in self.__classes.items():
+                if obj_class in sense_capability:
+                    perceive_ranges[class_idx] = sense_capability[obj_class]
+                elif "*" in sense_capability:
+                    perceive_ranges[class_idx] = sense_capability["*"]
 
             # check if obj is in range and is not in state anymore
-            if distance <= perceive_range:
-                self.__memorized_state.pop(id)
-                self.__decay_values.pop(id)
+            distances = np.sqrt(np.sum((self.__locations[candidates] - np.asarray(agent_loc)) ** 2, axis=1))
+            for slot in candidates[distances <= perceive_ranges[self.__class_idxs[candidates]]]:
+                self.__forget(self.__slot_ids[slot])
 
         return self.get_memorized_state()
 
     def get_traversability_map(self, inverted=False):
-        map_size = self.__memorized_state['World']['grid_shape']
-        traverse_map = np.array([[int(not inverted) for _ in range(map_size[1])] for _ in range(map_size[0])])
-
-        for id, properties in self.__memorized_state.items():
-
-            if id == "World":
-                continue
-
-            loc = properties['location']
-
-            # if another object on that location is intraversable, don't overwrite it
-            if (traverse_map[loc[0], loc[1]] == 0 and not inverted) or \
-                (traverse_map[loc[0], loc[1]] == 1 and inverted):
-                continue
-
-            # add the traversability to the map
-            traverse_map[loc[0], loc[1]] = int(properties['is_traversable']) \
-                if not inverted else int(not(properties['is_traversable']))
-
+        """ Returns the traversability map of all memorized objects; 1 for each traversable location and 0 for each
+        location with at least one intraversable object, or the other way around if inverted.
+
+        The map is kept up to date with every update, so this returns a read-only view of it instead of a new map. Copy
+        it to obtain a map that can be changed (or that is not changed by the next update).
+        """
+        if self.__nr_blocking is None:
+            raise Exception(f"The agent {self.agent_id} does not know the size of the world yet, as no state with the "
+                            f"World in it was given to its StateTracker.")
+
+        traverse_map = (self.__inverted_traverse_map if inverted else self.__traverse_map).view()
+        traverse_map.flags.writeable = False
         return traverse_map
+
+    def __memorize(self, id, properties):
+        slot = self.__slots.get(id)
+        if slot is None:
+            slot = self.__allocate_slot(id)
+        elif self.__blocks[slot]:
+            self.__change_nr_blocking(self.__locations[slot], -1)
+
+        self.__memorized_state[id] = properties
+        self.__decay_values[slot] = 1.0  # (re)set the memory decay
+
+        if id == "World":
+            self.__has_location[slot] = False
+            self.__blocks[slot] = False
+            return slot
+
+        obj_class = properties['class_inheritance'][0]  # type of memorized object
+        self.__has_location[slot] = True
+        self.__locations[slot] = properties['location']
+        self.__blocks[slot] = not properties['is_traversable']
+        self.__class_idxs[slot] = self.__classes.setdefault(obj_class, len(self.__classes))
+
+        # if another object on that location is intraversable it remains intraversable
+        if self.__blocks[slot]:
+            self.__change_nr_blocking(self.__locations[slot], 1)
+
+        return slot
+
+    def __forget(self, id):
+        slot = self.__slots.pop(id)
+        self.__memorized_state.pop(id)
+        if self.__blocks[slot]:
+            self.__change_nr_blocking(self.__locations[slot], -1)
+
+        self.__slot_ids[slot] = None
+        self.__is_memorized[slot] = False
+        self.__blocks[slot] = False
+        self.__free_slots.append(slot)
+
+    def __allocate_slot(self, id):
+        if len(self.__free_slots) == 0:
+            # Double the size of all arrays
+            nr_slots = len(self.__slot_ids)
+            new_nr_slots = max(2 * nr_slots, 16)
+            self.__slot_ids.extend([None] * (new_nr_slots - nr_slots))
+            self.__free_slots = list(range(new_nr_slots - 1, nr_slots - 1, -1))
+            self.__decay_values = np.resize(self.__decay_values, new_nr_slots)
+            self.__is_memorized = np.concatenate([self.__is_memorized, np.zeros(new_nr_slots - nr_slots, dtype=bool)])
+            self.__has_location = np.resize(self.__has_location, new_nr_slots)
+            self.__locations = np.resize(self.__locations, (new_nr_slots, 2))
+            self.__blocks = np.concatenate([self.__blocks, np.zeros(new_nr_slots - nr_slots, dtype=bool)])
+            self.__class_idxs = np.resize(self.__class_idxs, new_nr_slots)
+
+        slot = self.__free_slots.pop()
+        self.__slots[id] = slot
+        self.__slot_ids[slot] = id
+        self.__is_memorized[slot] = True
+        return slot
+
+    def __create_maps(self, grid_shape):
+        self.__nr_blocking = np.zeros(grid_shape, dtype=int)
+        blocking = self.__is_memorized & self.__blocks
+        np.add.at(self.__nr_blocking, (self.__locations[blocking, 0], self.__locations[blocking, 1]), 1)
+        self.__traverse_map = (self.__nr_blocking == 0).astype(int)
+        self.__inverted_traverse_map = (self.__nr_blocking > 0).astype(int)
+
+    def __change_nr_blocking(self, loc, change):
+        if self.__nr_blocking is None:
+            return
+        x, y = loc
+        self.__nr_blocking[x, y] += change
+        self.__traverse_map[x, y] = int(self.__nr_blocking[x, y] == 0)
+        self.__inverted_traverse_map[x, y] = int(self.__nr_blocking[x, y] > 0)
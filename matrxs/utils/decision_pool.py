@@ -0,0 +1,91 @@
+import concurrent.futures
+
+from matrxs.agents.remote_agent_brain import RemoteAgentBrain
+
+
+def _action_possible_unavailable(agent_id, action, action_kwargs):
+    raise Exception(f"Agent {agent_id} called is_action_possible while deciding in another process, where the GridWorld "
+                    f"is not available. Let it decide in a thread instead, or do not use is_action_possible.")
+
+
+def _call_brain_in_process(brain_class, brain_state, method_name, kwargs):
+    # Restore the brain from its state, call the method and return its changed state along with the result
+    brain = brain_class.__new__(brain_class)
+    brain.__dict__.update(brain_state)
+    brain._AgentBrain__callback_is_action_possible = _action_possible_unavailable
+    result = getattr(brain, method_name)(**kwargs)
+    return DecisionPool._get_brain_state(brain), result
+
+
+class DecisionPool:
+    """ Evaluates the brains of agents concurrently, in a pool of threads or processes.
+
+    Threads are cheap to hand a brain to, but only run brains at the same time when these release the GIL (e.g. in
+    numpy or other native code). Processes run any brain at the same time, but each call sends a pickled copy of the
+    brain to a process and the changed brain back, after which the original brain is updated with it. This requires the
+    brains to be picklable and not to share (mutable) objects with each other, and while deciding in another process
+    a brain cannot use is_action_possible. As all attributes of a brain are pickled for every call, processes only
+    pay off for brains that take long to decide compared to the size of their attributes.
+
+    A RemoteAgentBrain is not evaluated by the pool but by the process that hosts its brain, to which the calls of all
+    remote brains are sent at once.
+    """
+
+    THREAD = "thread"
+    PROCESS = "process"
+
+    # The attributes of a brain that are not sent to another process; the callback to the GridWorld and the traced
+    # versions of its methods (see GridWorld), which remain those of the original brain
+    _LOCAL_ATTRIBUTES = ("_AgentBrain__callback_is_action_possible", "filter_observations", "decide_on_action")
+
+    def __init__(self, mode, max_workers=None):
+        """
+        Parameters
+        ----------
+        mode : str
+            Either DecisionPool.THREAD or DecisionPool.PROCESS.
+        max_workers : int, optional
+            The number of threads or processes. Defaults to None, which uses the default of the concurrent.futures
+            executors (based on the number of processors).
+        """
+        if mode not in (self.THREAD, self.PROCESS):
+            raise ValueError(f"The given mode {mode} should be either '{self.THREAD}' or '{self.PROCESS}'.")
+
+        self.__mode = mode
+        if mode == self.THREAD:
+            self.__executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                                    thread_name_prefix="decision_pool")
+        else:
+            self.__executor = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+
+    @property
+    def mode(self):
+        return self.__mode
+
+    def submit(self, brain, method_name, **kwargs):
+        """ Starts calling a method of a brain, such as "_get_action" or "filter_observations", with the given keyword
+        arguments. Returns a Future of which the result is obtained through get_result. """
+        if isinstance(brain, RemoteAgentBrain):
+            return brain._submit_call(method_name, **kwargs)
+        if self.__mode == self.THREAD:
+            return self.__executor.submit(getattr(brain, method_name), **kwargs)
+        return self.__executor.submit(_call_brain_in_process, brain.__class__, self._get_brain_state(brain),
+                                      method_name, kwargs)
+
+    def get_result(self, brain, future):
+        """ Waits for a call started by submit and returns its result. When the brain was called in another process, it
+        is first updated with the changes made to it in that process. """
+        if isinstance(brain, RemoteAgentBrain):
+            return brain._get_call_result(future)
+        if self.__mode == self.THREAD:
+            return future.result()
+        brain_state, result = future.result()
+        brain.__dict__.update(brain_state)
+        return result
+
+    def shutdown(self):
+        self.__executor.shutdown(wait=True)
+
+    @staticmethod
+    def _get_brain_state(brain):
+        return {name: value for name, value in brain.__dict__.items() if name not in DecisionPool._LOCAL_ATTRIBUTES}
@@ -0,0 +1,161 @@
+from collections import deque
+from collections.abc import Sequence
+from itertools import islice
+
+from matrxs.utils.message import Message
+
+
+class Inbox:
+    """ The messages received by an agent, of which only the most recent ones are kept.
+
+    By default all messages are kept. How many messages are kept can be limited by their number, by the number of
+    ticks since they were received, or both. The messages received since the agent last decided on an action are
+    available as the new messages, such that an agent only has to process those instead of all messages it ever
+    received.
+    """
+
+    DEFAULT_MAX_MESSAGES = None
+
+    def __init__(self, max_messages=DEFAULT_MAX_MESSAGES, max_ticks=None):
+        """
+        Parameters
+        ----------
+        max_messages : int, optional
+            The maximum number of messages kept, the oldest message is forgotten when a new one is received. None keeps
+            any number of messages. Defaults to Inbox.DEFAULT_MAX_MESSAGES, which is None.
+        max_ticks : int, optional
+            The number of most recent ticks of which the received messages are kept. None keeps the messages of all
+            ticks. Defaults to None.
+        """
+        for name, value in [("max_messages", max_messages), ("max_ticks", max_ticks)]:
+            if value is not None and (not isinstance(value, int) or value < 1):
+                raise ValueError(f"The given {name} {value} should be None or an int larger or equal to 1.")
+
+        self.__max_ticks = max_ticks
+        self.__messages = deque(maxlen=max_messages)  # (tick, message) tuples, oldest first
+        self.__nr_received = 0  # the total number of messages received
+        self.__nr_read = 0  # the total number of messages received when they were last marked as read
+        self.__last_tick = None  # the tick at which the last message with a tick was received
+
+    def add(self, message, tick=None):
+        """ Adds a received message.
+
+        Parameters
+        ----------
+        message : Message, MessageEnvelope
+            The received message.
+        tick : int, optional
+            The tick at which the message was received, required to keep the messages of a number of ticks. Defaults
+            to None, in which case the message is taken to be received at the tick of the last message with a tick.
+        """
+        if tick is None:
+            tick = self.__last_tick
+        else:
+            self.__last_tick = tick
+        self.__messages.append((tick, message))
+        self.__nr_received += 1
+
+        # forget the messages received before the tick window
+        if self.__max_ticks is not None and tick is not None:
+            # messages received before any tick was known have no tick, they are the oldest and forgotten as well
+            while self.__messages[0][0] is None or self.__messages[0][0] <= tick - self.__max_ticks:
+                self.__messages.popleft()
+
+    @property
+    def messages(self):
+        """ All kept messages, oldest first. """
+        return [message for _, message in self.__messages]
+
+    @property
+    def new_messages(self):
+        """ The kept messages received since they were last marked as read, oldest first. """
+        nr_new = min(self.__nr_received - self.__nr_read, len(self.__messages))
+        return [message for _, message in islice(reversed(self.__messages), nr_new)][::-1]
+
+    @property
+    def nr_received(self):
+        """ The total number of messages received, including those that are no longer kept. """
+        return self.__nr_received
+
+    def mark_read(self):
+        """ Marks all messages as read, such that new_messages only returns messages received after this call. """
+        self.__nr_read = self.__nr_received
+
+    def clear(self):
+        """ Forgets all messages. """
+        self.__messages.clear()
+        self.__nr_read = self.__nr_received
+
+    def remove(self, idx):
+        """ Forgets the message at index idx of the kept messages (oldest first). """
+        nr_new = min(self.__nr_received - self.__nr_read, len(self.__messages))
+        if idx < 0:
+            idx += len(self.__messages)
+        if not 0 <= idx < len(self.__messages):
+            raise IndexError("Inbox index out of range")
+
+        del self.__messages[idx]
+        # a removed new message is no longer new
+        if idx >= len(self.__messages) + 1 - nr_new:
+            self.__nr_read += 1
+
+    def get(self, idx):
+        """ Returns the message at index idx of the kept messages (oldest first), or a list of them for a slice. """
+        if isinstance(idx, slice):
+            return [message for _, message in list(self.__messages)[idx]]
+        return self.__messages[idx][1]
+
+    def __iter__(self):
+        return (message for _, message in self.__messages)
+
+    def __len__(self):
+        return len(self.__messages)
+
+
+class InboxContents(Sequence):
+    """ A list-like view of the content of the messages kept in an Inbox, oldest first, which is what
+    AgentBrain.received_messages returns.
+
+    Besides reading it, the view can be cleared, appended to or have items deleted, which changes the inbox itself.
+    Appended content is added to the inbox as a Message without a sender.
+    """
+
+    def __init__(self, inbox):
+        self.__inbox = inbox
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [message.content for message in self.__inbox.get(idx)]
+        return self.__inbox.get(idx).content
+
+    def __len__(self):
+        return len(self.__inbox)
+
+    def __iter__(self):
+        return (message.content for message in self.__inbox)
+
+    def __delitem__(self, idx):
+        if isinstance(idx, slice):
+            # remove from the back, such that the indices of the remaining items to remove do not change
+            for item_idx in sorted(range(*idx.indices(len(self))), reverse=True):
+                self.__inbox.remove(item_idx)
+        else:
+            self.__inbox.remove(idx)
+
+    def append(self, content):
+        self.__inbox.add(Message(content=content, from_id=None))
+
+    def extend(self, contents):
+        for content in list(contents):
+            self.append(content)
+
+    def clear(self):
+        self.__inbox.clear()
+
+    def __eq__(self, other):
+        if isinstance(other, (InboxContents, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(list(self))
@@ -26,4 +26,56 @@ class Message:
     def toJSON(self):
         """ Make this class JSON serializable, such that it can be sent as JSON via the API """
         return json.dumps(self, default=lambda o: o.__dict__,
-                          sort_keys=True, indent=4)
\ No newline at end of file
+                          sort_keys=True, indent=4)
+
+class MessageEnvelope:
+    """
+    A sent message together with the IDs of all agents that receive it.
+
+    A single envelope is shared by all receivers of a message (e.g. all agents for a global message, or all members of
+    a team for a team message), instead of creating a copy of the message for every receiver. The envelope gives read
+    access to the properties of the message, but they cannot be changed through it. Since the content of the message
+    is shared as well, a receiver should copy the content before changing it.
+    """
+
+    __slots__ = ("__message", "__recipients", "__json")
+
+    def __init__(self, message, recipients):
+        """
+        :param message: The Message as it was sent, to_id is the receiver as addressed by the sender (e.g. a team name)
+        or "global" for a message to all agents.
+        :param recipients: The IDs of all agents that receive this message.
+        """
+        self.__message = message
+        self.__recipients = tuple(recipients)
+        self.__json = None
+
+    @property
+    def recipients(self):
+        return self.__recipients
+
+    @property
+    def content(self):
+        return self.__message.content
+
+    @property
+    def from_id(self):
+        return self.__message.from_id
+
+    @property
+    def to_id(self):
+        return self.__message.to_id
+
+    @property
+    def message_id(self):
+        return self.__message.message_id
+
+    @property
+    def message_type(self):
+        return self.__message.message_type
+
+    def toJSON(self):
+        """ The JSON of the message (see Message.toJSON), serialized once for all receivers and API requests """
+        if self.__json is None:
+            self.__json = self.__message.toJSON()
+        return self.__json
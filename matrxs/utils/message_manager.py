@@ -1,4 +1,53 @@
+from bisect import bisect_left, bisect_right
+
 from matrxs.agents.agent_brain import  Message
+from matrxs.utils.message import MessageEnvelope
+
+
+class _MessageIndex:
+    """ The messages of one receiver, team or message type, ordered by the tick at which they were sent.
+
+    Each message is stored with its sequence number (the order in which the MessageManager stored it), such that the
+    messages of a range of ticks and the messages since a certain sequence number can both be found through a binary
+    search instead of a scan over all messages.
+
+    Messages are added and removed by the simulation thread, while the API reads them from its own thread. The three
+    parallel lists are therefore held in a single tuple, which a reader obtains once, and removing messages replaces
+    that tuple instead of changing the lists. A reader thus always pairs each message with its own tick.
+    """
+
+    def __init__(self):
+        self.__lists = ([], [], [])  # the ticks, sequence numbers and messages
+
+    def add(self, sequence, tick, envelope):
+        ticks, sequences, messages = self.__lists
+        ticks.append(tick)
+        sequences.append(sequence)
+        messages.append(envelope)
+
+    def get_tick_range(self, tick_from, tick_to):
+        """ Returns (tick, message) tuples of all messages from tick_from up to and including tick_to. """
+        ticks, _, messages = self.__lists
+        start, end = bisect_left(ticks, tick_from), bisect_right(ticks, tick_to)
+        return zip(ticks[start:end], messages[start:end])
+
+    def get_since(self, sequence, end_sequence):
+        """ Returns (tick, message) tuples of all messages with a sequence number of at least `sequence` and below
+        `end_sequence`. """
+        ticks, sequences, messages = self.__lists
+        start, end = bisect_left(sequences, sequence), bisect_left(sequences, end_sequence)
+        return zip(ticks[start:end], messages[start:end])
+
+    def remove_before(self, tick):
+        """ Removes all messages sent before tick. """
+        ticks, sequences, messages = self.__lists
+        start = bisect_left(ticks, tick)
+        if start > 0:
+            self.__lists = (ticks[start:], sequences[start:], messages[start:])
+
+    def __len__(self):
+        return len(self.__lists[2])
+
 
 class MessageManager():
     """ A manager inside the GirdWorld that tracks the received and send messages between agents and their teams.
@@ -8,13 +57,37 @@ class MessageManager():
         - an easy way to log communication (as the messages are easily obtained from a GridWorld instance, through some methods).
     """
 
-    def __init__(self):
+    def __init__(self, retention=None):
+        """
+        Parameters
+        ----------
+        retention : int, optional
+            The number of most recent ticks of which the messages are kept. Defaults to None, which keeps the messages
+            of all ticks.
+        """
+        if retention is not None and (not isinstance(retention, int) or retention < 1):
+            raise ValueError(f"The message retention {retention} should be None or an int of at least 1.")
+        self.retention = retention
+
         # there are three types of messages
         self.global_messages = {} # messages send to everyone
         self.team_messages = {} # messages send to a team
         self.private_messages = {} # messages send to individual agents
 
-        self.preprocessed_messages = {} # all types of messages above unpacked to the corresponding individual messages
+        # all types of messages above as envelopes shared by all their receivers, ready for sending by the GridWorld
+        self.preprocessed_messages = {}
+
+        # The same messages, indexed for fetching them; global messages, team messages per team, and private messages
+        # per agent (both sent and received) and of all agents together
+        self.__global_index = _MessageIndex()
+        self.__team_indices = {}
+        self.__private_indices = {}
+        self.__all_private_index = _MessageIndex()
+
+        # The sequence number of the next message that will be stored, used as cursor to fetch all newer messages. It is
+        # only increased once a message is added to all its indices, such that a message is never skipped by a fetch
+        # from another thread (e.g. that of the API) while it is being stored.
+        self.next_sequence = 0
 
         self.agents = None
         self.teams = None
@@ -52,8 +125,8 @@ class MessageManager():
             # check the message for validity
             MessageManager.__check_message(mssg, mssg.from_id)
 
-            # decode the receiver_string into agent / team / global messages, save seperatly, and split into individual
-            # messages understandable by the GridWorld
+            # decode the receiver_string into agent / team / global messages, save seperatly, and wrap them in envelopes
+            # for all their receivers that are understandable by the GridWorld
             self._decode_message_receiver(mssg, all_agent_ids, teams, tick)
 
 
@@ -62,7 +135,8 @@ class MessageManager():
 
         These types are called private, team, and global messages.
         Messages of each type are saved for every tick seperatly, as well as a list with all preprocessed messages
-        suitable for sending by the GridWorld.
+        suitable for sending by the GridWorld. Each preprocessed message is a single MessageEnvelope shared by all its
+        receivers.
 
         Possible formats for mssg.to_id
         "agent1"                  = private message to agent1 + team "agent1" if it exists
@@ -97,13 +171,10 @@ class MessageManager():
             global_message = Message(content=mssg.content, from_id=mssg.from_id, to_id="global")
             self.global_messages[tick].append(global_message)
 
-            # split in sub mssgs
-            for to_id in all_ids_except_me.copy():
-                # create message
-                new_message = Message(content=mssg.content, from_id=mssg.from_id, to_id=to_id)
-
-                # save in prepr
-                self.preprocessed_messages[tick].append(new_message)  # all messages above combined
+            # a single envelope for everyone except the sender, shared by all of them
+            envelope = MessageEnvelope(global_message, recipients=all_ids_except_me)
+            self.__store(tick, envelope, [self.__global_index])
+            self.preprocessed_messages[tick].append(envelope)  # all messages above combined
 
         # if it is a list, decode every receiver_id in that list again
         elif isinstance(mssg.to_id, list):
@@ -140,14 +211,10 @@ class MessageManager():
                 # save in team mssgs as a message for that specific team
                 self.team_messages[tick][mssg.to_id].append(mssg)
 
-
-                # split in sub mssgs for every agent in the team
-                for to_id in teams[mssg.to_id]:
-                    # create a message
-                    new_message = Message(content=mssg.content, from_id=mssg.from_id, to_id=to_id)
-
-                    # save in prepr
-                    self.preprocessed_messages[tick].append(new_message)
+                # a single envelope for every agent in the team, shared by all of them
+                envelope = MessageEnvelope(mssg, recipients=teams[mssg.to_id])
+                self.__store(tick, envelope, [self.__team_indices.setdefault(mssg.to_id, _MessageIndex())])
+                self.preprocessed_messages[tick].append(envelope)
 
             # check if it is an agent ID (as well)
             # If no team is set by the user, the agent is added to a new team with the same name as the agent's ID.
@@ -159,11 +226,43 @@ class MessageManager():
 
                 # save in private_messages mssgs
                 self.private_messages[tick].append(mssg)
+                envelope = MessageEnvelope(mssg, recipients=[mssg.to_id])
+                self.__store(tick, envelope, [self.__all_private_index] +
+                             [self.__private_indices.setdefault(agent_id, _MessageIndex())
+                              for agent_id in {mssg.from_id, mssg.to_id}])
 
                 # if the message was not already saved in the preprocessed list, save it there as well
                 if not is_team_message:
-                    self.preprocessed_messages[tick].append(mssg)
-
+                    self.preprocessed_messages[tick].append(envelope)
+
+
+    def __store(self, tick, envelope, indices):
+        # adds the message to the indices with the next sequence number, and only then makes that number fetchable
+        sequence = self.next_sequence
+        for index in indices:
+            index.add(sequence, tick, envelope)
+        self.next_sequence = sequence + 1
+
+    def remove_old_messages(self, tick):
+        """ Forgets the messages that fall out of the retention window at the given tick, if there is one. Called by
+        the GridWorld once per tick. """
+        if self.retention is not None:
+            self.__remove_before(tick - self.retention + 1)
+
+    def __remove_before(self, tick):
+        # the messages are stored in order of their tick, so we can stop at the first tick that is kept
+        for messages_per_tick in [self.global_messages, self.team_messages, self.private_messages,
+                                  self.preprocessed_messages]:
+            while len(messages_per_tick) > 0:
+                t = next(iter(messages_per_tick))
+                if t >= tick:
+                    break
+                del messages_per_tick[t]
+
+        indices = [self.__global_index, self.__all_private_index, *self.__team_indices.values(),
+                   *self.__private_indices.values()]
+        for index in indices:
+            index.remove_before(tick)
 
     @staticmethod
     def __check_message(mssg, this_agent_id):
@@ -227,65 +326,55 @@ class MessageManager():
         Private messages: messages['private'][tick] = [list of messages]
 
         """
+        return self.__collect_messages(id, lambda index: index.get_tick_range(tick_from, tick_to))
+
+    def fetch_messages_since(self, sequence, id=None):
+        """ Fetch all messages stored since a certain sequence number, optionally filtered by agent id.
+
+        This allows a client to only receive the messages it did not receive yet; it starts with sequence 0 and then
+        every time asks for the messages since the `next_sequence` it received with its previous request.
+
+        Parameters
+        ----------
+        sequence
+            All messages with this sequence number or a higher one will be collected.
+        id
+            Only messages received by or sent by this agent will be collected.
+
+        Returns
+        -------
+        Tuple of the messages, in the same format as returned by fetch_messages, and the sequence number to ask for
+        with the next request.
+
+        """
+        # Messages may be stored by another thread meanwhile, so only those below the returned cursor are collected
+        next_sequence = self.next_sequence
+        return self.__collect_messages(id, lambda index: index.get_since(sequence, next_sequence)), next_sequence
+
+    def __collect_messages(self, id, select):
+        # select returns the (tick, message) tuples to collect from a message index
         messages = {'global': {}, 'team': {}, 'private': {}}
 
-        # loop through all requested ticks
-        for t in range(tick_from, tick_to + 1):
-            # initialize the message objects to return
-            # messages['global'][t] = None
-            # messages['team'][t] = None
-            # messages['private'][t] = None
-
-            # fetch any existing glolbal messages for this tick
-            if t in self.global_messages:
-                # make the messages JSON serializable and add communication messages
-                messages['global'][t] = []
-                for mssg in self.global_messages[t]:
-                    if mssg.message_type == "communication":
-                        messages['global'][t].append(mssg.toJSON())
-
-            # fetch any team messages
-            if t in self.team_messages:
-                if t not in messages['team']:
-                    messages['team'][t] = {}
-
-                # fetch all team messages
-                if id is None:
-                    # make them JSON serializable and add communication messages
-                    messages['team'][t] = []
-                    for mssg in self.team_messages[t]:
-                        if mssg.message_type == "communication":
-                            messages['global'][t].append(mssg.toJSON())
-
-                # fetch team messages of the team of which the agent is a member
-                else:
-                    for team in self.teams:
-                        if (id in team or id == "god") and team in self.team_messages[t]:
-                            # make the messages JSON serializable and add communication messages
-                            messages['team'][t][team] = []
-                            for mssg in self.team_messages[t][team]:
-                                if mssg.message_type == "communication":
-                                    messages['team'][t][team].append(mssg.toJSON())
-
-
-            # fetch private messages
-            if t in self.private_messages:
-                # fetch all private messages
-                if id is None:
-                    # make them JSON serializable and add communication messages
-                    messages['private'][t]  = []
-                    for mssg in self.private_messages[t]:
-                        if mssg.message_type == "communication":
-                            messages['private'][t].append(mssg.toJSON())
-
-                # fetch private messages sent to or received by the specified agent
-                else:
-                    messages['private'][t] = []
-                    for message in self.private_messages[t]:
-                        # only private messages addressed to or sent by our agent are requested
-                        if message.from_id == id or message.to_id == id or id == "god":
-                            # make the messages JSON serializable and add communication messages
-                            if message.message_type == "communication":
-                                messages['private'][t].append(message.toJSON())
+        # make the messages JSON serializable and add communication messages
+        for t, mssg in select(self.__global_index):
+            if mssg.message_type == "communication":
+                messages['global'].setdefault(t, []).append(mssg.toJSON())
+
+        # fetch all team messages, or those of the teams of which the agent is a member
+        for team, index in list(self.__team_indices.items()):
+            if id is not None and id != "god" and id not in self.teams.get(team, []):
+                continue
+            for t, mssg in select(index):
+                if mssg.message_type == "communication":
+                    messages['team'].setdefault(t, {}).setdefault(team, []).append(mssg.toJSON())
+
+        # fetch all private messages, or those sent to or received by the specified agent
+        if id is None or id == "god":
+            private_index = self.__all_private_index
+        else:
+            private_index = self.__private_indices.get(id, _MessageIndex())
+        for t, mssg in select(private_index):
+            if mssg.message_type == "communication":
+                messages['private'].setdefault(t, []).append(mssg.toJSON())
 
         return messages
@@ -0,0 +1,81 @@
+import copy
+
+
+class ReadOnlyDict(dict):
+    """ A dictionary that cannot be changed, used for the cached properties of EnvObject and AgentBody.
+
+    The properties of an object are cached until the object changes, and the same dictionary is handed to everyone
+    that asks for them (e.g. the API, and every agent that perceives the object in a world with read-only states). As
+    such, it may not be changed in place. Use the object's change_property method to change a property, or call copy()
+    on this dictionary to obtain a mutable version of it.
+
+    A copy (through copy(), copy.copy, copy.deepcopy or pickle) is always a normal, mutable dict in which all nested
+    read-only containers are replaced by mutable copies as well.
+    """
+
+    def __read_only(self, *args, **kwargs):
+        raise TypeError("These properties are read-only. Use change_property of the object to change a property, or "
+                        "call copy() on them to obtain a mutable copy.")
+
+    __setitem__ = __read_only
+    __delitem__ = __read_only
+    __ior__ = __read_only
+    clear = __read_only
+    pop = __read_only
+    popitem = __read_only
+    setdefault = __read_only
+    update = __read_only
+
+    def copy(self):
+        return {key: mutable_copy(value) for key, value in self.items()}
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(self.copy(), memo)
+
+    def __reduce__(self):
+        return dict, (self.copy(),)
+
+
+class ReadOnlyList(list):
+    """ A list that cannot be changed, used for lists inside the cached properties of EnvObject and AgentBody. See
+    ReadOnlyDict.
+    """
+
+    def __read_only(self, *args, **kwargs):
+        raise TypeError("These properties are read-only. Use change_property of the object to change a property, or "
+                        "call copy() on them to obtain a mutable copy.")
+
+    __setitem__ = __read_only
+    __delitem__ = __read_only
+    __iadd__ = __read_only
+    __imul__ = __read_only
+    append = __read_only
+    extend = __read_only
+    insert = __read_only
+    remove = __read_only
+    pop = __read_only
+    clear = __read_only
+    sort = __read_only
+    reverse = __read_only
+
+    def copy(self):
+        return [mutable_copy(value) for value in self]
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(self.copy(), memo)
+
+    def __reduce__(self):
+        return list, (self.copy(),)
+
+
+def mutable_copy(value):
+    """ Returns a mutable copy of a read-only dictionary or list, any other value is returned as is. """
+    if isinstance(value, (ReadOnlyDict, ReadOnlyList)):
+        return value.copy()
+    return value
@@ -0,0 +1,184 @@
+import math
+from collections import OrderedDict
+
+from matrxs.utils.utils import get_distance
+
+
+class SpatialIndex:
+    """ A per-cell and per-class index over all objects and agents registered to a GridWorld.
+
+    The GridWorld keeps this index in sync through the location change callback of each registered EnvObject, and
+    through its own register and remove methods. Range queries only visit the cells that lie within the sense radius
+    (or only the objects of the requested class, whichever is cheaper) instead of every object in the world.
+
+    The result of a query is ordered exactly as a full scan over the GridWorld's environment objects followed by its
+    registered agents would be; first all environment objects in order of registration, then all agents in order of
+    registration.
+    """
+
+    def __init__(self):
+        self.__cells = {}  # location tuple -> {obj_id: env_obj}
+        self.__types = {}  # concrete class -> {obj_id: env_obj}
+        self.__subtypes = {}  # cache of requested class -> list of registered concrete classes that inherit from it
+        self.__order = {}  # obj_id -> (is_agent, registration sequence number)
+        self.__locations = {}  # obj_id -> location tuple under which the object is indexed
+        self.__seq = 0  # registration counter, used to restore the order of a full scan
+
+    def add(self, env_obj, is_agent=False):
+        """ Add an object or agent to the index at its current location.
+
+        Parameters
+        ----------
+        env_obj : EnvObject
+            The object or agent body to add.
+        is_agent : bool
+            Whether this is a registered agent, agents are always ordered after environment objects.
+        """
+        obj_id = env_obj.obj_id
+        if obj_id in self.__locations:
+            # Already indexed (e.g. registered twice), the registration order is kept the same as in an OrderedDict
+            self.__remove_from_cell(obj_id)
+        else:
+            self.__order[obj_id] = (is_agent, self.__seq)
+            self.__seq += 1
+
+        loc = tuple(env_obj.location)
+        self.__locations[obj_id] = loc
+        self.__cells.setdefault(loc, {})[obj_id] = env_obj
+
+        obj_type = type(env_obj)
+        if obj_type not in self.__types:
+            self.__types[obj_type] = {}
+            self.__subtypes = {}  # a new concrete class may be a subclass of any of the cached ones
+        self.__types[obj_type][obj_id] = env_obj
+
+    def remove(self, obj_id):
+        """ Remove an object or agent from the index. Does nothing if it was not indexed.
+
+        Parameters
+        ----------
+        obj_id : str
+            The id of the object or agent to remove.
+        """
+        if obj_id not in self.__locations:
+            return
+        env_obj = self.__remove_from_cell(obj_id)
+        self.__types[type(env_obj)].pop(obj_id, None)
+        self.__order.pop(obj_id)
+        self.__locations.pop(obj_id)
+
+    def move(self, env_obj, new_loc):
+        """ Move an indexed object to a new location. Does nothing if it was not indexed.
+
+        Parameters
+        ----------
+        env_obj : EnvObject
+            The object or agent body that changed location.
+        new_loc : tuple
+            Its new location (x, y).
+        """
+        obj_id = env_obj.obj_id
+        if obj_id not in self.__locations:
+            return
+        new_loc = tuple(new_loc)
+        if self.__locations[obj_id] == new_loc:
+            return
+        self.__remove_from_cell(obj_id)
+        self.__locations[obj_id] = new_loc
+        self.__cells.setdefault(new_loc, {})[obj_id] = env_obj
+
+    def location_of(self, obj_id):
+        """ Returns the location under which an object is indexed, or None if it is not indexed.
+        """
+        return self.__locations.get(obj_id, None)
+
+    def ids_at(self, location):
+        """ Returns the ids of all indexed objects at a location, ordered as in GridWorld.grid (first environment
+        objects, then agents, both in order of registration).
+        """
+        return sorted(self.__cells.get(tuple(location), {}).keys(), key=self.__order.__getitem__)
+
+    def objects_at(self, location):
+        """ Returns a dictionary (obj_id -> object) of all indexed objects at a location, in no particular order.
+        """
+        return self.__cells.get(tuple(location), {})
+
+    def query(self, location, object_type, sense_range):
+        """ Get all objects of a certain type within a certain range of a location.
+
+        Parameters
+        ----------
+        location : tuple
+            The (x, y) location from which to search.
+        object_type : class, str or None
+            The class of the objects to return, either None or "*" returns objects of all types.
+        sense_range : float
+            The maximum (euclidean) distance of an object to the given location.
+
+        Returns
+        -------
+        OrderedDict
+            The found objects, with their ids as keys, ordered as a full scan of the GridWorld would return them.
+        """
+        any_type = object_type is None or object_type == "*"
+        if sense_range < 0:
+            return OrderedDict()
+
+        # Estimate the number of cells we need to visit to cover the sense range
+        if math.isinf(sense_range):
+            nr_box_cells = math.inf
+        else:
+            radius = int(sense_range)
+            nr_box_cells = (2 * radius + 1) ** 2
+
+        found = []
+        candidates = None
+        if not any_type:
+            types = self.__get_subtypes(object_type)
+            nr_candidates = sum(len(self.__types[t]) for t in types)
+            if nr_candidates <= min(nr_box_cells, len(self.__cells)):
+                candidates = [obj for t in types for obj in self.__types[t].values()]
+
+        if candidates is not None:
+            # Only visit the objects of the requested type
+            for env_obj in candidates:
+                if get_distance(self.__locations[env_obj.obj_id], location) <= sense_range:
+                    found.append(env_obj)
+        else:
+            if nr_box_cells < len(self.__cells):
+                # Only visit the cells inside the bounding box of the sense range
+                x, y = int(location[0]), int(location[1])
+                cells = ((cell_x, cell_y) for cell_x in range(x - radius, x + radius + 1)
+                         for cell_y in range(y - radius, y + radius + 1))
+                cells = [cell for cell in cells if cell in self.__cells]
+            else:
+                cells = self.__cells.keys()
+
+            for cell in cells:
+                if get_distance(cell, location) > sense_range:
+                    continue
+                for env_obj in self.__cells[cell].values():
+                    if any_type or isinstance(env_obj, object_type):
+                        found.append(env_obj)
+
+        found.sort(key=lambda obj: self.__order[obj.obj_id])
+        return OrderedDict((env_obj.obj_id, env_obj) for env_obj in found)
+
+    def __remove_from_cell(self, obj_id):
+        loc = self.__locations[obj_id]
+        cell = self.__cells[loc]
+        env_obj = cell.pop(obj_id)
+        if len(cell) == 0:
+            del self.__cells[loc]
+        return env_obj
+
+    def __get_subtypes(self, object_type):
+        if object_type not in self.__subtypes:
+            self.__subtypes[object_type] = [t for t in self.__types.keys() if issubclass(t, object_type)]
+        return self.__subtypes[object_type]
+
+    def __len__(self):
+        return len(self.__locations)
+
+    def __contains__(self, obj_id):
+        return obj_id in self.__locations
@@ -0,0 +1,192 @@
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+
+class RollingHistogram:
+    """ A histogram of durations (in seconds), for exposing them as a Prometheus histogram and summarizing them.
+
+    The bucket counts, number of observations and their sum are kept over all observations, as Prometheus expects. The
+    last `window` observations are kept as well, from which the recent mean, quantiles and maximum are computed.
+    """
+
+    # The upper bounds of the buckets, from 0.1 ms up to 10 s
+    BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, window=1000):
+        self.__window = window
+        self.__recent = []  # ring buffer of the last `window` observations
+        self.__next_idx = 0  # the index in the ring buffer of the next observation, once it is full
+        self.__bucket_counts = [0] * (len(self.BUCKETS) + 1)  # the last bucket is +Inf
+        self.count = 0
+        self.sum = 0.
+
+    def observe(self, duration):
+        self.__bucket_counts[bisect_left(self.BUCKETS, duration)] += 1
+        self.count += 1
+        self.sum += duration
+
+        if len(self.__recent) < self.__window:
+            self.__recent.append(duration)
+        else:
+            self.__recent[self.__next_idx] = duration
+            self.__next_idx = (self.__next_idx + 1) % self.__window
+
+    def get_cumulative_buckets(self):
+        """ Returns (upper bound, number of observations smaller or equal to it) tuples, the last bound is inf. """
+        buckets = []
+        cumulative_count = 0
+        for bound, count in zip(self.BUCKETS + (float("inf"),), self.__bucket_counts):
+            cumulative_count += count
+            buckets.append((bound, cumulative_count))
+        return buckets
+
+    def get_recent_summary(self):
+        """ Returns the number of, mean, median, 95th percentile and maximum of the recent observations. """
+        recent = sorted(self.__recent)
+        if len(recent) == 0:
+            return {"count": 0, "mean": 0., "p50": 0., "p95": 0., "max": 0.}
+        return {"count": len(recent),
+                "mean": sum(recent) / len(recent),
+                "p50": recent[int(0.50 * (len(recent) - 1))],
+                "p95": recent[int(0.95 * (len(recent) - 1))],
+                "max": recent[-1]}
+
+
+class TickProfiler:
+    """ Keeps rolling histograms of how long the phases of each tick, the decisions of each agent and the actions of
+    each action class take in a GridWorld. It also counts the ticks in which an agent idled because it exceeded its
+    decision budget.
+
+    The GridWorld records these durations every tick. They can be obtained as a summary (see get_summary), which the
+    GridWorld prints at the end of its run when verbose, or in the Prometheus text format (see to_prometheus), which the
+    MATRXS API serves through /metrics.
+
+    The durations are recorded by the simulation thread while the API reads them from its own thread. Adding a new label
+    is therefore guarded by a lock, under which the readers take a snapshot of the labels.
+    """
+
+    # The metric name (without the matrxs_ prefix), label name and help text of each kind of duration
+    METRICS = OrderedDict([
+        ("phase", ("tick_phase_seconds", "phase", "Duration of each phase of a tick.")),
+        ("agent", ("agent_decision_seconds", "agent_id",
+                   "Duration of the decision (filter_observations and decide_on_action) of each agent.")),
+        ("action", ("action_seconds", "action", "Duration of checking and performing the actions of each class."))
+    ])
+
+    def __init__(self, window=1000):
+        """
+        Parameters
+        ----------
+        window : int, optional
+            The number of most recent observations of each histogram that are used for its summary. Defaults to 1000.
+        """
+        self.__window = window
+        self.__histograms = OrderedDict((kind, OrderedDict()) for kind in self.METRICS.keys())
+        self.__decision_overruns = OrderedDict()  # agent id -> number of ticks in which it exceeded its budget
+        self.__lock = threading.Lock()  # guards adding labels to the histograms and overruns
+        self.nr_ticks = 0
+
+    def observe(self, kind, label, duration):
+        """ Records a duration.
+
+        Parameters
+        ----------
+        kind : str
+            What the duration is of; "phase", "agent" or "action".
+        label : str
+            The phase name, agent ID or action class name.
+        duration : float
+            The duration in seconds.
+        """
+        histograms = self.__histograms[kind]
+        histogram = histograms.get(label)
+        if histogram is None:
+            histogram = RollingHistogram(self.__window)
+            with self.__lock:
+                histograms[label] = histogram
+        histogram.observe(duration)
+
+    def count_overrun(self, agent_id):
+        """ Counts a tick in which an agent idled because it did not decide within its decision budget. """
+        with self.__lock:
+            self.__decision_overruns[agent_id] = self.__decision_overruns.get(agent_id, 0) + 1
+
+    @property
+    def decision_overruns(self):
+        """ The number of ticks in which each agent (that did so at least once) exceeded its decision budget. """
+        with self.__lock:
+            return dict(self.__decision_overruns)
+
+    def get_summary(self):
+        """ Returns a dictionary with, for each kind of duration and each of its labels, the total number and sum of
+        its durations and the mean, median, 95th percentile and maximum of its recent durations.
+        """
+        summary = OrderedDict()
+        for kind, histograms in self.__get_snapshot().items():
+            summary[kind] = OrderedDict()
+            for label, histogram in histograms:
+                summary[kind][label] = {"total_count": histogram.count, "total_sum": histogram.sum,
+                                        **histogram.get_recent_summary()}
+        return summary
+
+    def print_summary(self, title=""):
+        """ Prints the summary (see get_summary) as tables in milliseconds, the slowest labels first. """
+        print(f"Tick profile {title}over {self.nr_ticks} ticks (recent durations in ms):")
+        for kind, labels in self.get_summary().items():
+            if len(labels) == 0:
+                continue
+            label_name = self.METRICS[kind][1]
+            print(f"    {label_name:<24}{'count':>8}{'mean':>10}{'p50':>10}{'p95':>10}{'max':>10}")
+            for label, stats in sorted(labels.items(), key=lambda item: -item[1]["mean"]):
+                print(f"    {str(label):<24}{stats['total_count']:>8}{stats['mean'] * 1000:>10.3f}"
+                      f"{stats['p50'] * 1000:>10.3f}{stats['p95'] * 1000:>10.3f}{stats['max'] * 1000:>10.3f}")
+        decision_overruns = self.decision_overruns
+        if len(decision_overruns) > 0:
+            print(f"    {'agent_id':<24}{'ticks over decision budget':>28}")
+            for agent_id, nr_overruns in decision_overruns.items():
+                print(f"    {str(agent_id):<24}{nr_overruns:>28}")
+
+    def to_prometheus(self, extra_labels=None):
+        """ Returns all histograms in the Prometheus text exposition format.
+
+        Parameters
+        ----------
+        extra_labels : dict, optional
+            Labels added to every sample, such as the world ID.
+        """
+        extra = "".join(f'{name}="{self.__escape(value)}",' for name, value in (extra_labels or {}).items())
+        lines = ["# HELP matrxs_ticks_total Number of ticks performed.",
+                 "# TYPE matrxs_ticks_total counter",
+                 f"matrxs_ticks_total{{{extra.rstrip(',')}}} {self.nr_ticks}"]
+
+        snapshot = self.__get_snapshot()
+        for kind, (metric, label_name, help_text) in self.METRICS.items():
+            metric = f"matrxs_{metric}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for label, histogram in snapshot[kind]:
+                labels = f'{extra}{label_name}="{self.__escape(label)}"'
+                for bound, count in histogram.get_cumulative_buckets():
+                    bound = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f"{metric}_sum{{{labels}}} {histogram.sum!r}")
+                lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+
+        lines.append("# HELP matrxs_agent_decision_overruns_total Number of ticks in which an agent idled because it "
+                     "exceeded its decision budget.")
+        lines.append("# TYPE matrxs_agent_decision_overruns_total counter")
+        for agent_id, nr_overruns in self.decision_overruns.items():
+            lines.append(f'matrxs_agent_decision_overruns_total{{{extra}agent_id="{self.__escape(agent_id)}"}} '
+                         f'{nr_overruns}')
+
+        return "\n".join(lines) + "\n"
+
+    def __get_snapshot(self):
+        # the (label, histogram) tuples of each kind, as these may be added to by another thread while they are read
+        with self.__lock:
+            return OrderedDict((kind, list(histograms.items())) for kind, histograms in self.__histograms.items())
+
+    @staticmethod
+    def __escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
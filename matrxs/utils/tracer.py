@@ -0,0 +1,192 @@
+import itertools
+import json
+import os
+import threading
+import time
+from functools import wraps
+
+import numpy as np
+
+# orjson is a considerably faster JSON encoder, which is used when it is installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class Tracer:
+    """ Records spans of time, such as the phases of a tick or the decision of an agent, to inspect them on a timeline.
+
+    The spans are written in the Chrome trace-event format (see write), which can be opened in Perfetto
+    (https://ui.perfetto.dev) or chrome://tracing. Each thread that records spans, such as the simulation thread, the
+    Flask thread of the MATRXS API and the background threads of the loggers, gets its own track.
+
+    Spans are recorded in a buffer that is allocated up front, so recording one only stores a few numbers. When the
+    buffer is full the oldest spans are overwritten, such that the trace always holds the most recent `capacity` spans.
+    Recording is thread safe.
+    """
+
+    DEFAULT_CAPACITY = 500000
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, name="MATRXS"):
+        """
+        Parameters
+        ----------
+        capacity : int, optional
+            The maximum number of spans kept. Defaults to Tracer.DEFAULT_CAPACITY.
+        name : str, optional
+            The name of the process in the trace, such as the world ID. Defaults to "MATRXS".
+        """
+        if not isinstance(capacity, int) or capacity < 1:
+            raise ValueError(f"The given capacity {capacity} should be an int larger or equal to 1.")
+
+        self.__capacity = capacity
+        self.__name = str(name)
+        self.__start_time = time.perf_counter()  # the timestamps in the trace are relative to this time
+
+        # The buffer, span i is stored at index i % capacity of each array
+        self.__starts = np.zeros(capacity, dtype=np.float64)  # start time in seconds since self.__start_time
+        self.__durations = np.zeros(capacity, dtype=np.float64)  # duration in seconds
+        self.__label_idxs = np.zeros(capacity, dtype=np.int32)  # index in self.__labels of the (name, category)
+        self.__thread_idxs = np.zeros(capacity, dtype=np.int32)  # index in self.__threads of the thread
+        self.__args = [None] * capacity  # the optional arguments shown with a span
+
+        # Names and threads are stored once, spans refer to them by index
+        self.__labels = []  # (name, category) tuples
+        self.__label_idx = {}  # (name, category) -> index in self.__labels
+        self.__threads = []  # thread names
+        self.__thread_idx = {}  # thread ident -> index in self.__threads
+        self.__lock = threading.Lock()  # guards adding new labels and threads
+
+        # Claiming the next index of the buffer is atomic, as the GIL is held while advancing the counter
+        self.__counter = itertools.count()
+        self.__nr_spans = 0
+
+    @property
+    def nr_spans(self):
+        """ The number of spans recorded, including those that were overwritten. """
+        return self.__nr_spans
+
+    @staticmethod
+    def now():
+        """ Returns the current time, to be passed as the start of a span to add_span. """
+        return time.perf_counter()
+
+    def add_span(self, name, category, start, end=None, args=None):
+        """ Records a span.
+
+        Parameters
+        ----------
+        name : str
+            The name shown on the span, such as the phase name or "agent_1.decide_on_action".
+        category : str
+            The kind of span, such as "tick", "agent", "action", "logger" or "api".
+        start : float
+            The start time, as returned by Tracer.now.
+        end : float, optional
+            The end time, as returned by Tracer.now. Defaults to now.
+        args : dict, optional
+            Arguments shown with the span, such as the tick number. Only store small and JSON serializable values.
+        """
+        if end is None:
+            end = time.perf_counter()
+
+        label = (name, category)
+        label_idx = self.__label_idx.get(label)
+        if label_idx is None:
+            label_idx = self.__add_label(label)
+        thread_idx = self.__thread_idx.get(threading.get_ident())
+        if thread_idx is None:
+            thread_idx = self.__add_thread()
+
+        idx = next(self.__counter)
+        self.__nr_spans = idx + 1
+        idx %= self.__capacity
+        self.__starts[idx] = start - self.__start_time
+        self.__durations[idx] = end - start
+        self.__label_idxs[idx] = label_idx
+        self.__thread_idxs[idx] = thread_idx
+        self.__args[idx] = args
+
+    def traced(self, func, name, category, args=None):
+        """ Returns a function that calls func and records a span of that call.
+
+        Parameters
+        ----------
+        func : callable
+            The function to trace.
+        name : str
+            The name of its spans.
+        category : str
+            The category of its spans.
+        args : dict, optional
+            The arguments shown with its spans.
+        """
+        @wraps(func)
+        def traced_func(*func_args, **func_kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*func_args, **func_kwargs)
+            finally:
+                self.add_span(name, category, start, args=args)
+
+        return traced_func
+
+    def get_trace_events(self):
+        """ Returns the recorded spans, oldest first, as a list of Chrome trace events. """
+        nr_kept = min(self.__nr_spans, self.__capacity)
+        first_idx = self.__nr_spans - nr_kept
+
+        pid = os.getpid()
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": self.__name}}]
+        for thread_idx, thread_name in enumerate(self.__threads):
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_idx,
+                           "args": {"name": thread_name}})
+
+        # Timestamps and durations are in microseconds
+        idxs = np.arange(first_idx, first_idx + nr_kept) % self.__capacity
+        starts = (self.__starts[idxs] * 1e6).tolist()
+        durations = (self.__durations[idxs] * 1e6).tolist()
+        label_idxs = self.__label_idxs[idxs].tolist()
+        thread_idxs = self.__thread_idxs[idxs].tolist()
+        for idx, start, duration, label_idx, thread_idx in zip(idxs.tolist(), starts, durations, label_idxs,
+                                                                thread_idxs):
+            name, category = self.__labels[label_idx]
+            event = {"name": name, "cat": category, "ph": "X", "ts": start, "dur": duration, "pid": pid,
+                     "tid": thread_idx}
+            if self.__args[idx] is not None:
+                event["args"] = self.__args[idx]
+            events.append(event)
+
+        return events
+
+    def write(self, file_name):
+        """ Writes the recorded spans to a Chrome trace-event JSON file, creating its directory if needed.
+
+        Parameters
+        ----------
+        file_name : str
+            The path of the file, e.g. ending with ".trace.json".
+        """
+        directory = os.path.dirname(file_name)
+        if directory != "" and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        trace = {"traceEvents": self.get_trace_events(), "displayTimeUnit": "ms"}
+        with open(file_name, mode="wb") as trace_file:
+            trace_file.write(orjson.dumps(trace) if orjson is not None else json.dumps(trace).encode("utf-8"))
+
+    def __add_label(self, label):
+        with self.__lock:
+            if label not in self.__label_idx:
+                self.__labels.append(label)
+                self.__label_idx[label] = len(self.__labels) - 1
+            return self.__label_idx[label]
+
+    def __add_thread(self):
+        with self.__lock:
+            ident = threading.get_ident()
+            if ident not in self.__thread_idx:
+                self.__threads.append(threading.current_thread().name)
+                self.__thread_idx[ident] = len(self.__threads) - 1
+            return self.__thread_idx[ident]
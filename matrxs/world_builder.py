@@ -1,5 +1,8 @@
+import copy
 import inspect
+import multiprocessing
 import os
+import pickle
 import sys
 import warnings
 from collections import OrderedDict
@@ -17,6 +20,7 @@ from matrxs.logger.logger import GridWorldLogger
 from matrxs.objects.agent_body import AgentBody
 from matrxs.objects.env_object import EnvObject
 from matrxs.utils import utils
+from matrxs.utils.decision_pool import DecisionPool
 from matrxs.utils.utils import get_inheritence_path, get_default_value, _get_line_coords, create_sense_capability
 from matrxs.objects.simple_objects import Wall, Door, AreaTile, SmokeTile
 from matrxs.sim_goals.sim_goal import LimitedTimeGoal, SimulationGoal
@@ -29,7 +33,9 @@ class WorldBuilder:
 
     def __init__(self, shape, tick_duration=0.5, random_seed=1, simulation_goal=1000, run_matrxs_api=True,
                  run_matrxs_visualizer=False, visualization_bg_clr="#C2C2C2", visualization_bg_img=None,
-                 verbose=False):
+                 verbose=False, check_grid_consistency=False, api_state_retention=None, api_state_spill_dir=None,
+                 headless=False, message_retention=None, trace_dir=None, concurrent_decisions=None,
+                 decision_workers=None, read_only_states=False):
         """
         A builder to create one or more worlds.
 
@@ -60,6 +66,50 @@ class WorldBuilder:
             of the path to the image file. Defaults to None (no image).
         verbose : bool, optional
             Whether the subsequent created world should be verbose or not. Defaults to False.
+        check_grid_consistency : bool, optional
+            Debug mode in which the created worlds check their incrementally updated grid against a complete rebuild
+            after every action, raising an exception on any difference. This is slow. Defaults to False.
+        api_state_retention : int, optional
+            The number of most recent ticks of which the MATRXS API keeps the states in memory, so they can be
+            requested through /get_states/<tick>. Defaults to None, which keeps the states of all ticks.
+        api_state_spill_dir : str, optional
+            A directory to which the MATRXS API writes the states of ticks that fall outside the api_state_retention
+            window, as compressed JSON. These can then still be requested, at the cost of disk space. Each world gets
+            its own subdirectory. Defaults to None, which discards the states of those ticks.
+        headless : bool, optional
+            Batch mode, in which the created worlds run their ticks as fast as possible, ignoring the tick_duration,
+            without the MATRXS API (run_matrxs_api is ignored) and without printing per tick. Each world keeps a
+            throughput report (see GridWorld.get_throughput_report), which is printed at the end of its run when
+            verbose is True. Defaults to False.
+        message_retention : int, optional
+            The number of most recent ticks of which the created worlds keep the sent messages in memory, so they can
+            be requested through the MATRXS API or used by loggers. Defaults to None, which keeps the messages of all
+            ticks.
+        trace_dir : str, optional
+            The directory to which each created world writes a timeline of its run, with spans of its tick phases,
+            agent decisions, actions, logger writes and API requests, as "<world_ID>.trace.json" in the Chrome
+            trace-event format (which opens in https://ui.perfetto.dev). Defaults to None, which does not trace the
+            worlds.
+        concurrent_decisions : str, optional
+            Whether the created worlds evaluate the brains of their agents one after another (None) or at once in a
+            pool of threads ("thread") or processes ("process"). In the latter case, the brains of all agents that do
+            not perceive an agent before them that decides in the same tick (and as such changes its properties) are
+            evaluated concurrently, the others still decide in their turn. All actions and messages are processed in
+            the order in which the agents were added, as in sequential mode, so a run gives the same results. Threads
+            only help for brains that release the GIL (e.g. in numpy). Processes help for any brain, but every tick
+            the whole brain (all its attributes, such as its state, memory, inbox and navigator) is pickled and sent
+            to a process and back. Process mode therefore only helps brains that are expensive to evaluate but have a
+            small state; for brains with little work per tick or a large state it is slower than sequential mode.
+            See :class:`~matrxs.utils.decision_pool.DecisionPool`. Human agents and agents with a decision budget
+            always decide in their turn. Defaults to None.
+        decision_workers : int, optional
+            The number of threads or processes in the pool when concurrent_decisions is set. Defaults to None, which
+            uses the default of the concurrent.futures executors (based on the number of processors).
+        read_only_states : bool, optional
+            Whether the agents of the created worlds receive the cached properties of the objects they perceive as is,
+            instead of a mutable copy of them. These are shared by all agents and cannot be changed (doing so raises a
+            TypeError), so a brain that changes its state has to copy the properties it changes first. This saves
+            copying the properties of every perceived object for every agent every tick. Defaults to False.
 
         Raises
         ------
@@ -80,6 +130,14 @@ class WorldBuilder:
             >>> from matrxs.world_builder import WorldBuilder
             >>> WorldBuilder(shape=(10, 10), random_seed=42, tick_duration=-1, visualization_bg_clr="#000000")
 
+        To run a number of worlds as fast as possible, one after the other, for example for a parameter sweep;
+
+            >>> from matrxs.world_builder import WorldBuilder
+            >>> builder = WorldBuilder(shape=(10, 10), headless=True)
+            >>> for world in builder.worlds(nr_of_worlds=10):
+            >>>     world.run(builder.api_info)
+            >>>     report = world.get_throughput_report()
+
         """
 
         # Check if shape is of correct type and length
@@ -124,6 +182,44 @@ class WorldBuilder:
             raise ValueError(f"The given value {run_matrxs_api} for run_matrxs_api is invalid, should be "
                              f"of type bool.")
 
+        if api_state_retention is not None and (not isinstance(api_state_retention, int) or api_state_retention < 1):
+            raise ValueError(f"The given api_state_retention {api_state_retention} should be None or an int larger or "
+                             f"equal to 1.")
+
+        if api_state_spill_dir is not None and not isinstance(api_state_spill_dir, str):
+            raise ValueError(f"The given api_state_spill_dir {api_state_spill_dir} should be None or of type str "
+                             f"denoting a path.")
+
+        if not isinstance(headless, bool):
+            raise ValueError(f"The given value {headless} for headless is invalid, should be of type bool.")
+
+        if message_retention is not None and (not isinstance(message_retention, int) or message_retention < 1):
+            raise ValueError(f"The given message_retention {message_retention} should be None or an int larger or "
+                             f"equal to 1.")
+
+        if trace_dir is not None and not isinstance(trace_dir, str):
+            raise ValueError(f"The given trace_dir {trace_dir} should be None or of type str denoting a path.")
+
+        if concurrent_decisions not in (None, DecisionPool.THREAD, DecisionPool.PROCESS):
+            raise ValueError(f"The given concurrent_decisions {concurrent_decisions} should be None, "
+                             f"'{DecisionPool.THREAD}' or '{DecisionPool.PROCESS}'.")
+
+        if decision_workers is not None and (not isinstance(decision_workers, int) or decision_workers < 1):
+            raise ValueError(f"The given decision_workers {decision_workers} should be None or an int larger or equal "
+                             f"to 1.")
+
+        if not isinstance(read_only_states, bool):
+            raise ValueError(f"The given value {read_only_states} for read_only_states is invalid, should be of type "
+                             f"bool.")
+
+        if headless and run_matrxs_visualizer:
+            raise ValueError(f"Headless is set to True while run_matrxs_visualizer is set to True. The MATRXS "
+                             f"visualizer requires the API, which is not run in headless mode.")
+
+        # headless worlds never run the API
+        if headless:
+            run_matrxs_api = False
+
         if not run_matrxs_api and run_matrxs_visualizer:
             raise ValueError(f"Run_matrxs_api is set to False while run_matrxs_visualizer is set to True. The MATRXS "
                              f"visualizer requires the API to work, so this is not possible.")
@@ -139,7 +235,9 @@ class WorldBuilder:
         # initialize an API variables
         self.run_matrxs_api = run_matrxs_api
         self.api_info = {   "run_matrxs_api": run_matrxs_api,
-                            "api_thread": False }
+                            "api_thread": False,
+                            "state_retention": api_state_retention,
+                            "state_spill_dir": api_state_spill_dir }
 
         # initialize the visualization variables
         self.run_matrxs_visualizer = run_matrxs_visualizer
@@ -159,7 +257,14 @@ class WorldBuilder:
                                                         visualization_bg_clr=visualization_bg_clr,
                                                         visualization_bg_img=visualization_bg_img,
                                                         verbose=self.verbose,
-                                                        rnd_seed=random_seed)
+                                                        rnd_seed=random_seed,
+                                                        check_grid_consistency=check_grid_consistency,
+                                                        headless=headless,
+                                                        message_retention=message_retention,
+                                                        trace_dir=trace_dir,
+                                                        concurrent_decisions=concurrent_decisions,
+                                                        decision_workers=decision_workers,
+                                                        read_only_states=read_only_states)
         # Keep track of the number of worlds we created
         self.worlds_created = 0
 
@@ -218,8 +323,78 @@ class WorldBuilder:
         self.__reset_random()
         return world
 
+    def run_worlds(self, nr_of_worlds: int = 100, processes: int = None):
+        """
+        Creates and runs a number of worlds in parallel worker processes, and collects their results.
+
+        Each world is created from its own copy of this builder, with a random seed drawn for that world from the master
+        random seed. The worlds run headless (see the headless argument of the constructor), without the MATRXS API or
+        visualizer. As a world does not depend on any other world, the results are identical for any number of
+        processes, including a serial run with processes=1.
+
+        Parameters
+        ----------
+        nr_of_worlds : int, optional
+            The number of worlds to create and run. Defaults to 100.
+        processes : int, optional
+            The number of worker processes. Defaults to None, which uses one process per CPU core. With 1, all worlds
+            are run in the current process.
+
+        Returns
+        -------
+        dict
+            A dictionary with a list of the results of each world, in order of world number, under "worlds" and
+            aggregated statistics under "summary". The results of a world contain its number ("world_nr"), ID
+            ("world_ID"), random seed ("rnd_seed"), number of ticks ("nr_ticks"), whether it is done ("is_done"), the
+            status of each simulation goal ("goals"), the files written by its loggers ("log_files") and its throughput
+            report ("throughput", see GridWorld.get_throughput_report).
+
+        Raises
+        ------
+        ValueError
+            The nr_of_worlds and processes should be positive non-zero integers.
+
+        Examples
+        --------
+
+        Run 100 worlds on 8 processes;
+
+            >>> from matrxs.world_builder import WorldBuilder
+            >>> builder = WorldBuilder(shape=(10, 10), random_seed=42)
+            >>> results = builder.run_worlds(100, processes=8)
+            >>> results["summary"]["nr_done"]
+
+        """
+        if not isinstance(nr_of_worlds, int) or nr_of_worlds <= 0:
+            raise ValueError(f"The given nr_of_worlds {nr_of_worlds} should be of type Int and larger or equal to 1.")
+
+        if processes is not None and (not isinstance(processes, int) or processes <= 0):
+            raise ValueError(f"The given processes {processes} should be None or of type Int and larger or equal to 1.")
+
+        # draw a seed for every world from the master seed, independent of the worlds this builder created already
+        seeds = np.random.RandomState(self.world_settings["rnd_seed"]).randint(1, 1000000, size=nr_of_worlds)
+        world_args = [(world_nr, int(seed)) for world_nr, seed in zip(range(1, nr_of_worlds + 1), seeds)]
+
+        # every world is created from an unpickled copy of this builder as it is now, without its API and visualizer
+        builder = copy.copy(self)
+        builder.api_info = {"run_matrxs_api": False, "api_thread": False, "state_retention": None,
+                            "state_spill_dir": None}
+        builder.matrxs_visualizer_thread = False
+        builder_bytes = pickle.dumps(builder)
+
+        if processes == 1:
+            _init_world_worker(builder_bytes)
+            results = [_run_world_in_worker(*args) for args in world_args]
+        else:
+            with multiprocessing.Pool(processes=processes, initializer=_init_world_worker,
+                                      initargs=(builder_bytes,)) as pool:
+                results = pool.starmap(_run_world_in_worker, world_args, chunksize=1)
+
+        return {"worlds": results, "summary": _summarize_world_results(results)}
+
     def __set_world_settings(self, shape, tick_duration, simulation_goal,  rnd_seed,
-                             visualization_bg_clr, visualization_bg_img, verbose):
+                             visualization_bg_clr, visualization_bg_img, verbose, check_grid_consistency, headless,
+                             message_retention, trace_dir, concurrent_decisions, decision_workers, read_only_states):
 
         if rnd_seed is None:
             rnd_seed = self.rng.randint(0, 1000000)
@@ -230,7 +405,14 @@ class WorldBuilder:
                           "rnd_seed": rnd_seed,
                           "visualization_bg_clr": visualization_bg_clr,
                           "visualization_bg_img": visualization_bg_img,
-                          "verbose": verbose}
+                          "verbose": verbose,
+                          "check_grid_consistency": check_grid_consistency,
+                          "headless": headless,
+                          "message_retention": message_retention,
+                          "trace_dir": trace_dir,
+                          "concurrent_decisions": concurrent_decisions,
+                          "decision_workers": decision_workers,
+                          "read_only_states": read_only_states}
 
         return world_settings
 
@@ -265,7 +447,7 @@ class WorldBuilder:
                   customizable_properties: Union[tuple, list] = None, sense_capability: SenseCapability = None,
                   is_traversable: bool = True, team: str = None, possible_actions: list = None, is_movable: bool = None,
                   visualize_size: float = None, visualize_shape: Union[float, str] = None, visualize_colour: str = None,
-                  visualize_depth: int = None, visualize_opacity: float = None,
+                  visualize_depth: int = None, visualize_opacity: float = None, decision_budget: float = None,
                   **custom_properties):
         """The helper method within a WorldFactory instance to add a single agent.
 
@@ -317,6 +499,13 @@ class WorldBuilder:
             visualized. A larger value is more on 'top'.
         visualize_opacity: optional
             The opacity of this agent in its visualization. A value of 1.0 means full opacity and 0.0 no opacity.
+        decision_budget: optional
+            The number of seconds the world waits each tick for this agent to decide on an action. The agent decides in
+            its own thread, and when it exceeds its budget it idles for that tick (and the next ticks) while it
+            continues deciding. Its decision is then used in the first tick after it is done. Such ticks are counted as
+            overruns in the tick profile of the world (see GridWorld.profiler). This keeps the ticks of the world from
+            being stretched by a slow agent, at the cost of the reproducibility of its runs. Defaults to None, which
+            waits for the decision of this agent as long as it takes.
         custom_properties: optional
             Any additional given keyword arguments will be encapsulated in this dictionary. These will be added to the
             AgentBody as custom_properties which can be perceived by other agents and objects or which can be used or
@@ -343,6 +532,10 @@ class WorldBuilder:
             raise ValueError(f"The given agent_brain while adding agent with name {name} is not of type "
                              f"{AgentBrain.__name__} but of type {agent_brain.__class__.__name__}.")
 
+        if decision_budget is not None and (not isinstance(decision_budget, (int, float)) or decision_budget <= 0):
+            raise ValueError(f"The given decision_budget {decision_budget} while adding the agent with name {name} "
+                             f"should be None or a number of seconds larger than 0.")
+
         # Check if the agent name is unique
         for existingAgent in self.agent_settings:
             if existingAgent["mandatory_properties"]["name"] == name:
@@ -400,7 +593,8 @@ class WorldBuilder:
                              "visualize_opacity": visualize_opacity,
                              "visualize_depth": visualize_depth,
                              "location": location,
-                             "team": team}
+                             "team": team,
+                             "decision_budget": decision_budget}
                          }
 
         self.agent_settings.append(agent_setting)
@@ -895,16 +1089,17 @@ class WorldBuilder:
             else:
                 raise Exception(f"While adding room {name}, the requested door location {door_loc} is not in a wall.")
 
-        # Add all walls
+        # Add all walls, the room name allows agents to recognize the room (e.g. for path planning)
         names = [f"{name} - wall@{loc}" for loc in all_]
+        wall_custom_properties = {} if wall_custom_properties is None else wall_custom_properties
         self.add_multiple_objects(locations=all_, names=names, callable_classes=Wall,
-                                  custom_properties=wall_custom_properties,
+                                  custom_properties={"room_name": name, **wall_custom_properties},
                                   customizable_properties=wall_customizable_properties)
 
         # Add all doors
         for door_loc in door_locations:
             self.add_object(location=door_loc, name=f"{name} - door@{door_loc}", callable_class=Door,
-                            is_open=doors_open)
+                            is_open=doors_open, room_name=name)
 
         # Add all area tiles if required
         if with_area_tiles:
@@ -1160,3 +1355,60 @@ class RandomProperty:
 
     def reset(self):
         self.selected_values = set()
+
+
+# The pickled WorldBuilder from which a worker process of WorldBuilder.run_worlds creates its worlds
+_worker_builder_bytes = None
+
+
+def _init_world_worker(builder_bytes):
+    global _worker_builder_bytes
+    _worker_builder_bytes = builder_bytes
+
+
+def _run_world_in_worker(world_nr, rnd_seed):
+    """ Creates and runs a single world of WorldBuilder.run_worlds from a fresh copy of the builder, and returns its
+    results. """
+    builder = pickle.loads(_worker_builder_bytes)
+
+    # seed this world, and let it run as fast as possible
+    builder.rng = np.random.RandomState(rnd_seed)
+    builder.world_settings["rnd_seed"] = rnd_seed
+    builder.world_settings["headless"] = True
+    builder.worlds_created = world_nr - 1
+
+    world = builder.get_world()
+    world.run(builder.api_info)
+
+    goals = world.simulation_goal if isinstance(world.simulation_goal, list) else [world.simulation_goal]
+    goal_status = [{"goal": goal.__class__.__name__, "is_done": bool(goal.is_done),
+                    "progress": goal.get_progress(world)} for goal in goals]
+
+    return {"world_nr": world_nr,
+            "world_ID": world.world_ID,
+            "rnd_seed": rnd_seed,
+            "nr_ticks": world.current_nr_ticks,
+            "is_done": bool(world.is_done),
+            "goals": goal_status,
+            "log_files": [logger.file_name for logger in world.loggers],
+            "throughput": world.get_throughput_report()}
+
+
+def _summarize_world_results(results):
+    """ Aggregates the results of the worlds run by WorldBuilder.run_worlds. """
+    nr_ticks = np.array([result["nr_ticks"] for result in results])
+    ticks_per_second = np.array([result["throughput"]["ticks_per_second"] for result in results])
+
+    # the fraction of worlds in which each goal was reached, all worlds have the same goals
+    goals_reached = OrderedDict()
+    for goal_idx, goal in enumerate(results[0]["goals"]):
+        nr_reached = sum(1 for result in results if result["goals"][goal_idx]["is_done"])
+        goals_reached[f"{goal_idx}_{goal['goal']}"] = nr_reached / len(results)
+
+    return {"nr_worlds": len(results),
+            "nr_done": sum(1 for result in results if result["is_done"]),
+            "nr_ticks_mean": float(nr_ticks.mean()),
+            "nr_ticks_min": int(nr_ticks.min()),
+            "nr_ticks_max": int(nr_ticks.max()),
+            "ticks_per_second_mean": float(ticks_per_second.mean()),
+            "goals_reached": goals_reached}
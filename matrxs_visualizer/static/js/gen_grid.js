@@ -32,7 +32,8 @@ var firstDraw = true,
     animation_duration_s = null, // is calculated based on animation_duration_perc and tps.
     populate_god_agent_menu = null, // keep track of any new agents
     pop_new_chat_dropdown = null,
-    latest_tick_processed = null;
+    latest_tick_processed = null,
+    drawn_tile_size = null; // the tile size with which the objects were last drawn
 
 // tracked HTML objects
 var saved_prev_objs = {}, // obj containing the IDs of objects and their visualization settings of the previous tick
@@ -98,135 +99,211 @@ function draw(state, world_settings, new_messages, accessible_chatrooms, world_c
             return;
         }
 
-        // fetch object from the MATRXS state
-        obj = state[objID];
+        // draw the object, and add the object ID and the visualization settings to the saved_objs list of the
+        // current tick
+        saved_objs[objID] = draw_object(objID, state[objID], saved_prev_objs[objID]);
 
-        // get the location of the object in pixel values
-        var x = obj['location'][0] * tile_size;
-        var y = obj['location'][1] * tile_size;
+        // remove this item from our list of tracked objs from the previous tick
+        saved_prev_obj_keys = saved_prev_obj_keys.filter(function(e) {
+            return e !== objID
+        })
+    });
+
+    // any objects present in the previous tick but not present in the current
+    // tick should be removed
+    saved_prev_obj_keys.forEach(function(objID) {
+        remove_element(objID);
+    });
+
+    finish_draw(state, accessible_chatrooms);
+}
+
+
+/**
+ * Update the grid with a state delta, only (re)drawing the objects that were added or changed and removing the
+ * objects that were removed since the previous tick we drew
+ * @param state: the complete MATRXS state, with the delta already applied
+ * @param changed_objs: object with the objects that were added or changed, indexed by object ID
+ * @param removed_ids: list with the IDs of the objects that were removed
+ * @param world_settings: the MATRXS World object, containing all settings of the current MATRXS World
+ * @param new_messages: object containing lists with "private", "team", and "global" messages for the current agent
+ * @param accessible_chatrooms: object containing the "private", "teams" and "global" chatrooms accessible by the
+ *                              current agent.
+ */
+function draw_delta(state, changed_objs, removed_ids, world_settings, new_messages, accessible_chatrooms,
+    world_completed, world_completed_data) {
+    // the tile size changed (e.g. the window was resized), so every object has to be redrawn
+    if (drawn_tile_size != tile_size) {
+        draw(state, world_settings, new_messages, accessible_chatrooms, world_completed, world_completed_data, true);
+        return;
+    }
 
-        // fetch bg img if defined
-        var obj_img = null;
-        if (Object.keys(obj).includes('img_name')) {
-            obj_img = obj['img_name'];
+    // whether to (re)populate the dropdown menu with links to all agents
+    populate_god_agent_menu = false;
+    pop_new_chat_dropdown = false
+
+    // parse the new word settings, and change the grid, background, and tiles based on any changes
+    // in the settings
+    parse_world_settings(world_settings);
+
+    // if we already processed this tick and nothing changed (MATRX is paused), stop and return. The state of the
+    // initial and first tick share the same tick number, so we cannot skip a delta that contains changes.
+    if (latest_tick_processed == current_tick && Object.keys(changed_objs).length == 0 && removed_ids.length == 0) {
+
+        if (world_completed) {
+            console.log("World completed!");
+            show_completion_screen(world_completed_data);
         }
+        return;
+    }
 
-        var show_busy_condition =  (obj.hasOwnProperty("is_blocked_by_action") &&
-                                    obj.hasOwnProperty('visualize_when_busy') &&
-                                    obj['visualize_when_busy']);
-
-        // save visualization settings for this object
-        var obj_vis_settings = {
-            "img": obj_img,
-            "shape": obj['visualization']['shape'],
-            "size": obj['visualization']['size'], // percentage how much of tile is filled
-            "colour": hexToRgba(obj['visualization']['colour'], obj['visualization']['opacity']),
-            "opacity": obj['visualization']['opacity'],
-            "dimension": tile_size, // width / height of the tile
-            "busy": (show_busy_condition ? obj['is_blocked_by_action'] : false) // show busy if available and requested
-        };
-
-        var obj_element = null; // the html element of this object
-        var animate_movement = false; // whether any x,y position changes should be animated
-        var object_is_new = false; // whether this is a new object, not present in the html yet
-        var style_object = true; // whether this object should be regenerated, e.g. because vis settings changed
-
-        // check if this is a new object
-        if (!saved_prev_obj_keys.includes(objID)) {
-            // create a html element for this object and set classes / ID
-            obj_element = document.createElement("div");
-            obj_element.className = "object";
-            obj_element.id = objID;
-
-            // set the coordinates of the object
-            move_object(obj_element, x, y);
+    // process any messages received
+    process_messages(new_messages);
 
-            // this is a new object
-            new_object = true;
+    // only draw the objects that are new or changed
+    Object.keys(changed_objs).forEach(function(objID) {
+        saved_objs[objID] = draw_object(objID, changed_objs[objID], saved_objs[objID]);
+    });
 
-            // add to grid
-            grid.append(obj_element);
+    // and remove the objects that are gone
+    removed_ids.forEach(function(objID) {
+        if (saved_objs.hasOwnProperty(objID)) {
+            remove_element(objID);
+            delete saved_objs[objID];
+        }
+    });
 
-            // add this agent to the dropdown list
-            if (obj_element.hasOwnProperty('isAgent')) {
-                populate_god_agent_menu = true;
-                pop_new_chat_dropdown = true;
-            }
+    finish_draw(state, accessible_chatrooms);
+}
 
-            // any new victims need to be added to the victim dropdowns
-            if ( obj.hasOwnProperty('class_inheritance') && obj['class_inheritance'].includes('Victim') ) {
-//                console.log("Found new victim:", objID)
-                add_victim_to_dropdown(objID);
-            }
 
-            // we already generated this object in a previous tick
-        } else {
-            // fetch the object from html
-            obj_element = document.getElementById(objID);
+/**
+ * Draw a single object, creating its html element if it is new and (re)styling it if its visualization changed
+ * @param objID: the ID of the object
+ * @param obj: the object from the MATRXS state
+ * @param prev_vis_settings: the visualization settings of this object when it was last drawn, undefined if new
+ * @return the visualization settings of the object
+ */
+function draw_object(objID, obj, prev_vis_settings) {
+    // get the location of the object in pixel values
+    var x = obj['location'][0] * tile_size;
+    var y = obj['location'][1] * tile_size;
+
+    // fetch bg img if defined
+    var obj_img = null;
+    if (Object.keys(obj).includes('img_name')) {
+        obj_img = obj['img_name'];
+    }
 
-            // check if the coordinate changed compared to the previous tick, and if so, add css rules
-            // for animating the x,y coordinates change
-            if (obj_element.style.left != (x * tile_size) || obj_element.style.top != (y * tile_size)) {
-                obj_element.style.setProperty("-webkit-transition", "all " + animation_duration_s + "s");
-                obj_element.style.transition = "all " + animation_duration_s + "s";
+    var show_busy_condition =  (obj.hasOwnProperty("is_blocked_by_action") &&
+                                obj.hasOwnProperty('visualize_when_busy') &&
+                                obj['visualize_when_busy']);
+
+    // save visualization settings for this object
+    var obj_vis_settings = {
+        "img": obj_img,
+        "shape": obj['visualization']['shape'],
+        "size": obj['visualization']['size'], // percentage how much of tile is filled
+        "colour": hexToRgba(obj['visualization']['colour'], obj['visualization']['opacity']),
+        "opacity": obj['visualization']['opacity'],
+        "dimension": tile_size, // width / height of the tile
+        "busy": (show_busy_condition ? obj['is_blocked_by_action'] : false) // show busy if available and requested
+    };
 
-                // move the object to the new coordinates
-                move_object(obj_element, x, y);
-            }
+    var obj_element = null; // the html element of this object
+    var animate_movement = false; // whether any x,y position changes should be animated
+    var object_is_new = false; // whether this is a new object, not present in the html yet
+    var style_object = true; // whether this object should be regenerated, e.g. because vis settings changed
 
-            // if nothing changed in the visualisation setting of this obj, we don't need
-            // to (re)style the object
-            if (compare_objects(saved_prev_objs[objID], obj_vis_settings)) {
-                style_object = false;
+    // check if this is a new object
+    if (prev_vis_settings === undefined) {
+        // create a html element for this object and set classes / ID
+        obj_element = document.createElement("div");
+        obj_element.className = "object";
+        obj_element.id = objID;
 
-                // repopulate the agent list, when the visualization settings changed of an agent
-                if (obj_element.hasOwnProperty('isAgent')) {
-                    populate_god_agent_menu = true;
-                    pop_new_chat_dropdown = true;
-                }
-            }
+        // set the coordinates of the object
+        move_object(obj_element, x, y);
+
+        // this is a new object
+        new_object = true;
+
+        // add to grid
+        grid.append(obj_element);
+
+        // add this agent to the dropdown list
+        if (obj_element.hasOwnProperty('isAgent')) {
+            populate_god_agent_menu = true;
+            pop_new_chat_dropdown = true;
+        }
+
+        // any new victims need to be added to the victim dropdowns
+        if ( obj.hasOwnProperty('class_inheritance') && obj['class_inheritance'].includes('Victim') ) {
+//                console.log("Found new victim:", objID)
+            add_victim_to_dropdown(objID);
         }
 
-        // set the visualization depth of this object
-        obj_element.style.zIndex = obj['visualization']['depth'];
-
-
-        // if we need to style this object, e.g. because it's new or visualiation settings changed,
-        // regenerate the specfic object shape with its settings. Also regerenate the score every tick
-        if (style_object || obj['class_inheritance'].includes('Score')  || objID == "explorer") {
-            set_tile_dimensions(obj_element);
-
-            var shape = null;
-            // draw the object with the correct shape, size and colour
-            if (obj_vis_settings['img'] != null) {
-                shape = gen_image(obj_vis_settings, obj_element);
-            } else if (obj_vis_settings['shape'] == 0) {
-                shape = gen_rectangle(obj_vis_settings, obj_element);
-            } else if (obj_vis_settings['shape'] == 1) {
-                shape = gen_triangle(obj_vis_settings, obj_element);
-            } else if (obj_vis_settings['shape'] == 2) {
-                shape = gen_circle(obj_vis_settings, obj_element);
+        // we already generated this object in a previous tick
+    } else {
+        // fetch the object from html
+        obj_element = document.getElementById(objID);
+
+        // check if the coordinate changed compared to the previous tick, and if so, add css rules
+        // for animating the x,y coordinates change
+        if (obj_element.style.left != (x * tile_size) || obj_element.style.top != (y * tile_size)) {
+            obj_element.style.setProperty("-webkit-transition", "all " + animation_duration_s + "s");
+            obj_element.style.transition = "all " + animation_duration_s + "s";
+
+            // move the object to the new coordinates
+            move_object(obj_element, x, y);
+        }
+
+        // if nothing changed in the visualisation setting of this obj, we don't need
+        // to (re)style the object
+        if (compare_objects(prev_vis_settings, obj_vis_settings)) {
+            style_object = false;
+
+            // repopulate the agent list, when the visualization settings changed of an agent
+            if (obj_element.hasOwnProperty('isAgent')) {
+                populate_god_agent_menu = true;
+                pop_new_chat_dropdown = true;
             }
+        }
+    }
 
-            // add text to an object, specific to the AIMS usecase
-            obj_vis_settings = aims_add_object_text(objID, obj_vis_settings, obj, shape);
+    // set the visualization depth of this object
+    obj_element.style.zIndex = obj['visualization']['depth'];
+
+
+    // if we need to style this object, e.g. because it's new or visualiation settings changed,
+    // regenerate the specfic object shape with its settings. Also regerenate the score every tick
+    if (style_object || obj['class_inheritance'].includes('Score')  || objID == "explorer") {
+        set_tile_dimensions(obj_element);
+
+        var shape = null;
+        // draw the object with the correct shape, size and colour
+        if (obj_vis_settings['img'] != null) {
+            shape = gen_image(obj_vis_settings, obj_element);
+        } else if (obj_vis_settings['shape'] == 0) {
+            shape = gen_rectangle(obj_vis_settings, obj_element);
+        } else if (obj_vis_settings['shape'] == 1) {
+            shape = gen_triangle(obj_vis_settings, obj_element);
+        } else if (obj_vis_settings['shape'] == 2) {
+            shape = gen_circle(obj_vis_settings, obj_element);
         }
 
-        // add the object ID and the visualization settings to the saved_objs list of the current tick
-        saved_objs[objID] = obj_vis_settings;
+        // add text to an object, specific to the AIMS usecase
+        obj_vis_settings = aims_add_object_text(objID, obj_vis_settings, obj, shape);
+    }
 
-        // remove this item from our list of tracked objs from the previous tick
-        saved_prev_obj_keys = saved_prev_obj_keys.filter(function(e) {
-            return e !== objID
-        })
-    });
+    return obj_vis_settings;
+}
 
-    // any objects present in the previous tick but not present in the current
-    // tick should be removed
-    saved_prev_obj_keys.forEach(function(objID) {
-        remove_element(objID);
-    });
 
+/**
+ * Finish drawing a tick, updating the agent and chatroom menus if needed
+ */
+function finish_draw(state, accessible_chatrooms) {
     // (re)populate the dropdown menu with links to all agents
     if (lv_agent_id == "god" && populate_god_agent_menu) {
         populate_agent_menu(state);
@@ -237,8 +314,9 @@ function draw(state, world_settings, new_messages, accessible_chatrooms, world_c
         populate_new_chat_dropdown(accessible_chatrooms);
     }
 
-    // mark this tick as processed (in the case the user paused MATRX)
+    // mark this tick as processed (in the case the user paused MATRX), and the tile size it was drawn with
     latest_tick_processed = current_tick;
+    drawn_tile_size = tile_size;
 }
 
 
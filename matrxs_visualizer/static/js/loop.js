@@ -16,6 +16,17 @@ var lv_state = {}, // the latest MATRXS state
     lv_world_completed = null, // whether this world has been completed
     lv_world_completion_data = null; // information to display on screen on completion
 
+// state delta mode, in which only the objects that changed since the last received tick are requested from MATRXS
+var lv_use_state_delta = true, // whether to request state deltas instead of complete states
+    lv_last_received_tick = -1, // the MATRXS tick of the last received state (delta), -1 requests a complete state
+    lv_full_state = true, // whether the last update contained the complete state
+    lv_changed_objs = {}, // the objects added or changed in the last update
+    lv_removed_objs = []; // the IDs of objects removed in the last update
+
+// stream mode, in which MATRXS pushes the state delta of every tick instead of us polling for it
+var lv_use_stream = true, // whether to subscribe to the state stream, set to false if the stream is not available
+    lv_stream = null; // the EventSource of the state stream
+
 var lv_tick_duration = 0.5,
     lv_current_tick = 0,
     lv_grid_size_loop = [1, 1],
@@ -41,6 +52,8 @@ var lv_tps = 1, // placeholder value
 var lv_base_url = window.location.hostname,
     lv_init_url = 'http://' + lv_base_url + ':3001/get_info',
     lv_update_url = 'http://' + lv_base_url + ':3001/get_latest_state_and_messages/',
+    lv_delta_url = 'http://' + lv_base_url + ':3001/get_state_delta/',
+    lv_stream_url = 'http://' + lv_base_url + ':3001/stream_state/',
     lv_send_userinput_url = 'http://' + lv_base_url + ':3001/send_userinput/',
     lv_sync_messages_url = 'http://' + lv_base_url + ':3001/get_messages/',
     lv_agent_id = "",
@@ -75,6 +88,14 @@ function init() {
     // init a number of vis variables
     lv_reinitialize_vis = false;
     lv_open_update_request = false;
+    lv_last_received_tick = -1;
+    lv_state = {};
+
+    // close the stream of the previous world, if any
+    if (lv_stream != null) {
+        lv_stream.close();
+        lv_stream = null;
+    }
 
     // fetch the canvas element from the html
     initialize_grid();
@@ -183,8 +204,12 @@ function initial_mssgs_sync() {
         // unpack messages
         process_mssgs_pageload(data2.messages, data2.chatrooms);
 
-        // start the visualization loop
-        world_loop();
+        // subscribe to the state stream if possible, otherwise start polling in the visualization loop
+        if (lv_use_stream && window.EventSource) {
+            start_stream();
+        } else {
+            world_loop();
+        }
     });
 
     // catch a failed request
@@ -250,7 +275,7 @@ function world_loop() {
 
             // redraw the screen and go to the next frame
             lv_open_update_request = false;
-            draw(lv_state, lv_world_settings, lv_messages, lv_chatrooms, lv_world_completed, lv_world_completion_data, new_tick = true);
+            draw_MATRXS_update();
             request_new_frame();
         })
 
@@ -269,6 +294,77 @@ function world_loop() {
     }
 }
 
+/*
+ * Draw the latest received update, only drawing the changes if we received a state delta
+ */
+function draw_MATRXS_update() {
+    if (lv_use_state_delta && !lv_full_state) {
+        draw_delta(lv_state, lv_changed_objs, lv_removed_objs, lv_world_settings, lv_messages, lv_chatrooms,
+            lv_world_completed, lv_world_completion_data);
+    } else {
+        draw(lv_state, lv_world_settings, lv_messages, lv_chatrooms, lv_world_completed, lv_world_completion_data, new_tick = true);
+    }
+}
+
+
+/*
+ * Subscribe to the state stream of MATRXS, which pushes the state delta of every tick. If the stream cannot be opened
+ * at all, we fall back to polling in the visualization loop.
+ */
+function start_stream() {
+    var lv_stream_received_update = false;
+    lv_stream = new EventSource(lv_stream_url + "['" + lv_agent_id + "']");
+
+    // a new tick, in the same format as a state delta
+    lv_stream.addEventListener("state", function(event) {
+        lv_stream_received_update = true;
+        var data = JSON.parse(event.data);
+        apply_MATRXS_delta(data);
+        parse_MATRXS_update(data);
+
+        // we received an update for a different world from our current, so reinitialize the visualization
+        if (lv_new_world_ID != null && lv_world_ID != lv_new_world_ID) {
+            console.log("New world ID received:", lv_new_world_ID);
+            lv_reinitialize_vis = true;
+            sync_play_button(lv_matrxs_paused);
+            return;
+        }
+
+        // draw right away, as the next event only contains the changes since this one
+        draw_MATRXS_update();
+    });
+
+    // no tick passed for a while (e.g. MATRXS is paused), but the status may have changed
+    lv_stream.addEventListener("status", function(event) {
+        var data = JSON.parse(event.data);
+        if (data.matrxs_paused != lv_matrxs_paused) {
+            lv_matrxs_paused = data.matrxs_paused;
+            sync_play_button(lv_matrxs_paused);
+        }
+        if (data.world_completed && !lv_world_completed) {
+            lv_world_completed = data.world_completed;
+            lv_world_completion_data = data.completion_data;
+
+            // nothing changed since the last drawn tick, so this only shows the completion screen
+            lv_changed_objs = {};
+            lv_removed_objs = [];
+            draw_MATRXS_update();
+        }
+    });
+
+    // the stream ended (e.g. a new world started) or could not be opened, reinitialize
+    lv_stream.onerror = function() {
+        lv_stream.close();
+        lv_stream = null;
+        if (!lv_stream_received_update) {
+            console.log("Could not open the MATRXS state stream, falling back to polling.");
+            lv_use_stream = false;
+        }
+        lv_reinitialize_vis = true;
+    };
+}
+
+
 function request_new_frame() {
 
     // method 1
@@ -293,6 +389,11 @@ function request_new_frame() {
 function get_MATRXS_update() {
     // console.log("Fetching matrxs state with old wait:", lv_wait_for_next_tick);
 
+    // request only the changes since the last tick we received
+    if (lv_use_state_delta) {
+        return get_MATRXS_delta_update();
+    }
+
     // the get request is async, meaning the (success) function is only executed when
     // the response has been received
     var lv_update_request = jQuery.getJSON(lv_update_url + "['" + lv_agent_id + "']", function(data) {
@@ -302,40 +403,86 @@ function get_MATRXS_update() {
 
         // decode lv_state and other info from the request
         lv_state = data['states'][data['states'].length - 1][lv_agent_id]['state'];
-        var lv_new_tick = lv_state['World']['nr_ticks'];
-        curr_tick_timestamp = lv_state['World']['curr_tick_timestamp'];
-        lv_tick_duration = lv_state['World']['tick_duration'];
-        lv_tps = (1.0 / lv_tick_duration).toFixed(1); // round to 1 decimal behind the dot
+        parse_MATRXS_update(data);
+    });
+    return lv_update_request;
+}
 
-        lv_world_settings = lv_state['World'];
 
-        // check what the ID of this world is. Is it still the same world we were expecting, or a different world?
-        lv_new_world_ID = lv_state['World']['world_ID'];
+/*
+ * Fetch the changes in the state since the last tick we received from the MATRXS API, and apply them to our state
+ */
+function get_MATRXS_delta_update() {
+    var lv_update_request = jQuery.getJSON(lv_delta_url + "['" + lv_agent_id + "']/" + lv_last_received_tick, function(data) {
+        apply_MATRXS_delta(data);
+        parse_MATRXS_update(data);
+    });
+    return lv_update_request;
+}
 
-        // we request more often than the lv_tick_duration, as to not miss any ticks
-        lv_wait_for_next_tick = lv_tick_duration * 1000 * 0.6;
 
-        // request at least every half second
-        if (lv_wait_for_next_tick > 500) {
-            lv_wait_for_next_tick = 500;
-        }
+/*
+ * Apply a received state delta to our state
+ */
+function apply_MATRXS_delta(data) {
+    lv_messages = data.messages;
+    lv_chatrooms = data.chatrooms;
+
+    // a complete state replaces our state, otherwise patch it with the added, changed and removed objects
+    lv_full_state = data.full;
+    if (lv_full_state) {
+        lv_state = data.changed;
+    } else {
+        Object.keys(data.changed).forEach(function(objID) {
+            lv_state[objID] = data.changed[objID];
+        });
+        data.removed.forEach(function(objID) {
+            delete lv_state[objID];
+        });
+    }
+    lv_state['World'] = data.World;
+    lv_changed_objs = data.changed;
+    lv_removed_objs = data.removed;
+    lv_last_received_tick = data.tick;
+}
 
-        // note our new current tick
-        lv_current_tick = lv_new_tick;
 
-        if (data.hasOwnProperty('world_completed')) {
-            lv_world_completed = data.world_completed;
-            lv_world_completion_data = data.completion_data;
-        }
+/*
+ * Parse the World settings and MATRXS status of a received update
+ */
+function parse_MATRXS_update(data) {
+    var lv_new_tick = lv_state['World']['nr_ticks'];
+    curr_tick_timestamp = lv_state['World']['curr_tick_timestamp'];
+    lv_tick_duration = lv_state['World']['tick_duration'];
+    lv_tps = (1.0 / lv_tick_duration).toFixed(1); // round to 1 decimal behind the dot
 
-        // make sure to synchronize the play/pause button of the frontend with the current MATRX version
-        var matrxs_paused = data.matrxs_paused;
-        if (matrxs_paused != lv_matrxs_paused) {
-            lv_matrxs_paused = matrxs_paused;
-            sync_play_button(lv_matrxs_paused);
-        }
-    });
-    return lv_update_request;
+    lv_world_settings = lv_state['World'];
+
+    // check what the ID of this world is. Is it still the same world we were expecting, or a different world?
+    lv_new_world_ID = lv_state['World']['world_ID'];
+
+    // we request more often than the lv_tick_duration, as to not miss any ticks
+    lv_wait_for_next_tick = lv_tick_duration * 1000 * 0.6;
+
+    // request at least every half second
+    if (lv_wait_for_next_tick > 500) {
+        lv_wait_for_next_tick = 500;
+    }
+
+    // note our new current tick
+    lv_current_tick = lv_new_tick;
+
+    if (data.hasOwnProperty('world_completed')) {
+        lv_world_completed = data.world_completed;
+        lv_world_completion_data = data.completion_data;
+    }
+
+    // make sure to synchronize the play/pause button of the frontend with the current MATRX version
+    var matrxs_paused = data.matrxs_paused;
+    if (matrxs_paused != lv_matrxs_paused) {
+        lv_matrxs_paused = matrxs_paused;
+        sync_play_button(lv_matrxs_paused);
+    }
 }
 
 
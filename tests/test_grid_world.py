@@ -0,0 +1,64 @@
+""" Checks of the grid and the spatial index of the GridWorld, which are updated as objects and agents move. """
+from matrxs.agents.agent_brain import AgentBrain
+from matrxs.objects.agent_body import AgentBody
+from matrxs.utils.utils import get_distance
+from matrxs.world_builder import WorldBuilder
+
+GRID_SIZE = 10
+MOVE_ACTIONS = ["MoveNorth", "MoveEast", "MoveSouth", "MoveWest"]
+
+
+class WalkingAgentBrain(AgentBrain):
+    """ An agent that walks randomly. """
+
+    def decide_on_action(self, state):
+        return MOVE_ACTIONS[self.rnd_gen.randint(len(MOVE_ACTIONS))], {}
+
+
+def run_world(nr_ticks):
+    builder = WorldBuilder(shape=[GRID_SIZE, GRID_SIZE], tick_duration=0.0, simulation_goal=nr_ticks, headless=True,
+                           random_seed=1, check_grid_consistency=True)
+    for idx in range(GRID_SIZE):
+        builder.add_object((idx, idx), name=f"object_{idx}", is_traversable=True)
+    for idx in range(4):
+        builder.add_agent((idx, 0), WalkingAgentBrain(), name=f"agent_{idx}", possible_actions=MOVE_ACTIONS)
+    world = builder.get_world()
+    world.run(builder.api_info)
+    return world
+
+
+def expected_grid(world):
+    # the grid as it was rebuilt from the locations of all objects and agents before every action
+    grid = {}
+    for obj in list(world.environment_objects.values()) + list(world.registered_agents.values()):
+        grid.setdefault(tuple(obj.location), []).append(obj.obj_id)
+    return grid
+
+
+def test_grid_follows_moving_agents():
+    # check_grid_consistency also compares the grid with a complete rebuild after every action
+    world = run_world(nr_ticks=50)
+    assert [agent.location for agent in world.registered_agents.values()] != [(idx, 0) for idx in range(4)]
+    grid = expected_grid(world)
+    for x in range(GRID_SIZE):
+        for y in range(GRID_SIZE):
+            assert world.grid[y, x] == grid.get((x, y))
+
+
+def test_grid_after_removing_an_object():
+    world = run_world(nr_ticks=5)
+    obj = world.get_env_object("object_3")
+    world.remove_from_grid(obj.obj_id)
+    assert obj.obj_id not in (world.grid[obj.location[1], obj.location[0]] or [])
+    assert obj.obj_id not in world.get_objects_in_range(obj.location, "*", 0)
+
+
+def test_objects_in_range_match_a_full_scan():
+    world = run_world(nr_ticks=20)
+    all_objects = list(world.environment_objects.values()) + list(world.registered_agents.values())
+    for location in [(0, 0), (4, 5), (9, 9)]:
+        for object_type, sense_range in [("*", 0), ("*", 2), (None, 4.5), (AgentBody, 3), ("*", float("inf"))]:
+            found = world.get_objects_in_range(location, object_type, sense_range)
+            expected = [obj.obj_id for obj in all_objects if get_distance(obj.location, location) <= sense_range
+                        and (object_type in ("*", None) or isinstance(obj, object_type))]
+            assert list(found.keys()) == expected
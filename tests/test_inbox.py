@@ -0,0 +1,51 @@
+""" Checks of the Inbox of an agent, which keeps the most recent messages it received. """
+from matrxs.utils.inbox import Inbox
+
+
+def test_keeps_all_messages_by_default():
+    inbox = Inbox()
+    for idx in range(1000):
+        inbox.add(idx, tick=idx)
+    assert len(inbox) == 1000
+    assert inbox.get(0) == 0 and inbox.get(-1) == 999
+
+
+def test_max_messages():
+    inbox = Inbox(max_messages=3)
+    for idx in range(5):
+        inbox.add(idx, tick=0)
+    assert inbox.messages == [2, 3, 4]
+    assert inbox.nr_received == 5
+
+
+def test_max_ticks():
+    inbox = Inbox(max_ticks=2)
+    for tick in range(5):
+        inbox.add(f"first of {tick}", tick=tick)
+        inbox.add(f"second of {tick}")  # received at the tick of the previous message
+    assert inbox.messages == ["first of 3", "second of 3", "first of 4", "second of 4"]
+
+
+def test_max_ticks_forgets_messages_without_tick():
+    inbox = Inbox(max_ticks=2)
+    inbox.add("no tick")
+    inbox.add("tick 5", tick=5)
+    inbox.add("tick 6", tick=6)
+    assert inbox.messages == ["tick 5", "tick 6"]
+    inbox.add("tick 7", tick=7)
+    assert inbox.messages == ["tick 6", "tick 7"]
+
+
+def test_new_messages():
+    inbox = Inbox(max_messages=3)
+    inbox.add("old", tick=0)
+    inbox.mark_read()
+    assert inbox.new_messages == []
+    for idx in range(4):
+        inbox.add(idx, tick=1)
+    # only the new messages that are still kept are returned
+    assert inbox.new_messages == [1, 2, 3]
+    inbox.remove(-1)
+    assert inbox.new_messages == [1, 2]
+    inbox.mark_read()
+    assert inbox.new_messages == []
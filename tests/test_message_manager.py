@@ -0,0 +1,57 @@
+""" Checks of fetching messages from the MessageManager since a sequence number, and of its message retention. """
+import json
+
+from matrxs.utils.message import Message
+from matrxs.utils.message_manager import MessageManager
+
+AGENT_IDS = ["agent_1", "agent_2", "agent_3"]
+TEAMS = {"team_1": ["agent_1", "agent_2"], "team_2": ["agent_3"]}
+
+
+def contents(messages):
+    # the content of all fetched messages, per type and tick
+    return {"global": {tick: [json.loads(mssg)["content"] for mssg in mssgs]
+                       for tick, mssgs in messages["global"].items()},
+            "team": {tick: {team: [json.loads(mssg)["content"] for mssg in mssgs] for team, mssgs in teams.items()}
+                     for tick, teams in messages["team"].items()},
+            "private": {tick: [json.loads(mssg)["content"] for mssg in mssgs]
+                        for tick, mssgs in messages["private"].items()}}
+
+
+def send_messages(message_manager, tick):
+    message_manager.preprocess_messages(tick, [Message(f"global {tick}", "agent_1"),
+                                               Message(f"team {tick}", "agent_1", to_id="team_1"),
+                                               Message(f"private {tick}", "agent_1", to_id="agent_3")],
+                                        AGENT_IDS, TEAMS)
+
+
+def test_fetch_since_only_returns_new_messages():
+    message_manager = MessageManager()
+    send_messages(message_manager, 0)
+    messages, sequence = message_manager.fetch_messages_since(0)
+    assert sequence == 3
+    assert contents(messages) == {"global": {0: ["global 0"]}, "team": {0: {"team_1": ["team 0"]}},
+                                  "private": {0: ["private 0"]}}
+
+    # nothing new was stored, so the cursor stays the same
+    messages, next_sequence = message_manager.fetch_messages_since(sequence)
+    assert next_sequence == sequence
+    assert contents(messages) == {"global": {}, "team": {}, "private": {}}
+
+    send_messages(message_manager, 1)
+    messages, next_sequence = message_manager.fetch_messages_since(sequence, id="agent_3")
+    assert next_sequence == 6
+    assert contents(messages) == {"global": {1: ["global 1"]}, "team": {}, "private": {1: ["private 1"]}}
+
+
+def test_retention():
+    message_manager = MessageManager(retention=2)
+    for tick in range(5):
+        message_manager.remove_old_messages(tick)
+        send_messages(message_manager, tick)
+    assert list(contents(message_manager.fetch_messages(0, 4))["global"].items()) == [(3, ["global 3"]),
+                                                                                     (4, ["global 4"])]
+    # the cursor still counts the forgotten messages, and only the kept ones are returned
+    messages, sequence = message_manager.fetch_messages_since(0)
+    assert sequence == 15
+    assert list(contents(messages)["private"].keys()) == [3, 4]
@@ -0,0 +1,43 @@
+""" Checks of the StateHistory of the API, which keeps the states of the most recent ticks. """
+import pytest
+
+from matrxs.API.state_history import StateEvictedError, StateHistory
+
+
+def fill(history, nr_ticks):
+    for tick in range(nr_ticks):
+        history.append({"god": {"tick": tick}})
+
+
+def test_keeps_all_ticks_without_retention():
+    history = StateHistory()
+    fill(history, 10)
+    assert len(history) == 10
+    assert history.oldest_tick == 0
+    assert [states["god"]["tick"] for states in history.get_range(0)] == list(range(10))
+
+
+def test_evicts_ticks_outside_retention():
+    history = StateHistory(retention=3)
+    fill(history, 10)
+    assert len(history) == 10
+    assert history.oldest_tick == 7
+    assert history[-1]["god"]["tick"] == 9
+    assert [states["god"]["tick"] for states in history.get_range(7)] == [7, 8, 9]
+    with pytest.raises(StateEvictedError):
+        history[6]
+    with pytest.raises(IndexError):
+        history[10]
+
+
+def test_reads_spilled_ticks_from_disk(tmp_path):
+    history = StateHistory(retention=3, spill_dir=str(tmp_path))
+    fill(history, 10)
+    assert history.oldest_tick == 0
+    assert len(list(tmp_path.iterdir())) == 7
+    assert [states["god"]["tick"] for states in history.get_range(0)] == list(range(10))
+
+
+def test_invalid_retention():
+    with pytest.raises(ValueError):
+        StateHistory(retention=0)